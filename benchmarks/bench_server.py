@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Load benchmark: serve_docs.py against python -m http.server.
+
+Starts each server in a subprocess over the same document root, drives it
+with concurrent keep-alive clients for a fixed time and reports requests per
+second, latency percentiles and bytes received. Without --root a synthetic
+tree (HTML pages, _static assets and a few large files) is generated.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from urllib.parse import quote
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+
+SERVERS = {
+    'http.server': lambda port, root: [sys.executable, '-m', 'http.server', str(port),
+                                       '--bind', '127.0.0.1', '--directory', root],
+    'serve_docs': lambda port, root: [sys.executable, str(REPO_DIR / 'serve_docs.py'), str(port),
+                                      '--bind', '127.0.0.1', '--directory', root, '--quiet'],
+}
+
+# Files per kind in the synthetic tree: (count, size in bytes)
+SYNTHETIC_TREE = {
+    'page': (400, 24 * 1024),
+    'asset': (40, 8 * 1024),
+    'large': (4, 2 * 1024 * 1024),
+}
+
+
+def make_tree(root):
+    """Write a synthetic docs tree and return the URL paths to request."""
+    rng = random.Random(0)
+    root = Path(root)
+    (root / '_static').mkdir(parents=True, exist_ok=True)
+    (root / 'pdoc').mkdir(exist_ok=True)
+    words = [f'word{i}' for i in range(500)]
+    count, size = SYNTHETIC_TREE['page']
+    for i in range(count):
+        text = ' '.join(rng.choice(words) for _ in range(size // 8))
+        (root / 'pdoc' / f'module{i}.html').write_text(f'<html><body><p>{text}</p></body></html>')
+    count, size = SYNTHETIC_TREE['asset']
+    for i in range(count):
+        (root / '_static' / f'asset{i}.css').write_text('body { margin: 0 }\n' * (size // 20))
+    count, size = SYNTHETIC_TREE['large']
+    for i in range(count):
+        (root / f'download{i}.bin').write_bytes(os.urandom(size))
+    return collect_paths(root)
+
+
+def collect_paths(root, limit=2000):
+    """Return up to ``limit`` URL paths for the regular files under ``root``."""
+    root = Path(root)
+    paths = []
+    for path in sorted(root.rglob('*')):
+        if path.is_file() and path.suffix not in ('.gz', '.br'):
+            paths.append('/' + quote(path.relative_to(root).as_posix()))
+            if len(paths) >= limit:
+                break
+    return paths
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+async def _fetch(reader, writer, path):
+    """Send one GET on an open connection; return ``(body bytes, keep open)``."""
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n'
+                 f'Accept-Encoding: gzip, br\r\nConnection: keep-alive\r\n\r\n'.encode())
+    await writer.drain()
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').lower()
+    status_line, _, rest = head.partition('\r\n')
+    headers = dict(line.split(': ', 1) for line in rest.strip().split('\r\n') if ': ' in line)
+    keep_open = headers.get('connection') != 'close' and not status_line.startswith('http/1.0')
+    if 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    else:
+        body = await reader.read()
+        keep_open = False
+    if not status_line.split()[1].startswith(('2', '3')):
+        raise RuntimeError(f"{path}: {status_line}")
+    return len(body), keep_open
+
+
+async def _client(port, paths, deadline, rng, latencies, counters):
+    reader = writer = None
+    while time.monotonic() < deadline:
+        path = rng.choice(paths)
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            received, keep_open = await _fetch(reader, writer, path)
+        except (OSError, asyncio.IncompleteReadError, RuntimeError):
+            counters['errors'] += 1
+            keep_open = False
+        else:
+            latencies.append(time.perf_counter() - start)
+            counters['bytes'] += received
+        if not keep_open and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def drive(port, paths, connections, duration):
+    """Run ``connections`` concurrent clients for ``duration`` seconds."""
+    latencies = []
+    counters = {'bytes': 0, 'errors': 0}
+    deadline = time.monotonic() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(port, paths, deadline, random.Random(i), latencies, counters)
+        for i in range(connections)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    return {
+        'requests': len(latencies),
+        'errors': counters['errors'],
+        'requests_per_second': len(latencies) / elapsed,
+        'mb_per_second': counters['bytes'] / elapsed / 1024 / 1024,
+        'latency_ms': {
+            'mean': statistics.fmean(latencies) * 1000 if latencies else 0.0,
+            'p50': percentile(0.50),
+            'p99': percentile(0.99),
+        },
+    }
+
+
+def bench_server(name, root, paths, connections, duration):
+    """Start server ``name`` over ``root`` and measure it."""
+    port = free_port()
+    proc = subprocess.Popen(SERVERS[name](port, str(root)),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        return asyncio.run(drive(port, paths, connections, duration))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--root', help='Document root to serve (default: synthetic tree)')
+    parser.add_argument('-c', '--connections', type=int, default=32,
+                        help='Concurrent client connections (default: 32)')
+    parser.add_argument('-t', '--duration', type=float, default=10,
+                        help='Seconds to drive each server (default: 10)')
+    parser.add_argument('--server', action='append', choices=sorted(SERVERS),
+                        help='Server to benchmark (repeatable; default: all)')
+    parser.add_argument('--json', type=Path, help='Also write the results to this JSON file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main function."""
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.root or tmp
+        paths = collect_paths(root) if args.root else make_tree(root)
+        if not paths:
+            print(f"✗ No files under {root}")
+            return 1
+        print(f"Serving {len(paths)} files from {root} "
+              f"with {args.connections} connections for {args.duration:g}s each")
+
+        results = {}
+        for name in args.server or sorted(SERVERS):
+            results[name] = bench_server(name, root, paths, args.connections, args.duration)
+
+    print("=" * 60)
+    print(f"{'server':<14}{'req/s':>10}{'MB/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for name, result in results.items():
+        latency = result['latency_ms']
+        print(f"{name:<14}{result['requests_per_second']:>10.0f}{result['mb_per_second']:>9.1f}"
+              f"{latency['p50']:>9.1f}{latency['p99']:>9.1f}{result['errors']:>8}")
+    print("=" * 60)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + '\n')
+        print(f"✓ Results written to {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Benchmark the documentation toolchain and check it against a baseline.
+
+Runs offline. The table suite generates synthetic sphinx-packages.rst files
+(200, 2,000 and 20,000 rows by default) and measures time and peak traced
+memory of update_versions.update_rst_file, fix_doc_links.fix_api_links and
+validate_manual_links.validate_and_fix_links, the latter with the URL probe
+replaced by an instant stand-in. The pdoc suite documents the local tutorial
+packages with the in-process engine; the sphinx suite times a cold and a
+warm (nothing changed) sphinx-build of docs/, with intersphinx offline and
+the extension caches in the scratch directory.
+
+Results are written as JSON. ``--save-baseline`` records them as the
+baseline; ``--check`` compares against it using the ratios in
+thresholds.json and exits non-zero on a regression.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from unittest import mock
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_DIR))
+
+import extension_usage  # noqa: E402
+import fix_doc_links  # noqa: E402
+import generate_pdoc  # noqa: E402
+import update_versions  # noqa: E402
+import validate_manual_links  # noqa: E402
+from dist_index import canonical_name  # noqa: E402
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_RESULTS = BENCH_DIR / 'results' / 'latest.json'
+DEFAULT_BASELINE = BENCH_DIR / 'results' / 'baseline.json'
+DEFAULT_THRESHOLDS = BENCH_DIR / 'thresholds.json'
+
+DEFAULT_ROWS = (200, 2000, 20000)
+
+# Local packages documented by the pdoc suite
+LOCAL_PACKAGES = ('sphinx_automodapi_mylib', 'sphinx_autodoc_defaultargs')
+PACKAGES_DIR = REPO_DIR / 'docs' / 'tutorials' / 'packages'
+
+SUITES = ('tables', 'pdoc', 'sphinx')
+
+# Rows per synthetic list-table, like the sections of the real page
+ROWS_PER_TABLE = 50
+
+_HEADER = """.. list-table::
+   :header-rows: 1
+   :widths: 20 8 5 5 6 8 40
+
+   * - Name
+     - Version
+     - PyPI
+     - API
+     - Manual
+     - Tutorial
+     - Description
+"""
+
+_ROW = """   * - {name}
+     - Latest
+     - `link <https://pypi.org/project/{name}/>`_
+     - {api}
+     - {manual}
+     - {tutorial}
+     - Synthetic package {index} for benchmarking
+"""
+
+
+def make_rst(path, rows, seed=0):
+    """Write a synthetic sphinx-packages.rst with ``rows`` package rows."""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("Synthetic Packages\n==================\n\n")
+        for index in range(rows):
+            if index % ROWS_PER_TABLE == 0:
+                section = f"Section {index // ROWS_PER_TABLE}"
+                f.write(f"\n{section}\n{'-' * len(section)}\n\n{_HEADER}")
+            name = f'bench-pkg-{index}'
+            module = name.replace('-', '_')
+            f.write(_ROW.format(
+                name=name,
+                index=index,
+                api=f'`link <pdoc/{module}/index.html>`_' if rng.random() < 0.6 else '',
+                manual=(f'`link <https://docs{index % 40}.example.org/{name}/>`_'
+                        if rng.random() < 0.8 else 'N/A'),
+                tutorial=f':doc:`link <tutorials/packages/{name}>`' if rng.random() < 0.3 else '',
+            ))
+
+
+class SyntheticVersions:
+    """Stands in for a ``DistributionIndex``: about two thirds of the rows are installed."""
+
+    def __init__(self, rows):
+        self._versions = {canonical_name(f'bench-pkg-{i}'): f'1.{i % 7}.{i % 13}'
+                          for i in range(rows) if i % 3}
+
+    def version(self, name):
+        return self._versions.get(canonical_name(name))
+
+    def __len__(self):
+        return len(self._versions)
+
+
+def fake_probe(url, timeout=5, session=None, etag=None, last_modified=None):
+    """Answer a link check without the network; one host in ten is broken."""
+    status = 404 if url.startswith('https://docs7.') else 200
+    return validate_manual_links.LinkResult(status < 400, status, url, None, None)
+
+
+def measure(run, setup=None, repeat=3):
+    """Best wall time of ``repeat`` runs, then one traced run for peak memory.
+
+    ``setup`` runs untimed before every run (to restore the input file).
+    Output printed by the measured code is discarded.
+    """
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        if setup:
+            setup()
+        tracemalloc.start()
+        try:
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {'seconds': min(times), 'peak_mb': peak / (1024 * 1024)}
+
+
+def bench_tables(rows_list, repeat, work_dir):
+    """Time the three sphinx-packages.rst post-processing steps per table size."""
+    results = {}
+    for rows in rows_list:
+        source = work_dir / f'packages-{rows}.rst'
+        target = work_dir / 'sphinx-packages.rst'
+        make_rst(source, rows)
+
+        def restore():
+            shutil.copyfile(source, target)
+
+        versions = SyntheticVersions(rows)
+        generated = {f'bench_pkg_{i}' for i in range(rows) if i % 2}
+        cases = {
+            'update_versions': lambda: update_versions.update_rst_file(target, versions),
+            'fix_api_links': lambda: fix_doc_links.fix_api_links(target, generated),
+            'validate_manual_links': lambda: validate_manual_links.validate_and_fix_links(
+                target, cache=None),
+        }
+        with mock.patch.object(validate_manual_links, 'probe_url', fake_probe):
+            for name, run in cases.items():
+                key = f'{name}/{rows}'
+                results[key] = measure(run, restore, repeat)
+                _print_result(key, results[key])
+    return results
+
+
+def bench_pdoc(repeat, work_dir):
+    """Time in-process pdoc generation of the local tutorial packages."""
+    if str(PACKAGES_DIR) not in sys.path:
+        # Spawned pdoc workers inherit sys.path from this process
+        sys.path.insert(0, str(PACKAGES_DIR))
+    jobs = [(name, name, '0') for name in LOCAL_PACKAGES]
+    output = work_dir / 'pdoc'
+
+    def run():
+        succeeded = generate_pdoc.generate_all(jobs, str(output), workers=1)
+        if len(succeeded) != len(jobs):
+            raise RuntimeError(f"pdoc documented {len(succeeded)}/{len(jobs)} local packages")
+
+    key = 'pdoc/local_packages'
+    # Memory is traced in this process only; the pdoc workers are not included
+    result = measure(run, lambda: shutil.rmtree(output, ignore_errors=True), repeat)
+    _print_result(key, result)
+    return {key: result}
+
+
+def sphinx_env(work_dir):
+    """Return the build environment: offline, with every cache under ``work_dir``.
+
+    The local extensions otherwise share ``~/.cache/viper-sphinx`` with real
+    builds, which would make the cold build warm.
+    """
+    caches = work_dir / 'caches'
+    env = dict(os.environ)
+    env.update({
+        'VIPER_INTERSPHINX_MODE': 'offline',
+        'INTERSPHINX_CACHE_DIR': str(caches / 'intersphinx'),
+        'HIGHLIGHT_CACHE_PATH': str(caches / 'highlight.sqlite'),
+        'GRAPHVIZ_CACHE_DIR': str(caches / 'graphviz'),
+        'PYREVERSE_CACHE_DIR': str(caches / 'pyreverse'),
+    })
+    return env
+
+
+def bench_sphinx(source_dir, work_dir, jobs):
+    """Time a cold and a warm html build of ``source_dir``."""
+    out_dir, doctrees = work_dir / 'html', work_dir / 'doctrees'
+    command = [sys.executable, '-m', 'sphinx', '-b', 'html', '-q', '-j', str(jobs),
+               '-d', str(doctrees), str(source_dir), str(out_dir)]
+    env = sphinx_env(work_dir)
+    # The directive scan is cached next to the sources
+    (source_dir / '_build' / extension_usage.CACHE_NAME).unlink(missing_ok=True)
+    results = {}
+    for key in ('sphinx_build/cold', 'sphinx_build/warm'):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, env=env)
+        results[key] = {'seconds': time.perf_counter() - start}
+        _print_result(key, results[key])
+    return results
+
+
+def _print_result(key, result):
+    memory = f"  peak {result['peak_mb']:8.1f} MB" if 'peak_mb' in result else ''
+    print(f"  {key:<36} {result['seconds']:9.3f}s{memory}")
+
+
+def compare(results, baseline, thresholds):
+    """Return the regressions of ``results`` against ``baseline``.
+
+    A benchmark regresses when a metric exceeds its baseline by more than its
+    ratio (``time_ratio`` / ``memory_ratio``) and by more than the absolute
+    slack (``min_seconds`` / ``min_mb``), which keeps millisecond-scale
+    benchmarks from failing on noise. Per-benchmark overrides come from the
+    ``benchmarks`` section, keyed by name or by the part before the ``/``.
+    """
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        limits = dict(thresholds.get('default', {}))
+        overrides = thresholds.get('benchmarks', {})
+        limits.update(overrides.get(key.split('/')[0], {}))
+        limits.update(overrides.get(key, {}))
+        for metric, ratio, slack in (('seconds', 'time_ratio', 'min_seconds'),
+                                     ('peak_mb', 'memory_ratio', 'min_mb')):
+            if metric not in result or metric not in base or ratio not in limits:
+                continue
+            limit = max(base[metric] * limits[ratio], base[metric] + limits.get(slack, 0))
+            if result[metric] > limit:
+                regressions.append((key, metric, base[metric], result[metric], limit))
+    return regressions
+
+
+def _load_json(path):
+    try:
+        return json.loads(Path(path).read_text(encoding='utf-8'))
+    except FileNotFoundError:
+        return None
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--suite', action='append', choices=SUITES,
+                        help='Suite to run (repeatable; default: all)')
+    parser.add_argument('--rows', type=int, nargs='+', default=list(DEFAULT_ROWS),
+                        help=f"Synthetic table sizes (default: {' '.join(map(str, DEFAULT_ROWS))})")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Timed runs per benchmark; the best is kept (default: 3)')
+    parser.add_argument('--sphinx-source', type=Path, default=REPO_DIR / 'docs',
+                        help='Sphinx project for the sphinx suite (default: docs/)')
+    parser.add_argument('--sphinx-jobs', default='auto',
+                        help='sphinx-build -j value for the sphinx suite (default: auto)')
+    parser.add_argument('--json', type=Path, default=DEFAULT_RESULTS,
+                        help=f'Where to write the results (default: {DEFAULT_RESULTS.relative_to(REPO_DIR)})')
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE,
+                        help=f'Baseline results (default: {DEFAULT_BASELINE.relative_to(REPO_DIR)})')
+    parser.add_argument('--thresholds', type=Path, default=DEFAULT_THRESHOLDS,
+                        help=f'Regression thresholds (default: {DEFAULT_THRESHOLDS.relative_to(REPO_DIR)})')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Record these results as the new baseline')
+    parser.add_argument('--check', action='store_true',
+                        help='Exit with status 1 if any benchmark regressed against the baseline')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main function."""
+    args = parse_args(argv)
+    suites = args.suite or SUITES
+    print("=" * 60)
+    print(f"Benchmarking documentation toolchain ({', '.join(suites)})")
+    print("=" * 60)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        if 'tables' in suites:
+            results.update(bench_tables(args.rows, args.repeat, work_dir))
+        if 'pdoc' in suites:
+            results.update(bench_pdoc(args.repeat, work_dir))
+        if 'sphinx' in suites:
+            results.update(bench_sphinx(args.sphinx_source.resolve(), work_dir, args.sphinx_jobs))
+
+    report = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+    args.json.parent.mkdir(parents=True, exist_ok=True)
+    args.json.write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
+    print(f"✓ Results written to {args.json}")
+
+    if args.save_baseline:
+        baseline = _load_json(args.baseline) or {'meta': report['meta'], 'results': {}}
+        # Keep the baseline of suites that were not run this time
+        baseline['results'].update(results)
+        baseline['meta'] = report['meta']
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(baseline, indent=2) + '\n', encoding='utf-8')
+        print(f"✓ Baseline saved to {args.baseline}")
+
+    if args.check:
+        baseline = _load_json(args.baseline)
+        if baseline is None:
+            print(f"⚠️  No baseline at {args.baseline}; run with --save-baseline first")
+            return 0
+        regressions = compare(results, baseline['results'], _load_json(args.thresholds) or {})
+        for key, metric, before, after, limit in regressions:
+            print(f"✗ {key}: {metric} {before:.3f} -> {after:.3f} (limit {limit:.3f})")
+        if regressions:
+            print(f"✗ {len(regressions)} regression(s) against {args.baseline}")
+            return 1
+        print(f"✓ No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Incremental Sphinx build with the environment persisted across container builds.
+
+Restores ``_build/doctrees`` and ``_build/html`` from a cache directory (a
+Docker BuildKit cache mount in the image build), runs ``sphinx-build`` so only
+changed sources are re-read and re-written, then saves the build state back.
+A change to ``conf.py``, to the local extensions or to the installed
+extensions forces a full build.
+With ``--profile``, sphinx-build runs under cProfile and its profile is
+written next to a Chrome trace of the restore, build and save steps.
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import pstats
+import shutil
+import subprocess
+import sys
+from importlib import metadata
+from pathlib import Path
+
+import profiling
+
+DEFAULT_CACHE_DIR = Path(os.environ.get(
+    'SPHINX_CACHE_DIR', Path.home() / '.cache' / 'viper-sphinx' / 'sphinx'))
+
+STATE_FILE = 'state.json'
+
+
+def _file_hash(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def configured_extensions(conf_path):
+    """Return the extension module names listed in ``conf.py``.
+
+    Reads string literals from ``extensions = [...]`` and ``extensions.append()``
+    with ``ast`` instead of executing the configuration.
+    """
+    names = set()
+    tree = ast.parse(conf_path.read_text(encoding='utf-8'))
+    for node in ast.walk(tree):
+        values = []
+        if isinstance(node, ast.Assign) and any(
+                isinstance(t, ast.Name) and t.id == 'extensions' for t in node.targets):
+            values = [node.value]
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+              and isinstance(node.func.value, ast.Name) and node.func.value.id == 'extensions'):
+            values = node.args
+        for value in values:
+            for item in ast.walk(value):
+                if isinstance(item, ast.Constant) and isinstance(item.value, str):
+                    names.add(item.value)
+    return sorted(names)
+
+
+def local_extension_sources(source_dir):
+    """Return the code of the configuration that is not in an installed distribution.
+
+    That is the local extensions in ``_ext/`` and ``extension_usage.py``,
+    which ``conf.py`` imports from next to this script.
+    """
+    paths = sorted((source_dir / '_ext').glob('*.py'))
+    paths.append(Path(__file__).resolve().parent / 'extension_usage.py')
+    return [path for path in paths if path.is_file()]
+
+
+def environment_fingerprint(source_dir):
+    """Fingerprint everything that can invalidate a pickled Sphinx environment.
+
+    Covers ``conf.py``, the local extension sources, the configured extension
+    set, the versions of the distributions providing those extensions, and
+    the Sphinx/Python versions.
+    """
+    conf_path = source_dir / 'conf.py'
+    extensions = configured_extensions(conf_path)
+    top_level = metadata.packages_distributions()
+
+    versions = {}
+    for dist_name in ['sphinx', 'docutils'] + [
+            d for ext in extensions for d in top_level.get(ext.split('.')[0], [])]:
+        try:
+            versions[dist_name.lower()] = metadata.version(dist_name)
+        except metadata.PackageNotFoundError:
+            versions[dist_name.lower()] = None
+
+    payload = {
+        'conf': _file_hash(conf_path),
+        'local': {path.name: _file_hash(path) for path in local_extension_sources(source_dir)},
+        'extensions': extensions,
+        'versions': versions,
+        'python': list(sys.version_info[:2]),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def source_snapshot(source_dir, build_dir):
+    """Map each source file to its ``(sha256, mtime_ns)``.
+
+    Skips the build directory and the generated pdoc tree, which Sphinx
+    never reads as sources.
+    """
+    skip = {build_dir, source_dir / 'pdoc'}
+    snapshot = {}
+    for root, dirs, files in os.walk(source_dir):
+        dirs[:] = [d for d in dirs
+                   if Path(root, d) not in skip and not d.startswith('.') and d != '__pycache__']
+        for name in files:
+            path = Path(root, name)
+            snapshot[path.relative_to(source_dir).as_posix()] = (
+                _file_hash(path), path.stat().st_mtime_ns)
+    return snapshot
+
+
+def restore_source_mtimes(source_dir, previous):
+    """Give unchanged sources back the mtimes recorded at the last build.
+
+    ``COPY`` and fresh checkouts reset mtimes, which Sphinx would treat as
+    edits. Only files whose content hash matches are touched, so real edits
+    still get re-read. Returns the number of files restored.
+    """
+    restored = 0
+    for rel, (digest, mtime_ns) in previous.items():
+        path = source_dir / rel
+        try:
+            if path.stat().st_mtime_ns != mtime_ns and _file_hash(path) == digest:
+                os.utime(path, ns=(mtime_ns, mtime_ns))
+                restored += 1
+        except OSError:
+            continue
+    return restored
+
+
+def _copy_tree(src, dst):
+    if dst.exists():
+        shutil.rmtree(dst)
+    shutil.copytree(src, dst)
+
+
+def _run_importtime(command, source_dir, args):
+    """Run ``command`` (under ``-X importtime``) and report where startup imports go.
+
+    Import lines are taken off stderr; everything else is passed through.
+    The raw lines go to ``importtime.txt`` and per-package totals to
+    ``importtime.json`` in the profile directory.
+    """
+    lines = []
+    process = subprocess.Popen(command, cwd=source_dir, stderr=subprocess.PIPE,
+                               text=True, errors='replace')
+    for line in process.stderr:
+        if line.startswith('import time:'):
+            lines.append(line)
+        else:
+            sys.stderr.write(line)
+    returncode = process.wait()
+
+    entries = profiling.parse_importtime(lines)
+    extensions = set(configured_extensions(source_dir / 'conf.py'))
+    packages = profiling.report_importtime(entries, args.top, highlight=extensions)
+    args.profile_dir.mkdir(parents=True, exist_ok=True)
+    (args.profile_dir / 'importtime.txt').write_text(''.join(lines), encoding='utf-8')
+    summary_path = args.profile_dir / 'importtime.json'
+    summary_path.write_text(json.dumps({
+        'total_seconds': sum(packages.values()),
+        'modules': len(entries),
+        'packages': packages,
+        'extensions': {name: packages[name] for name in sorted(extensions) if name in packages},
+    }, indent=1), encoding='utf-8')
+    print(f"✓ Import times written to {summary_path}")
+    return returncode
+
+
+def sphinx_command(args, source_dir, doctrees, output, fresh_env):
+    """Return the sphinx-build command line for ``args``.
+
+    ``-X importtime`` is an interpreter option, so it goes before
+    ``-m cProfile`` - cProfile would reject it as one of its own options.
+    """
+    command = [sys.executable]
+    if args.importtime:
+        command += ['-X', 'importtime']
+    if args.profile:
+        command += ['-m', 'cProfile', '-o', str(args.profile_dir / 'sphinx-build.prof')]
+    command += ['-m', 'sphinx', '-b', args.builder, '-d', str(doctrees)]
+    if fresh_env:
+        command += ['-E', '-a']
+    return command + [str(source_dir), str(output)] + args.sphinx_args
+
+
+def _build(args, source_dir, build_dir, doctrees, output, cache):
+    """Restore the cached state, run sphinx-build and save the state again."""
+    with profiling.span('fingerprint'):
+        fingerprint = environment_fingerprint(source_dir)
+    state = {}
+    state_path = cache / STATE_FILE
+    if not args.full and state_path.exists():
+        try:
+            state = json.loads(state_path.read_text(encoding='utf-8'))
+        except ValueError:
+            state = {}
+
+    fresh_env = True
+    if state:
+        if state.get('fingerprint') != fingerprint:
+            print("⚠ conf.py or extension set changed - running a full build")
+        else:
+            # Restore the previous build unless this tree already has its own
+            if not doctrees.exists():
+                with profiling.span('restore build state'):
+                    _copy_tree(cache / 'doctrees', doctrees)
+                    _copy_tree(cache / 'output', output)
+                print(f"✓ Restored build state from {cache}")
+            restored = restore_source_mtimes(source_dir, state.get('sources', {}))
+            print(f"✓ Restored mtimes for {restored} unchanged source files")
+            fresh_env = False
+    else:
+        print("No cached build state - running a full build")
+
+    if args.profile:
+        prof_path = args.profile_dir / 'sphinx-build.prof'
+        prof_path.parent.mkdir(parents=True, exist_ok=True)
+        if prof_path.exists():
+            prof_path.unlink()
+    command = sphinx_command(args, source_dir, doctrees, output, fresh_env)
+    print(f"$ {' '.join(command)}")
+    with profiling.span('sphinx-build'):
+        if args.importtime:
+            returncode = _run_importtime(command, source_dir, args)
+        else:
+            returncode = subprocess.run(command, cwd=source_dir).returncode
+    if returncode != 0:
+        print(f"✗ sphinx-build failed with exit code {returncode}; build state not saved")
+        return returncode
+
+    with profiling.span('save build state'):
+        cache.mkdir(parents=True, exist_ok=True)
+        _copy_tree(doctrees, cache / 'doctrees')
+        _copy_tree(output, cache / 'output')
+        state = {
+            'fingerprint': fingerprint,
+            'sources': source_snapshot(source_dir, build_dir),
+        }
+        state_path.write_text(json.dumps(state), encoding='utf-8')
+    print(f"✓ Saved build state to {cache}")
+    return 0
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    script_dir = Path(__file__).parent
+    parser = argparse.ArgumentParser(
+        description=__doc__.strip().splitlines()[0],
+        epilog='Unrecognised arguments (e.g. -j auto, -W) are passed to sphinx-build.'
+    )
+    parser.add_argument('--source', type=Path, default=script_dir / 'docs',
+                        help='Sphinx source directory (default: docs next to this script)')
+    parser.add_argument('--builder', default='html', help='Sphinx builder (default: html)')
+    parser.add_argument('--cache-dir', type=Path, default=DEFAULT_CACHE_DIR,
+                        help=f'Build state cache directory (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--full', action='store_true',
+                        help='Ignore cached state and rebuild everything')
+    parser.add_argument('--profile', action='store_true',
+                        help='Run sphinx-build under cProfile (parallel -j readers are not '
+                             'profiled) and write a trace of the build steps')
+    parser.add_argument('--profile-dir', type=Path, default=profiling.DEFAULT_PROFILE_DIR,
+                        help=f'Where --profile writes sphinx-build.prof and build_docs.trace.json '
+                             f'(default: {profiling.DEFAULT_PROFILE_DIR})')
+    parser.add_argument('--top', type=int, default=profiling.DEFAULT_TOP,
+                        help=f'Functions and spans listed by --profile (default: {profiling.DEFAULT_TOP})')
+    parser.add_argument('--importtime', action='store_true',
+                        help='Run sphinx-build under -X importtime and report the slowest '
+                             'packages to import (importtime.json in --profile-dir)')
+    # Anything not recognised here is passed through to sphinx-build
+    args, args.sphinx_args = parser.parse_known_args(argv)
+    return args
+
+
+def main(argv=None):
+    """Main function."""
+    args = parse_args(argv)
+    source_dir = args.source.resolve()
+    build_dir = source_dir / '_build'
+    doctrees = build_dir / 'doctrees'
+    output = build_dir / args.builder
+    cache = args.cache_dir / args.builder
+
+    print("=" * 60)
+    print("Building Sphinx documentation (incremental)")
+    print("=" * 60)
+
+    profiler = profiling.enable('build_docs') if args.profile else None
+    result = _build(args, source_dir, build_dir, doctrees, output, cache)
+    if profiler:
+        profiler.report(args.top)
+        print(f"✓ Trace written to {profiler.write_trace(args.profile_dir / 'build_docs.trace.json')}")
+        prof_path = args.profile_dir / 'sphinx-build.prof'
+        if prof_path.exists():
+            print(f"✓ sphinx-build profile written to {prof_path} (open with snakeviz or pstats)")
+            pstats.Stats(str(prof_path)).sort_stats('cumulative').print_stats(args.top)
+    return result
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Index of installed distributions built in-process from importlib.metadata.
+
+Replaces shelling out to ``pip list``. Names are normalized to PEP 503
+canonical form (runs of ``-``, ``_`` and ``.`` become ``-``, lowercased), so
+``sphinx_rtd_theme``, ``Sphinx-RTD-Theme`` and ``sphinx.rtd.theme`` all find the
+same distribution. Each distribution is also mapped to the top-level modules
+it installs, so lookups work by import name too.
+"""
+import os
+import re
+import sys
+import threading
+from collections import namedtuple
+from importlib import metadata
+
+_SEPARATORS = re.compile(r'[-_.]+')
+
+InstalledDistribution = namedtuple('InstalledDistribution', 'name version import_names')
+
+
+def canonical_name(name):
+    """Return the PEP 503 canonical form of a distribution name."""
+    return _SEPARATORS.sub('-', name).lower()
+
+
+def _import_names(dist):
+    """Return the top-level import names a distribution provides.
+
+    Namespace packages (``sphinxcontrib``) are shared between distributions
+    and left out; only names the distribution owns are returned.
+    """
+    files = dist.files or ()
+    owned = set()
+    for path in files:
+        parts = path.parts
+        if not parts or parts[0].endswith(('.dist-info', '.egg-info', '.data')) or parts[0] == '..':
+            continue
+        if len(parts) == 2 and parts[1] == '__init__.py' and parts[0].isidentifier():
+            owned.add(parts[0])
+        elif len(parts) == 1 and path.suffix in ('.py', '.so', '.pyd'):
+            owned.add(parts[0].split('.')[0])
+
+    top_level = dist.read_text('top_level.txt')
+    if top_level:
+        names = {line.strip() for line in top_level.splitlines() if line.strip()}
+        # Without a RECORD there is nothing to check against
+        return frozenset(names & owned if files else names)
+    return frozenset(owned)
+
+
+class DistributionIndex:
+    """Installed distributions keyed by canonical name and by import name."""
+
+    def __init__(self, distributions=None):
+        self._by_name = {}
+        self._by_import = {}
+        if distributions is None:
+            distributions = metadata.distributions()
+        for dist in distributions:
+            name = dist.metadata['Name']
+            if not name:
+                continue
+            key = canonical_name(name)
+            if key in self._by_name:
+                # Earlier sys.path entries shadow later ones, as for imports
+                continue
+            record = InstalledDistribution(name, dist.version, _import_names(dist))
+            self._by_name[key] = record
+            for module in record.import_names:
+                self._by_import.setdefault(module, record)
+
+    def get(self, name):
+        """Find a distribution by project name or top-level import name."""
+        return self._by_name.get(canonical_name(name)) or self._by_import.get(name)
+
+    def version(self, name):
+        """Return the installed version for ``name``, or None."""
+        record = self.get(name)
+        return record.version if record else None
+
+    def __iter__(self):
+        return iter(self._by_name.values())
+
+    def __len__(self):
+        return len(self._by_name)
+
+
+_index = None
+_index_stamp = None
+_index_lock = threading.Lock()
+
+
+def _path_stamp():
+    """Fingerprint of the import path: installs and removals touch these dirs."""
+    stamp = []
+    for entry in sys.path:
+        try:
+            stamp.append((entry, os.stat(entry or '.').st_mtime_ns))
+        except OSError:
+            stamp.append((entry, None))
+    return tuple(stamp)
+
+
+def get_index():
+    """Return the process-wide index.
+
+    Built on first use and rebuilt only when a ``sys.path`` directory (such
+    as ``site-packages``) has changed since, so a long-running process like
+    ``sphinx-autobuild`` picks up newly installed packages without rescanning
+    on every call.
+    """
+    global _index, _index_stamp
+    stamp = _path_stamp()
+    with _index_lock:
+        if _index is None or stamp != _index_stamp:
+            _index = DistributionIndex()
+            _index_stamp = stamp
+        return _index
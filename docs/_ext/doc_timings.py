@@ -0,0 +1,232 @@
+"""
+Local Sphinx extension that records where the build spends its time.
+
+Each document is timed through four phases:
+
+* ``read``: ``source-read`` to ``doctree-read`` (parsing and transforms)
+* ``resolve``: loading the pickled doctree to ``doctree-resolved``
+* ``write``: ``write_doc`` to ``html-page-context`` (translating to HTML)
+* ``render``: ``html-page-context`` to the page being written (templates)
+
+Every directive is timed as well, by name and class, so the fallback
+``LiteralBlockDirective`` instances registered by viper_setup show up as
+such. Directive times include any directives nested in their content.
+
+Read timings travel with the environment and are merged from parallel
+readers at ``env-merge-info``; resolve and write timings are appended to
+JSONL spill files, one per process, since parallel writers are forked and
+never report back. At ``build-finished`` everything is written to
+``_build/timings.json`` and the slowest documents and directives are logged.
+"""
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+from docutils.parsers.rst import states
+from sphinx.environment import BuildEnvironment
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+PHASES = ('read', 'resolve', 'write', 'render')
+
+# Directive name -> [count, seconds, class name] in this process, moved into
+# the environment as each document finishes reading
+_directives = {}
+
+# docname -> perf_counter() at which its resolve, write or render phase started
+_resolve_started = {}
+_write_started = {}
+_render_started = {}
+
+_spill_dir = None
+
+
+def _spill(docname, phase, seconds):
+    """Append one resolve/write timing to this process's spill file."""
+    if _spill_dir is None:
+        return
+    with open(_spill_dir / f'{os.getpid()}.jsonl', 'a', encoding='utf-8') as f:
+        f.write(json.dumps([docname, phase, seconds]) + '\n')
+
+
+def _timed_run_directive(original):
+    def run_directive(self, directive, match, type_name, option_presets):
+        start = time.perf_counter()
+        try:
+            return original(self, directive, match, type_name, option_presets)
+        finally:
+            entry = _directives.setdefault(type_name, [0, 0.0, directive.__name__])
+            entry[0] += 1
+            entry[1] += time.perf_counter() - start
+    run_directive.doc_timings_original = original
+    return run_directive
+
+
+def _timed_get_and_resolve_doctree(original):
+    def get_and_resolve_doctree(self, docname, builder, *args, **kwargs):
+        _resolve_started[docname] = time.perf_counter()
+        return original(self, docname, builder, *args, **kwargs)
+    get_and_resolve_doctree.doc_timings_original = original
+    return get_and_resolve_doctree
+
+
+def _timed_write_doc(original):
+    def write_doc(self, docname, doctree):
+        _write_started[docname] = time.perf_counter()
+        try:
+            return original(self, docname, doctree)
+        finally:
+            end = time.perf_counter()
+            render_start = _render_started.pop(docname, None)
+            write_start = _write_started.pop(docname)
+            if render_start is None:
+                # Non-HTML builders have no page context; it is all writing
+                _spill(docname, 'write', end - write_start)
+            else:
+                _spill(docname, 'write', render_start - write_start)
+                _spill(docname, 'render', end - render_start)
+    write_doc.doc_timings_original = original
+    return write_doc
+
+
+def _patch(owner, name, wrap):
+    current = getattr(owner, name)
+    if not hasattr(current, 'doc_timings_original'):
+        setattr(owner, name, wrap(current))
+
+
+def builder_inited(app):
+    global _spill_dir
+    _spill_dir = Path(app.doctreedir) / 'doc_timings'
+    shutil.rmtree(_spill_dir, ignore_errors=True)
+    _spill_dir.mkdir(parents=True, exist_ok=True)
+    _patch(type(app.builder), 'write_doc', _timed_write_doc)
+
+
+def reset_read_timings(app, env, docnames):
+    env.doc_read_timings = {}
+    env.doc_directive_timings = {}
+
+
+def source_read(app, docname, source):
+    app.env.temp_data['doc_timings_read'] = time.perf_counter()
+
+
+def doctree_read(app, doctree):
+    env = app.env
+    start = env.temp_data.pop('doc_timings_read', None)
+    if start is None:
+        return
+    if not hasattr(env, 'doc_read_timings'):
+        reset_read_timings(app, env, ())
+    env.doc_read_timings[env.docname] = time.perf_counter() - start
+    env.doc_directive_timings[env.docname] = dict(_directives)
+    _directives.clear()
+
+
+def merge_read_timings(app, env, docnames, other):
+    # Parallel readers time their documents in their own copy of the environment;
+    # only their own documents are taken, as the copy also holds earlier merges
+    if not hasattr(env, 'doc_read_timings'):
+        reset_read_timings(app, env, ())
+    for docname in docnames:
+        if docname in getattr(other, 'doc_read_timings', {}):
+            env.doc_read_timings[docname] = other.doc_read_timings[docname]
+            env.doc_directive_timings[docname] = other.doc_directive_timings[docname]
+
+
+def doctree_resolved(app, doctree, docname):
+    start = _resolve_started.pop(docname, None)
+    if start is not None:
+        _spill(docname, 'resolve', time.perf_counter() - start)
+
+
+def html_page_context(app, pagename, templatename, context, doctree):
+    if pagename in _write_started:
+        _render_started[pagename] = time.perf_counter()
+
+
+def collect_timings(app):
+    """Combine the environment's read timings with every spill file."""
+    documents = {}
+    directives = {}
+    per_doc_directives = getattr(app.env, 'doc_directive_timings', {})
+    for docname, seconds in getattr(app.env, 'doc_read_timings', {}).items():
+        documents[docname] = dict(dict.fromkeys(PHASES, 0.0), read=seconds, directives=0)
+        for name, (count, directive_seconds, cls) in per_doc_directives.get(docname, {}).items():
+            documents[docname]['directives'] += count
+            entry = directives.setdefault(name, {'count': 0, 'seconds': 0.0, 'class': cls})
+            entry['count'] += count
+            entry['seconds'] += directive_seconds
+    for path in sorted(_spill_dir.glob('*.jsonl')) if _spill_dir else ():
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                docname, phase, seconds = json.loads(line)
+                doc = documents.setdefault(docname, dict(dict.fromkeys(PHASES, 0.0), directives=0))
+                doc[phase] += seconds
+    for doc in documents.values():
+        doc['total'] = sum(doc[phase] for phase in PHASES)
+    return (dict(sorted(documents.items(), key=lambda item: -item[1]['total'])),
+            dict(sorted(directives.items(), key=lambda item: -item[1]['seconds'])))
+
+
+def build_finished(app, exception):
+    if exception is not None or _spill_dir is None:
+        return
+    documents, directives = collect_timings(app)
+    totals = {phase: sum(doc[phase] for doc in documents.values()) for phase in PHASES}
+    path = Path(app.config.doc_timings_path or Path(app.outdir).parent / 'timings.json')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        'builder': app.builder.name,
+        'parallel': app.parallel,
+        'totals': totals,
+        'documents': documents,
+        'directives': directives,
+    }, indent=1), encoding='utf-8')
+
+    top = app.config.doc_timings_top
+    logger.info('')
+    if not documents:
+        logger.info('doc_timings: nothing was read or written; see %s', path)
+        return
+    logger.info('doc_timings: %d documents, %s', len(documents),
+                ', '.join(f'{phase} {seconds:.2f}s' for phase, seconds in totals.items()))
+    logger.info('  %-44s %7s %7s %7s %7s %7s', 'slowest documents', *PHASES, 'total')
+    for docname, doc in list(documents.items())[:top]:
+        logger.info('  %-44s %7.3f %7.3f %7.3f %7.3f %7.3f', docname[-44:],
+                    *(doc[phase] for phase in PHASES), doc['total'])
+    logger.info('  %-44s %7s %7s', 'slowest directives', 'count', 'seconds')
+    for name, entry in list(directives.items())[:top]:
+        label = f"{name} ({entry['class']})"
+        logger.info('  %-44s %7d %7.3f', label[-44:], entry['count'], entry['seconds'])
+    logger.info('doc_timings: written to %s', path)
+    shutil.rmtree(_spill_dir, ignore_errors=True)
+
+
+def setup(app):
+    """Time every document phase and directive and report the slowest."""
+    app.add_config_value('doc_timings_path', '', '', types=[str])
+    app.add_config_value('doc_timings_top', 15, '', types=[int])
+
+    _patch(states.Body, 'run_directive', _timed_run_directive)
+    _patch(BuildEnvironment, 'get_and_resolve_doctree', _timed_get_and_resolve_doctree)
+
+    # Start before and finish after the other extensions' handlers
+    app.connect('builder-inited', builder_inited)
+    app.connect('env-before-read-docs', reset_read_timings)
+    app.connect('source-read', source_read, priority=1)
+    app.connect('doctree-read', doctree_read, priority=999)
+    app.connect('env-merge-info', merge_read_timings)
+    app.connect('doctree-resolved', doctree_resolved, priority=999)
+    app.connect('html-page-context', html_page_context, priority=999)
+    app.connect('build-finished', build_finished)
+
+    return {
+        'version': '1.0',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -0,0 +1,267 @@
+"""
+Local Sphinx extension that caches and pre-renders graphviz diagrams.
+
+``sphinx.ext.graphviz`` runs one blocking ``dot`` process per diagram while
+pages are written, and only skips diagrams already present in the output
+directory. This extension gives it a persistent render cache instead:
+
+* Every ``dot`` run made by graphviz goes through a shim that looks the
+  output up in ``~/.cache/viper-sphinx/graphviz`` first. The key covers the
+  dot source, the command line (with output paths left out), the working
+  directory and the ``dot -V`` version, so an upgraded graphviz renders
+  afresh. Outputs are stored as dot wrote them; graphviz still fixes SVG
+  links for the page.
+* Diagrams found while reading are rendered at ``env-updated``, before the
+  write phase, on ``graphviz_cache_jobs`` parallel ``dot`` processes (0: one
+  per CPU). Writing then only copies files out of the cache.
+
+Diagrams produced while writing (inheritance diagrams) are not known in
+advance; they are cached but not pre-rendered. Nothing happens unless
+``sphinx.ext.graphviz`` is loaded.
+"""
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(os.environ.get(
+    'GRAPHVIZ_CACHE_DIR', Path.home() / '.cache' / 'viper-sphinx' / 'graphviz'))
+
+# dot executable -> 'dot -V' output, or None when it cannot be run
+_versions = {}
+
+
+def dot_version(dot):
+    """Return the version banner of ``dot`` (it prints it on stderr), or None."""
+    if dot not in _versions:
+        try:
+            result = subprocess.run([dot, '-V'], capture_output=True, timeout=30)
+            _versions[dot] = (result.stderr or result.stdout).decode(errors='replace').strip()
+        except (OSError, subprocess.SubprocessError):
+            _versions[dot] = None
+    return _versions[dot]
+
+
+def _split_outputs(args):
+    """Return ``(args with output paths replaced by placeholders, output paths)``."""
+    key_args = []
+    outputs = []
+    for arg in args:
+        if arg.startswith('-o'):
+            key_args.append(f'-o{{{len(outputs)}}}')
+            outputs.append(arg[2:])
+        else:
+            key_args.append(arg)
+    return key_args, outputs
+
+
+class RenderCache:
+    """Rendered ``dot`` outputs keyed on everything that shapes them."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, args, code, cwd):
+        """Return ``(cache key, output paths)`` for a dot command, or None if dot is missing."""
+        version = dot_version(args[0])
+        if version is None:
+            return None
+        key_args, outputs = _split_outputs(args)
+        digest = hashlib.sha256('\0'.join(
+            [version, str(cwd), *key_args, '']).encode() + code).hexdigest()
+        return digest, outputs
+
+    def _paths(self, digest, count):
+        return [self.cache_dir / digest[:2] / f'{digest}.{i}' for i in range(count)]
+
+    def has(self, digest, count):
+        return all(path.is_file() for path in self._paths(digest, count))
+
+    def restore(self, digest, outputs):
+        """Copy a cached render to ``outputs``; False when it is not cached."""
+        if not self.has(digest, len(outputs)):
+            return False
+        for path, output in zip(self._paths(digest, len(outputs)), outputs):
+            shutil.copyfile(path, output)
+        return True
+
+    def store(self, digest, outputs):
+        """Keep the files dot wrote to ``outputs`` under ``digest``."""
+        cached = self._paths(digest, len(outputs))
+        cached[0].parent.mkdir(parents=True, exist_ok=True)
+        for path, output in zip(cached, outputs):
+            tmp = path.with_name(f'.{path.name}.tmp{os.getpid()}.{id(output)}')
+            shutil.copyfile(output, tmp)
+            os.replace(tmp, path)
+
+    def run(self, args, input=None, cwd=None, **kwargs):
+        """``subprocess.run`` for dot, answered from the cache when possible."""
+        found = self.key(args, input or b'', cwd)
+        if found is not None:
+            digest, outputs = found
+            if self.restore(digest, outputs):
+                self.hits += 1
+                return subprocess.CompletedProcess(args, 0, b'', b'')
+        result = subprocess.run(args, input=input, cwd=cwd, **kwargs)
+        if found is not None and result.returncode == 0 and all(map(os.path.isfile, outputs)):
+            self.misses += 1
+            self.store(digest, outputs)
+        return result
+
+
+class _SubprocessShim:
+    """Stands in for the ``subprocess`` module inside ``sphinx.ext.graphviz``."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def run(self, args, **kwargs):
+        return self.cache.run(args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(subprocess, name)
+
+
+_cache = None
+
+
+def builder_inited(app):
+    global _cache
+    if 'sphinx.ext.graphviz' not in app.extensions:
+        return
+    from sphinx.ext import graphviz
+
+    _cache = RenderCache(app.config.graphviz_cache_dir or DEFAULT_CACHE_DIR)
+    graphviz.subprocess = _SubprocessShim(_cache)
+
+
+def purge_doc(app, env, docname):
+    getattr(env, 'graphviz_cache_diagrams', {}).pop(docname, None)
+
+
+def doctree_read(app, doctree):
+    """Remember the diagrams of the document for pre-rendering."""
+    if _cache is None:
+        return
+    from sphinx.ext.graphviz import graphviz
+
+    env = app.env
+    if not hasattr(env, 'graphviz_cache_diagrams'):
+        env.graphviz_cache_diagrams = {}
+    diagrams = [(node['code'], dict(node['options']), node.get('filename'))
+                for node in doctree.findall(graphviz)]
+    if diagrams:
+        env.graphviz_cache_diagrams[env.docname] = diagrams
+    else:
+        env.graphviz_cache_diagrams.pop(env.docname, None)
+
+
+def merge_diagrams(app, env, docnames, other):
+    if not hasattr(env, 'graphviz_cache_diagrams'):
+        env.graphviz_cache_diagrams = {}
+    for docname in docnames:
+        if docname in getattr(other, 'graphviz_cache_diagrams', {}):
+            env.graphviz_cache_diagrams[docname] = other.graphviz_cache_diagrams[docname]
+
+
+def _command(app, code, options, format, filename, output):
+    """The dot command and working directory ``render_dot`` would use."""
+    config = app.config
+    args = [options.get('graphviz_dot', config.graphviz_dot), *config.graphviz_dot_args,
+            f'-T{format}', f'-o{output}']
+    if format == 'png':
+        args += ['-Tcmapx', f'-o{output}.map']
+    cwd = (Path(app.srcdir) / (filename or options.get('docname', 'index'))).parent
+    return args, cwd
+
+
+def _prerender(args, code, cwd):
+    """Render one diagram into the cache; returns False if dot failed."""
+    result = subprocess.run(args, input=code, capture_output=True, cwd=cwd)
+    _, outputs = _split_outputs(args)
+    return result.returncode == 0 and all(map(os.path.isfile, outputs))
+
+
+def env_updated(app, env):
+    """Render the diagrams missing from the cache before pages are written."""
+    if _cache is None or app.builder.format != 'html':
+        return
+    format = app.config.graphviz_output_format
+    if format not in ('png', 'svg'):
+        return
+    start = time.perf_counter()
+    total = 0
+    cached = 0
+    jobs = {}
+    with tempfile.TemporaryDirectory(prefix='graphviz-cache-') as tmp:
+        for diagrams in getattr(env, 'graphviz_cache_diagrams', {}).values():
+            for code, options, filename in diagrams:
+                total += 1
+                output = os.path.join(tmp, f'{len(jobs)}.{format}')
+                args, cwd = _command(app, code, options, format, filename, output)
+                found = _cache.key(args, code.encode(), cwd)
+                if found is None:
+                    # graphviz reports the missing dot itself while writing
+                    return
+                digest, outputs = found
+                if digest in jobs:
+                    continue
+                if _cache.has(digest, len(outputs)):
+                    cached += 1
+                    continue
+                jobs[digest] = (args, code.encode(), cwd, outputs)
+        if not jobs:
+            if total:
+                logger.info('graphviz_cache: all %d diagrams cached', total)
+            return
+
+        workers = app.config.graphviz_cache_jobs or os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            futures = {digest: pool.submit(_prerender, args, code, cwd)
+                       for digest, (args, code, cwd, _) in jobs.items()}
+        rendered = 0
+        for digest, future in futures.items():
+            # Failed diagrams are left to graphviz, which reports their errors
+            if future.result():
+                _cache.store(digest, jobs[digest][3])
+                rendered += 1
+    logger.info('graphviz_cache: %d diagrams, %d cached, %d rendered ahead on %d workers in %.2fs',
+                total, cached, rendered, min(workers, len(jobs)), time.perf_counter() - start)
+    if rendered < len(jobs):
+        logger.info('graphviz_cache: %d diagrams failed; graphviz reports them while writing',
+                    len(jobs) - rendered)
+
+
+def build_finished(app, exception):
+    if _cache is not None and (_cache.hits or _cache.misses):
+        logger.info('graphviz_cache: %d diagrams from the cache, %d rendered while writing',
+                    _cache.hits, _cache.misses)
+
+
+def setup(app):
+    """Cache graphviz renders on disk and render them ahead of the write phase."""
+    app.add_config_value('graphviz_cache_dir', '', '', types=[str])
+    app.add_config_value('graphviz_cache_jobs', 0, '', types=[int])
+
+    app.connect('builder-inited', builder_inited)
+    app.connect('env-purge-doc', purge_doc)
+    app.connect('doctree-read', doctree_read)
+    app.connect('env-merge-info', merge_diagrams)
+    app.connect('env-updated', env_updated)
+    app.connect('build-finished', build_finished)
+
+    return {
+        'version': '1.0',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -0,0 +1,242 @@
+"""
+Local Sphinx extension that caches Pygments highlighting across builds.
+
+viper_setup turns on line numbers and captions for every ``code-block`` and
+``literalinclude``, so each block of each page goes through Pygments on a
+full build. ``PygmentsBridge.highlight_block`` is wrapped to look the result
+up in ``~/.cache/viper-sphinx/highlight.sqlite`` first. The key covers the
+code, the language (and custom lexer), the lexer and formatter options
+(``linenos``, ``hl_lines``, ...), the output format, the style and the
+Pygments and Sphinx versions.
+
+Blocks that log a warning while highlighting (a lexing error, an unknown
+lexer) are not cached, so the warning is repeated on every build. Entries
+not used for ``highlight_cache_max_age`` days are dropped at the end of a
+build. Parallel writers are forked processes; each opens its own
+connection. New entries, use times and hit counts are kept in memory and
+written in one transaction after each document is written (and at
+``build-finished``), so the hit rate reported at the end covers every
+process.
+"""
+import functools
+import hashlib
+import logging as stdlib_logging
+import os
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+
+import pygments
+import sphinx
+from sphinx import highlighting
+from sphinx.util import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path(os.environ.get(
+    'HIGHLIGHT_CACHE_PATH', Path.home() / '.cache' / 'viper-sphinx' / 'highlight.sqlite'))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS highlights (
+    key TEXT PRIMARY KEY,
+    html TEXT NOT NULL,
+    used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats (
+    build TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    hits INTEGER NOT NULL,
+    misses INTEGER NOT NULL,
+    PRIMARY KEY (build, pid)
+);
+"""
+
+
+class _WarningSeen(stdlib_logging.Filter):
+    """Notes that sphinx.highlighting logged a warning (the block is then not cached)."""
+
+    def __init__(self):
+        super().__init__()
+        self.seen = False
+
+    def filter(self, record):
+        if record.levelno >= stdlib_logging.WARNING:
+            self.seen = True
+        return True
+
+
+class HighlightCache:
+    """Highlighted blocks in SQLite, one connection per process.
+
+    Writes are buffered until ``flush``.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, build=None):
+        self.path = Path(path)
+        self.build = build or uuid.uuid4().hex
+        self._db = None
+        self._pid = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def db(self):
+        # Forked writers must not share the parent's connection or buffers
+        if self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=30)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=OFF')
+            self._db.executescript(_SCHEMA)
+            self._pid = os.getpid()
+            self.hits = self.misses = 0
+            self._new = {}
+            self._used = set()
+            self._saved = (0, 0)
+        return self._db
+
+    def lookup(self, key):
+        db = self.db
+        html = self._new.get(key)
+        if html is None:
+            row = db.execute('SELECT html FROM highlights WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            html = row[0]
+            self._used.add(key)
+        self.hits += 1
+        return html
+
+    def store(self, key, html):
+        self.db  # sets up this process's buffers
+        self.misses += 1
+        if html is not None:
+            self._new[key] = html
+
+    def flush(self):
+        """Write this process's new entries, use times and counters in one transaction."""
+        if self._pid != os.getpid() or (
+                not self._new and not self._used and self._saved == (self.hits, self.misses)):
+            return
+        now = time.time()
+        self._db.executemany('INSERT OR REPLACE INTO highlights VALUES (?, ?, ?)',
+                             [(key, html, now) for key, html in self._new.items()])
+        self._db.executemany('UPDATE highlights SET used = ? WHERE key = ?',
+                             [(now, key) for key in self._used])
+        self._db.execute('INSERT OR REPLACE INTO stats VALUES (?, ?, ?, ?)',
+                         (self.build, self._pid, self.hits, self.misses))
+        self._db.commit()
+        self._new.clear()
+        self._used.clear()
+        self._saved = (self.hits, self.misses)
+
+    def totals(self):
+        """Return ``(hits, misses)`` of this build across all processes."""
+        row = self.db.execute('SELECT SUM(hits), SUM(misses) FROM stats WHERE build = ?',
+                              (self.build,)).fetchone()
+        return row[0] or 0, row[1] or 0
+
+    def finish(self, max_age_days):
+        """Drop this build's counters and the entries unused for ``max_age_days``."""
+        self.flush()
+        self.db.execute('DELETE FROM stats WHERE build = ?', (self.build,))
+        removed = self.db.execute('DELETE FROM highlights WHERE used < ?',
+                                  (time.time() - max_age_days * 86400,)).rowcount
+        self.db.commit()
+        return removed
+
+
+def _name(obj):
+    cls = obj if isinstance(obj, type) else type(obj)
+    return f'{cls.__module__}.{cls.__qualname__}'
+
+
+def block_key(bridge, source, lang, opts, force, kwargs):
+    """Cache key of one ``highlight_block`` call."""
+    custom = highlighting.lexers.get(lang)
+    parts = [
+        pygments.__version__, sphinx.__version__, bridge.dest, str(bridge.latex_engine),
+        _name(bridge.formatter), _name(bridge.formatter_args['style']),
+        lang, _name(custom) if custom is not None else '', str(force),
+        repr(sorted((opts or {}).items())), repr(sorted(kwargs.items())),
+    ]
+    return hashlib.sha256('\0'.join(parts + [source]).encode()).hexdigest()
+
+
+_cache = None
+
+
+def _cached_highlight_block(original):
+    def highlight_block(self, source, lang, opts=None, force=False, location=None, **kwargs):
+        if _cache is None:
+            return original(self, source, lang, opts, force, location, **kwargs)
+        if not isinstance(source, str):
+            source = source.decode()
+        try:
+            key = block_key(self, source, lang, opts, force, kwargs)
+        except (TypeError, KeyError):
+            # Options that cannot be keyed reliably
+            return original(self, source, lang, opts, force, location, **kwargs)
+        html = _cache.lookup(key)
+        if html is not None:
+            return html
+        watcher = _WarningSeen()
+        highlighting.logger.logger.addFilter(watcher)
+        try:
+            html = original(self, source, lang, opts, force, location, **kwargs)
+        finally:
+            highlighting.logger.logger.removeFilter(watcher)
+        _cache.store(key, None if watcher.seen else html)
+        return html
+    highlight_block.highlight_cache_original = original
+    return highlight_block
+
+
+def _flushing_write_doc(write_doc):
+    # Forked writers end without a hook, so each document's writes are saved
+    # as soon as it is written, in whichever process wrote it
+    @functools.wraps(write_doc)
+    def wrapper(docname, doctree):
+        try:
+            return write_doc(docname, doctree)
+        finally:
+            if _cache is not None:
+                _cache.flush()
+    return wrapper
+
+
+def builder_inited(app):
+    global _cache
+    _cache = HighlightCache(app.config.highlight_cache_path or DEFAULT_CACHE_PATH)
+    bridge = highlighting.PygmentsBridge
+    if not hasattr(bridge.highlight_block, 'highlight_cache_original'):
+        bridge.highlight_block = _cached_highlight_block(bridge.highlight_block)
+    app.builder.write_doc = _flushing_write_doc(app.builder.write_doc)
+
+
+def build_finished(app, exception):
+    if _cache is None:
+        return
+    _cache.flush()
+    hits, misses = _cache.totals()
+    removed = _cache.finish(app.config.highlight_cache_max_age)
+    if hits or misses:
+        logger.info('highlight_cache: %d code blocks, %d from the cache (%.1f%% hit rate), '
+                    '%d highlighted; %d stale entries dropped', hits + misses, hits,
+                    100 * hits / (hits + misses), misses, removed)
+
+
+def setup(app):
+    """Cache Pygments-highlighted code blocks on disk across builds."""
+    app.add_config_value('highlight_cache_path', '', '', types=[str])
+    app.add_config_value('highlight_cache_max_age', 30, '', types=[int, float])
+
+    app.connect('builder-inited', builder_inited)
+    app.connect('build-finished', build_finished)
+
+    return {
+        'version': '1.0',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -0,0 +1,331 @@
+"""
+Local Sphinx extension that serves intersphinx inventories from disk.
+
+Inventories are looked up in a cache directory (``~/.cache/viper-sphinx/
+intersphinx``, refreshed by connected builds) and then in a bundle directory
+(``docs/_intersphinx``, for inventories shipped with the sources). Each
+``objects.inv`` is stored with a JSON record of its URL, SHA-256 and
+validators; the parsed inventory is pickled under a key derived from that
+hash, the target URI and the Sphinx version, so a build loads it without
+decompressing and parsing it again. The loaded inventories are placed in
+the environment before ``sphinx.ext.intersphinx`` runs, which then sees a
+fresh cache entry and makes no request.
+
+``intersphinx_cache_mode`` (or ``VIPER_INTERSPHINX_MODE``) selects:
+
+* ``refresh`` (default): fetch missing inventories once, serve the cached
+  ones, and re-fetch those older than ``intersphinx_cache_max_age`` days in
+  a background thread for the next build.
+* ``offline``: never touch the network. Projects without a stored inventory
+  are dropped from ``intersphinx_mapping`` at ``config-inited``.
+* ``off``: leave intersphinx alone.
+
+Run this file to pre-fetch the inventories named in ``conf.py`` into a
+bundle directory for air-gapped builds::
+
+    python docs/_ext/intersphinx_cache.py --dest docs/_intersphinx
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import pickle
+import posixpath
+import threading
+import time
+from pathlib import Path
+
+INVENTORY_FILENAME = 'objects.inv'
+
+DEFAULT_CACHE_DIR = Path(os.environ.get(
+    'INTERSPHINX_CACHE_DIR', Path.home() / '.cache' / 'viper-sphinx' / 'intersphinx'))
+
+MODES = ('refresh', 'offline', 'off')
+
+# Seconds to wait at the end of the build for a background refresh to land
+REFRESH_JOIN_TIMEOUT = 30
+
+
+def inventory_url(uri, locations):
+    """Return the remote ``objects.inv`` URL of an intersphinx project, or None."""
+    for location in locations or (None,):
+        url = posixpath.join(uri, INVENTORY_FILENAME) if location is None else location
+        if '://' in url:
+            return url
+    return None
+
+
+def _write_atomic(path, data):
+    tmp = path.with_name(f'.{path.name}.tmp{os.getpid()}.{threading.get_ident()}')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+
+
+class InventoryStore:
+    """Stored ``objects.inv`` files, their records and pickled parses."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, bundle_dir=None):
+        self.cache_dir = Path(cache_dir)
+        self.bundle_dir = Path(bundle_dir) if bundle_dir else None
+        self.parsed = 0
+        self.unpickled = 0
+
+    def locate(self, name):
+        """Return ``(inventory path, record)`` for ``name``, or None."""
+        for directory in (self.cache_dir, self.bundle_dir):
+            if directory is None:
+                continue
+            path = directory / f'{name}.inv'
+            if not path.is_file():
+                continue
+            try:
+                record = json.loads((directory / f'{name}.json').read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                # Bundled inventories may come without a record
+                record = {'fetched': path.stat().st_mtime}
+            return path, record
+        return None
+
+    def fetch(self, name, url, timeout=None, dest=None):
+        """Fetch ``url`` into ``dest`` (the cache by default). Returns True if it changed.
+
+        Sends the stored ETag and Last-Modified so an unchanged inventory
+        costs a 304 and no download.
+        """
+        import requests
+
+        dest = Path(dest or self.cache_dir)
+        dest.mkdir(parents=True, exist_ok=True)
+        record_path = dest / f'{name}.json'
+        try:
+            record = json.loads(record_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            record = {}
+        headers = {}
+        if record.get('url') == url and (dest / f'{name}.inv').is_file():
+            if record.get('etag'):
+                headers['If-None-Match'] = record['etag']
+            if record.get('last_modified'):
+                headers['If-Modified-Since'] = record['last_modified']
+
+        response = requests.get(url, headers=headers, timeout=timeout or 30)
+        changed = response.status_code != 304
+        if changed:
+            response.raise_for_status()
+            data = response.content
+            _write_atomic(dest / f'{name}.inv', data)
+            record = {
+                'url': url,
+                'sha256': hashlib.sha256(data).hexdigest(),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+        record['fetched'] = time.time()
+        _write_atomic(record_path, json.dumps(record, indent=1).encode())
+        return changed
+
+    def load(self, name, target_uri):
+        """Return ``(inventory data, fetched time)`` for ``name``, or None."""
+        import sphinx
+        from sphinx.util.inventory import InventoryFile
+
+        found = self.locate(name)
+        if found is None:
+            return None
+        path, record = found
+        raw = None
+        digest = record.get('sha256')
+        if not digest:
+            raw = path.read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()
+        # Parsed entries embed the target URI, and their classes vary by Sphinx version
+        key = hashlib.sha256(f'{digest}\0{target_uri}\0{sphinx.__version__}'.encode()).hexdigest()
+        pickle_path = self.cache_dir / 'parsed' / f'{key}.pickle'
+        try:
+            with open(pickle_path, 'rb') as f:
+                data = pickle.load(f)
+            self.unpickled += 1
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            raw = raw if raw is not None else path.read_bytes()
+            data = InventoryFile.loads(raw, uri=target_uri).data
+            self.parsed += 1
+            try:
+                pickle_path.parent.mkdir(parents=True, exist_ok=True)
+                _write_atomic(pickle_path, pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+            except OSError:
+                pass
+        return data, int(record.get('fetched') or path.stat().st_mtime)
+
+
+class _State:
+    """Per-build settings, the store and the refresh thread."""
+
+    def __init__(self, mode, store):
+        self.mode = mode
+        self.store = store
+        self.refresher = None
+
+
+_state = None
+
+
+def _projects(config):
+    # intersphinx normalises each entry to ``key: (name, (uri, locations))``
+    for key, (name, (uri, locations)) in list(config.intersphinx_mapping.items()):
+        yield key, name, uri, locations
+
+
+def config_inited(app, config):
+    """Choose the mode and, offline, drop projects that have no stored inventory."""
+    from sphinx.util import logging
+    logger = logging.getLogger(__name__)
+    global _state
+
+    mode = os.environ.get('VIPER_INTERSPHINX_MODE') or config.intersphinx_cache_mode
+    if mode not in MODES:
+        logger.warning('intersphinx_cache: unknown mode %r; using "refresh"', mode)
+        mode = 'refresh'
+    if mode == 'off':
+        _state = None
+        return
+    bundle = config.intersphinx_cache_bundle
+    store = InventoryStore(config.intersphinx_cache_dir or DEFAULT_CACHE_DIR,
+                           Path(app.srcdir, bundle) if bundle else None)
+    _state = _State(mode, store)
+
+    if mode == 'offline':
+        for key, name, _, _ in _projects(config):
+            if store.locate(name) is None:
+                logger.warning('intersphinx_cache: no stored inventory for %r; '
+                               'dropped from intersphinx_mapping (offline mode)', name)
+                del config.intersphinx_mapping[key]
+
+
+def _refresh(store, projects, max_age, timeout):
+    from sphinx.util import logging
+    logger = logging.getLogger(__name__)
+    for name, url in projects:
+        found = store.locate(name)
+        if found and time.time() - found[1].get('fetched', 0) < max_age * 86400:
+            continue
+        try:
+            if store.fetch(name, url, timeout):
+                logger.info('intersphinx_cache: refreshed %s for the next build', name)
+        except Exception as e:
+            logger.info('intersphinx_cache: could not refresh %s: %s', name, e)
+
+
+def builder_inited(app):
+    """Place the stored inventories in the environment before intersphinx loads."""
+    from sphinx.ext.intersphinx import InventoryAdapter
+    from sphinx.util import logging
+    logger = logging.getLogger(__name__)
+    if _state is None:
+        return
+
+    store = _state.store
+    timeout = app.config.intersphinx_timeout
+    inventories = InventoryAdapter(app.env)
+    served = []
+    remote = []
+    for _, name, uri, locations in _projects(app.config):
+        url = inventory_url(uri, locations)
+        if url:
+            remote.append((name, url))
+        if _state.mode == 'refresh' and url and store.locate(name) is None:
+            try:
+                store.fetch(name, url, timeout)
+            except Exception as e:
+                # intersphinx will try (and report) on its own
+                logger.info('intersphinx_cache: could not fetch %s: %s', name, e)
+        loaded = store.load(name, uri)
+        if loaded is None:
+            continue
+        data, _ = loaded
+        # A current timestamp keeps intersphinx from re-fetching this build
+        inventories.cache[uri] = (name, int(time.time()), data)
+        served.append(name)
+
+    # Rebuild the merged inventories the way intersphinx does after an update
+    inventories.clear()
+    for name, _, data in sorted(inventories.cache.values(), key=lambda entry: entry[:2]):
+        inventories.named_inventory[name] = data
+        for objtype, objects in data.items():
+            inventories.main_inventory.setdefault(objtype, {}).update(objects)
+
+    if served:
+        logger.info('intersphinx_cache: %d inventories from disk (%d unpickled, %d parsed), mode %s',
+                    len(served), store.unpickled, store.parsed, _state.mode)
+    if _state.mode == 'refresh' and remote:
+        _state.refresher = threading.Thread(
+            target=_refresh, args=(store, remote, app.config.intersphinx_cache_max_age, timeout),
+            name='intersphinx-refresh', daemon=True)
+        _state.refresher.start()
+
+
+def build_finished(app, exception):
+    if _state is not None and _state.refresher is not None:
+        _state.refresher.join(REFRESH_JOIN_TIMEOUT)
+
+
+def setup(app):
+    """Serve intersphinx inventories from the local cache or bundle."""
+    app.setup_extension('sphinx.ext.intersphinx')
+    app.add_config_value('intersphinx_cache_mode', 'refresh', '', types=[str])
+    app.add_config_value('intersphinx_cache_dir', '', '', types=[str])
+    app.add_config_value('intersphinx_cache_bundle', '_intersphinx', '', types=[str])
+    app.add_config_value('intersphinx_cache_max_age', 1, '', types=[int, float])
+
+    # After intersphinx normalises the mapping (800), before it loads inventories (500)
+    app.connect('config-inited', config_inited, priority=900)
+    app.connect('builder-inited', builder_inited, priority=400)
+    app.connect('build-finished', build_finished)
+
+    return {
+        'version': '1.0',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
+
+
+def configured_mapping(conf_path):
+    """Read the literal ``intersphinx_mapping`` from ``conf.py`` without running it."""
+    tree = ast.parse(Path(conf_path).read_text(encoding='utf-8'))
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and any(
+                isinstance(t, ast.Name) and t.id == 'intersphinx_mapping' for t in node.targets):
+            return ast.literal_eval(node.value)
+    return {}
+
+
+def main(argv=None):
+    """Pre-fetch the configured inventories into a bundle directory."""
+    docs_dir = Path(__file__).resolve().parent.parent
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--conf', type=Path, default=docs_dir / 'conf.py',
+                        help='conf.py holding intersphinx_mapping (default: docs/conf.py)')
+    parser.add_argument('--dest', type=Path, default=docs_dir / '_intersphinx',
+                        help='Bundle directory to write (default: docs/_intersphinx)')
+    parser.add_argument('--timeout', type=float, default=30, help='Request timeout in seconds')
+    args = parser.parse_args(argv)
+
+    store = InventoryStore(args.dest)
+    failed = 0
+    for name, (uri, location) in configured_mapping(args.conf).items():
+        locations = location if isinstance(location, tuple) else (location,)
+        url = inventory_url(uri, locations)
+        if url is None:
+            print(f"  - {name}: local inventory, nothing to fetch")
+            continue
+        try:
+            changed = store.fetch(name, url, args.timeout)
+            print(f"  ✓ {name}: {'updated' if changed else 'unchanged'} from {url}")
+        except Exception as e:
+            failed += 1
+            print(f"  ✗ {name}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    exit(main())
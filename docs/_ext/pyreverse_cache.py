@@ -0,0 +1,284 @@
+"""
+Local Sphinx extension that caches the diagrams of the ``uml`` directive.
+
+``sphinx_pyreverse`` runs ``pyreverse`` (an astroid parse of the whole
+module tree, then ``dot`` for image formats) for every diagrammed module on
+every build, and again in each parallel reader. This extension keeps the
+generated files in ``~/.cache/viper-sphinx/pyreverse`` under a key made of
+the pyreverse command (module and ``sphinx_pyreverse_*`` options), the pylint
+and dot versions, and the content hash of every ``.py`` file of the module.
+A hit copies the files into ``uml_images`` without running pyreverse.
+
+Before the sources are read, the documents about to be read are scanned for
+``uml`` directives and the modules missing from the cache are generated on
+``pyreverse_cache_jobs`` parallel processes (0: one per CPU), each in its
+own directory.
+
+Only the module's own files are hashed; a diagram showing ancestors from
+other packages is not regenerated when those change; remove the cache
+directory to force it. Modules whose files cannot be found are never cached.
+
+sphinx_pyreverse has no public hooks for this: the cache replaces its
+``subproc_wrapper``, and pre-generation reuses the ``_build_command`` and
+``DIR_NAME`` of its directive (the version is pinned in the requirements).
+When a release drops them, a warning is logged and the directive generates
+the diagrams as usual.
+"""
+import copy
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from sphinx.util import logging
+
+from graphviz_cache import dot_version
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = Path(os.environ.get(
+    'PYREVERSE_CACHE_DIR', Path.home() / '.cache' / 'viper-sphinx' / 'pyreverse'))
+
+# pyreverse writes these formats itself; any other one goes through dot
+NATIVE_FORMATS = ('dot', 'vcg', 'puml', 'plantuml', 'mmd', 'html')
+
+# (path, mtime_ns, size) -> content hash, for files hashed in this process
+_file_hashes = {}
+
+
+def module_path(module_name, cwd, search_path=None):
+    """Return the package directory or ``.py`` file pyreverse will analyse, or None."""
+    direct = Path(cwd, module_name)
+    if direct.exists():
+        return direct
+    parts = module_name.split('.')
+    for entry in search_path if search_path is not None else sys.path:
+        base = Path(entry or cwd, *parts)
+        if base.is_dir() and (base / '__init__.py').is_file():
+            return base
+        if base.with_suffix('.py').is_file():
+            return base.with_suffix('.py')
+    return None
+
+
+def _file_hash(path):
+    stat = path.stat()
+    key = (str(path), stat.st_mtime_ns, stat.st_size)
+    if key not in _file_hashes:
+        _file_hashes[key] = hashlib.sha256(path.read_bytes()).hexdigest()
+    return _file_hashes[key]
+
+
+def _dist_version(name):
+    try:
+        from importlib import metadata
+        return metadata.version(name)
+    except Exception:
+        return None
+
+
+def _tool_version(cmd):
+    version = _dist_version('pylint')
+    output = cmd[cmd.index('--output') + 1] if '--output' in cmd else 'dot'
+    if output not in NATIVE_FORMATS:
+        version = f'{version}\0{dot_version("dot")}'
+    return version
+
+
+class DiagramCache:
+    """pyreverse outputs keyed on the command, tool versions and module contents."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, cmd, cwd):
+        """Return the cache key of a pyreverse command, or None if its module is not found."""
+        root = module_path(cmd[-1], cwd)
+        if root is None:
+            return None
+        files = sorted(root.rglob('*.py')) if root.is_dir() else [root]
+        digest = hashlib.sha256(json.dumps([cmd, _tool_version(cmd)]).encode())
+        for path in files:
+            if '__pycache__' not in path.parts:
+                digest.update(f'{path.relative_to(root.parent)}\0{_file_hash(path)}\0'.encode())
+        return digest.hexdigest()
+
+    def _dir(self, key):
+        return self.cache_dir / key[:2] / key
+
+    def has(self, key):
+        return self._dir(key).is_dir()
+
+    def restore(self, key, dest):
+        """Copy the cached outputs into ``dest``; False when they are not cached."""
+        cached = self._dir(key)
+        if not cached.is_dir():
+            return False
+        for path in cached.iterdir():
+            shutil.copyfile(path, Path(dest, path.name))
+        return True
+
+    def store(self, key, cmd, src):
+        """Keep the files pyreverse wrote to ``src`` for the module of ``cmd``."""
+        project = cmd[cmd.index('--project') + 1]
+        # uml_images is shared: classes_bar_foo.png belongs to bar_foo, not foo
+        stems = {f'classes_{project}', f'packages_{project}'}
+        outputs = [path for path in Path(src).iterdir()
+                   if path.is_file() and path.stem in stems]
+        if not outputs:
+            return
+        cached = self._dir(key)
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f'.{key}.', dir=cached.parent))
+        for path in outputs:
+            shutil.copyfile(path, tmp / path.name)
+        try:
+            os.replace(tmp, cached)
+        except OSError:
+            # Another process stored it first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+
+_cache = None
+_original_subproc = None
+# UMLGenerateDirective internals used to pre-generate; None when missing
+_build_command = None
+_dir_name = None
+
+
+def _subprocess_env():
+    # Same as the directive: pyreverse must find what the build can import
+    env = copy.deepcopy(os.environ)
+    env.setdefault('PYTHONPATH', ':'.join(sys.path))
+    return env
+
+
+def cached_subproc(cmd, cwd=None, **kwargs):
+    """Stands in for ``sphinx_pyreverse``'s ``subproc_wrapper``."""
+    key = _cache.key(cmd, cwd) if _cache is not None else None
+    if key is not None and _cache.restore(key, cwd):
+        _cache.hits += 1
+        return
+    _original_subproc(cmd, cwd=cwd, **kwargs)
+    if key is not None:
+        _cache.misses += 1
+        _cache.store(key, cmd, cwd)
+
+
+def builder_inited(app):
+    global _cache, _original_subproc, _build_command, _dir_name
+    _cache = _build_command = _dir_name = None
+    if 'sphinx_pyreverse' not in app.extensions:
+        return
+    version = _dist_version('sphinx-pyreverse')
+    try:
+        from sphinx_pyreverse import UMLGenerateDirective, uml_generate_directive
+        wrapper = uml_generate_directive.subproc_wrapper
+    except (ImportError, AttributeError) as e:
+        logger.warning('pyreverse_cache: sphinx_pyreverse %s lacks the hook the cache needs (%s); '
+                       'diagrams are not cached', version, e)
+        return
+
+    _cache = DiagramCache(app.config.pyreverse_cache_dir or DEFAULT_CACHE_DIR)
+    if wrapper is not cached_subproc:
+        _original_subproc = wrapper
+        uml_generate_directive.subproc_wrapper = cached_subproc
+
+    build_command = getattr(UMLGenerateDirective, '_build_command', None)
+    dir_name = getattr(UMLGenerateDirective, 'DIR_NAME', None)
+    if not callable(build_command) or not isinstance(dir_name, str):
+        logger.warning('pyreverse_cache: sphinx_pyreverse %s lacks _build_command or DIR_NAME; '
+                       'diagrams are cached but not generated ahead', version)
+        return
+    _build_command, _dir_name = build_command, dir_name
+
+
+def _generate(cmd, key):
+    """Run pyreverse in a scratch directory and store its outputs; False on failure."""
+    with tempfile.TemporaryDirectory(prefix='pyreverse-cache-') as tmp:
+        try:
+            result = subprocess.run(cmd, cwd=tmp, env=_subprocess_env(), capture_output=True)
+        except OSError:
+            # pyreverse not on PATH; the directive reports it
+            return False
+        if result.returncode != 0:
+            return False
+        _cache.store(key, cmd, tmp)
+    return True
+
+
+def pregenerate(app, env, added, changed, removed):
+    """Generate the diagrams of the documents about to be read that are not cached."""
+    global _build_command
+    if _cache is None or _build_command is None:
+        return []
+
+    name = os.environ.get('SPHINX_PYREVERSE_DIRECTIVE', 'uml')
+    pattern = re.compile(rf'^[ \t]*\.\.[ \t]+{re.escape(name)}::[ \t]+(\S+)', re.MULTILINE)
+    uml_dir = Path(app.srcdir) / _dir_name
+    modules = set()
+    for docname in added | changed:
+        try:
+            text = Path(env.doc2path(docname)).read_text(encoding='utf-8', errors='replace')
+        except OSError:
+            continue
+        modules.update(pattern.findall(text))
+
+    start = time.perf_counter()
+    jobs = {}
+    for module in sorted(modules):
+        if (uml_dir / module).exists():
+            # A path relative to uml_images; left to the directive
+            continue
+        try:
+            cmd = _build_command(None, module, app.config)
+        except (TypeError, AttributeError) as e:
+            logger.warning('pyreverse_cache: cannot build pyreverse commands with sphinx_pyreverse '
+                           '%s (%s); diagrams are not generated ahead', _dist_version('sphinx-pyreverse'), e)
+            _build_command = None
+            return []
+        key = _cache.key(cmd, uml_dir)
+        if key is not None and not _cache.has(key):
+            jobs[key] = cmd
+    if not jobs:
+        return []
+
+    workers = app.config.pyreverse_cache_jobs or os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        generated = sum(pool.map(_generate, jobs.values(), jobs.keys()))
+    # Failed modules are left to the directive, which logs pyreverse's output
+    logger.info('pyreverse_cache: %d of %d modules generated ahead on %d workers in %.2fs',
+                generated, len(jobs), min(workers, len(jobs)), time.perf_counter() - start)
+    return []
+
+
+def build_finished(app, exception):
+    if _cache is not None and (_cache.hits or _cache.misses):
+        logger.info('pyreverse_cache: %d diagrams from the cache, %d generated while reading',
+                    _cache.hits, _cache.misses)
+
+
+def setup(app):
+    """Cache pyreverse diagrams on disk and generate the missing ones in parallel."""
+    app.add_config_value('pyreverse_cache_dir', '', '', types=[str])
+    app.add_config_value('pyreverse_cache_jobs', 0, '', types=[int])
+
+    app.connect('builder-inited', builder_inited)
+    # Last, once every extension has added the documents it needs read
+    app.connect('env-get-outdated', pregenerate, priority=900)
+    app.connect('build-finished', build_finished)
+
+    return {
+        'version': '1.0',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
@@ -0,0 +1,212 @@
+"""
+Local Sphinx extension with the container's documentation tweaks.
+
+Registers fallback directives and roles for optional extensions (only those
+the sources use, as found by extension_usage), adds line numbers and
+language captions to every code block, and fills in ``Latest`` versions in
+``sphinx-packages.rst``. Everything here is registered once in
+``setup``; the only per-build state, the time spent filling in versions, is
+kept on the environment and merged across parallel readers.
+"""
+
+import functools
+import os
+
+# literalinclude captions by file extension (case-sensitive: .C is C++)
+CAPTIONS = {
+    '.py': 'Python',
+    '.rst': 'RST',
+    '.js': 'JavaScript',
+    '.yml': 'YAML', '.yaml': 'YAML',
+    '.c': 'C', '.h': 'C',
+    '.C': 'C++', '.cpp': 'C++', '.cxx': 'C++', '.hpp': 'C++', '.hxx': 'C++',
+    '.json': 'JSON',
+}
+
+
+# Fallback directives for optional extensions: rendered as literal blocks of
+# their content ('block') or of their argument ('file')
+FALLBACK_DIRECTIVES = {
+    'schematic': 'block', 'chart': 'file', 'diagrams': 'block', 'pyreverse': 'block',
+    'refdoc': 'block', 'refdoc-module': 'block', 'refdoc-package': 'block', 'refdoc-index': 'block',
+    'git_changelog': 'block', 'gitlog': 'block', 'gitcompare': 'block', 'gitcontributors': 'block',
+    'gitblame': 'block', 'gitstats': 'block', 'gitcurrent': 'block', 'gitbuildinfo': 'block',
+    'gitreleasenotes': 'block', 'gitchangelog': 'block', 'gitsubmodule': 'block', 'grid': 'block',
+}
+
+# Registered when sphinx_kml is not loaded
+KML_FALLBACK_DIRECTIVES = {
+    'kml': 'block', 'kml-file': 'file', 'kml-download': 'file', 'kml-export': 'block',
+}
+
+# Fallback roles for optional extensions, rendered as inline literals
+FALLBACK_ROLES = (
+    'gitrepo', 'gitcommit', 'gitbranch', 'gittag', 'gitfile', 'gitpr', 'gitmr', 'gitauthor',
+    'issue', 'pr', 'user', 'commit', 'refdoc',
+)
+
+
+@functools.lru_cache(maxsize=None)
+def caption_for(filename):
+    """Caption for a ``literalinclude`` without ``:language:``, from its extension."""
+    return CAPTIONS.get(os.path.splitext(filename)[1], 'Code')
+
+
+def setup(app):
+    """Add line numbers and language captions to all code blocks by default."""
+    from sphinx.directives.code import CodeBlock
+    from sphinx.directives.code import LiteralInclude
+    from collections import defaultdict
+    from docutils import nodes
+    from docutils.parsers.rst import Directive
+    from docutils.parsers.rst import directives
+    from docutils.parsers.rst import roles
+    import time
+    from sphinx.util import logging
+    from dist_index import get_index  # project root, on sys.path via conf.py
+    from extension_usage import get_usage
+    logger = logging.getLogger(__name__)
+    def _any_option_spec():
+        return defaultdict(lambda: directives.unchanged)
+
+    class LiteralBlockDirective(Directive):
+        has_content = True
+        optional_arguments = 1
+        final_argument_whitespace = True
+        option_spec = _any_option_spec()
+
+        def run(self):
+            text = '\n'.join(self.content)
+            return [nodes.literal_block(text, text)]
+
+    class FileLiteralDirective(Directive):
+        required_arguments = 1
+        optional_arguments = 10
+        final_argument_whitespace = True
+        has_content = True
+        option_spec = _any_option_spec()
+
+        def run(self):
+            text = self.arguments[0]
+            return [nodes.literal_block(text, text)]
+
+    def generic_role(name, rawtext, text, lineno, inliner, options=None, content=None):
+        options = options or {}
+        node = nodes.literal(text, text)
+        return [node], []
+
+    # Only what the sources use, like the extension list in conf.py
+    usage = get_usage(app.srcdir)
+    register_all = os.environ.get('VIPER_LAZY_EXTENSIONS', '1') == '0'
+    fallbacks = dict(FALLBACK_DIRECTIVES)
+    if 'sphinx_kml' not in app.config.extensions:
+        fallbacks.update(KML_FALLBACK_DIRECTIVES)
+    kinds = {'block': LiteralBlockDirective, 'file': FileLiteralDirective}
+    directive_count = role_count = 0
+    for name, kind in fallbacks.items():
+        if register_all or usage.uses_directive(name):
+            app.add_directive(name, kinds[kind])
+            directive_count += 1
+    for name in FALLBACK_ROLES:
+        if register_all or usage.uses_role(name):
+            roles.register_local_role(name, generic_role)
+            role_count += 1
+    logger.verbose('viper_setup: %d/%d fallback directives and %d/%d roles registered',
+                   directive_count, len(fallbacks), role_count, len(FALLBACK_ROLES))
+
+    # Store original run methods
+    original_code_block_run = CodeBlock.run
+    original_literal_include_run = LiteralInclude.run
+    
+    def code_block_run_with_enhancements(self):
+        # Add linenos option if not explicitly set to False
+        if 'linenos' not in self.options and 'no-linenos' not in self.options:
+            self.options['linenos'] = True
+            self.options['lineno-start'] = 1
+        
+        # Add caption with language if not already present
+        if 'caption' not in self.options and 'name' not in self.options:
+            language = self.arguments[0] if self.arguments else 'text'       
+            self.options['caption'] = language
+        
+        return original_code_block_run(self)
+    
+    def literal_include_run_with_enhancements(self):
+        # Add linenos option if not explicitly set to False
+        if 'linenos' not in self.options and 'no-linenos' not in self.options:
+            self.options['linenos'] = True
+        
+        # Add caption with language if not already present
+        if 'caption' not in self.options and 'name' not in self.options:
+            language = self.options.get('language', '')
+            if language:
+                self.options['caption'] = language
+            else:
+                # Try to guess from file extension
+                filename = self.arguments[0] if self.arguments else ''
+                self.options['caption'] = caption_for(filename)
+        
+        return original_literal_include_run(self)
+    
+    # Monkey patch the run methods
+    CodeBlock.run = code_block_run_with_enhancements
+    LiteralInclude.run = literal_include_run_with_enhancements
+
+    def replace_latest_versions(app, docname, source):
+        if 'sphinx-packages' not in docname:
+            return
+        start = time.perf_counter()
+        # Built once per process, rebuilt only when site-packages changes
+        versions = get_index()
+        lines = source[0].splitlines()
+        out = []
+        current = None
+        for line in lines:
+            stripped = line.strip()
+            if stripped.startswith('* - '):
+                name = stripped[4:].strip()
+                if name in {'Name', 'Version', 'PyPI', 'API', 'Manual', 'Tutorial', 'Description'}:
+                    current = None
+                else:
+                    current = name
+                out.append(line)
+                continue
+            if current and stripped == '- Latest':
+                # Canonical-name lookup covers the -, _ and . spellings
+                ver = versions.version(current)
+                out.append(line.replace('Latest', ver if ver else 'Not installed'))
+                current = None
+                continue
+            out.append(line)
+        source[0] = "\n".join(out)
+        app.env.viper_version_seconds = getattr(app.env, 'viper_version_seconds', 0.0) + (
+            time.perf_counter() - start)
+
+    def reset_version_timing(app, env, docnames):
+        env.viper_version_seconds = 0.0
+
+    def merge_version_timing(app, env, docnames, other):
+        # Parallel readers time the hook in their own copy of the environment
+        env.viper_version_seconds = getattr(env, 'viper_version_seconds', 0.0) + getattr(
+            other, 'viper_version_seconds', 0.0)
+
+    def report_version_timing(app, exception):
+        seconds = getattr(app.env, 'viper_version_seconds', 0.0)
+        if seconds:
+            logger.info('viper_setup: version table lookups took %.3fs', seconds)
+        captions = caption_for.cache_info()
+        if captions.hits or captions.misses:
+            # Counted in this process only; parallel readers keep their own
+            logger.info('viper_setup: literalinclude captions: %d lookups, %d cached',
+                        captions.hits + captions.misses, captions.hits)
+
+    app.connect('source-read', replace_latest_versions)
+    app.connect('env-before-read-docs', reset_version_timing)
+    app.connect('env-merge-info', merge_version_timing)
+    app.connect('build-finished', report_version_timing)
+
+    return {
+        'version': '1.0',
+        'parallel_read_safe': True,
+        'parallel_write_safe': True,
+    }
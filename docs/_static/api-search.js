@@ -0,0 +1,140 @@
+// Search across the Sphinx pages and every pdoc API tree using the prefix
+// index written by search_index.py into _static/search/. Only the manifest,
+// the token shards for the typed prefixes and the entry chunks of the shown
+// results are fetched.
+(function() {
+    var BASE = 'search/';
+    var MAX_RESULTS = 50;
+    var DEBOUNCE_MS = 150;
+
+    var manifest = null;
+    var shards = {};
+    var chunks = {};
+    var latest = 0;
+
+    function fetchJSON(url) {
+        return fetch(url).then(function(response) {
+            if (!response.ok) throw new Error(url + ': HTTP ' + response.status);
+            return response.json();
+        });
+    }
+
+    function cached(cache, key, url) {
+        if (!(key in cache)) cache[key] = fetchJSON(url);
+        return cache[key];
+    }
+
+    function loadManifest() {
+        if (!manifest) manifest = fetchJSON(BASE + 'index.json');
+        return manifest;
+    }
+
+    // Same rules as search_index.tokenize for a typed word
+    function words(query) {
+        return (query.toLowerCase().match(/[a-z0-9_]+/g) || [])
+            .map(function(word) { return word.replace(/^_+|_+$/g, ''); })
+            .filter(function(word) { return word.length >= 2; });
+    }
+
+    // Entry ids for one word: exact token first, then longer tokens it prefixes
+    function matchWord(index, word) {
+        var key = word.slice(0, index.prefix);
+        if (index.shards.indexOf(key) < 0) return Promise.resolve([]);
+        return cached(shards, key, BASE + 't/' + key + '.json').then(function(tokens) {
+            var ids = (tokens[word] || []).slice();
+            Object.keys(tokens)
+                .filter(function(token) { return token !== word && token.indexOf(word) === 0; })
+                .sort(function(a, b) { return a.length - b.length; })
+                .forEach(function(token) { ids = ids.concat(tokens[token]); });
+            var seen = new Set();
+            return ids.filter(function(id) {
+                if (seen.has(id)) return false;
+                seen.add(id);
+                return true;
+            });
+        });
+    }
+
+    function search(query) {
+        var terms = words(query);
+        if (!terms.length) return Promise.resolve([]);
+        return loadManifest().then(function(index) {
+            return Promise.all(terms.map(function(word) { return matchWord(index, word); }))
+                .then(function(lists) {
+                    // Every word must match; rank by the most selective word
+                    lists.sort(function(a, b) { return a.length - b.length; });
+                    var others = lists.slice(1).map(function(ids) { return new Set(ids); });
+                    var ids = lists[0].filter(function(id) {
+                        return others.every(function(set) { return set.has(id); });
+                    }).slice(0, MAX_RESULTS);
+                    return Promise.all(ids.map(function(id) {
+                        var n = Math.floor(id / index.chunk);
+                        return cached(chunks, n, BASE + 'e/' + n + '.json').then(function(entries) {
+                            return entries[id % index.chunk];
+                        });
+                    }));
+                });
+        });
+    }
+
+    function render(results, query, status, list) {
+        list.innerHTML = '';
+        if (!query) {
+            status.textContent = '';
+            return;
+        }
+        status.textContent = results.length
+            ? 'Showing ' + results.length + (results.length === MAX_RESULTS ? '+' : '') + ' matches'
+            : 'No matches for "' + query + '"';
+        results.forEach(function(entry) {
+            var item = document.createElement('li');
+            var link = document.createElement('a');
+            link.href = '../' + entry[2];
+            link.textContent = entry[0];
+            item.appendChild(link);
+
+            var kind = document.createElement('span');
+            kind.className = 'api-search-kind';
+            kind.textContent = entry[4] ? entry[1] + ' · ' + entry[4] : entry[1];
+            item.appendChild(kind);
+
+            if (entry[3]) {
+                var summary = document.createElement('div');
+                summary.className = 'api-search-summary';
+                summary.textContent = entry[3];
+                item.appendChild(summary);
+            }
+            list.appendChild(item);
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        var input = document.getElementById('api-search-query');
+        var status = document.getElementById('api-search-status');
+        var list = document.getElementById('api-search-results');
+        var timer = null;
+
+        function run() {
+            var query = input.value.trim();
+            var request = ++latest;
+            history.replaceState(null, '', query ? '?q=' + encodeURIComponent(query) : location.pathname);
+            search(query).then(function(results) {
+                // Ignore answers to queries the user has typed past
+                if (request === latest) render(results, query, status, list);
+            }).catch(function(error) {
+                if (request === latest) status.textContent = 'Search index unavailable (' + error.message + ')';
+            });
+        }
+
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            timer = setTimeout(run, DEBOUNCE_MS);
+        });
+
+        var initial = new URLSearchParams(location.search).get('q');
+        if (initial) {
+            input.value = initial;
+            run();
+        }
+    });
+})();
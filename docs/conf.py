@@ -5,6 +5,7 @@ import sys
 # Add project root and tutorials/packages to Python path
 sys.path.insert(0, os.path.abspath('..'))
 sys.path.insert(0, os.path.abspath('tutorials/packages'))
+sys.path.insert(0, os.path.abspath('_ext'))
 
 # -- Register asyncio directives early (before parsing) ---------------------
 # These must be registered at module load time to prevent "unknown directive" warnings
@@ -61,16 +62,30 @@ extensions = [
     'sphinx_prompt',
     'sphinx_pyreverse',
     # 'sphinx_charts.charts',  # Disabled for Windows testing - requires sphinx_math_dollar
+    'viper_setup',  # Local: fallback directives, code-block captions, version table (_ext/)
+    'doc_timings',  # Local: per-document phase and directive timings in _build/timings.json (_ext/)
+    'intersphinx_cache',  # Local: intersphinx inventories from disk, offline mode (_ext/)
+    'graphviz_cache',  # Local: persistent dot render cache, diagrams rendered ahead in parallel (_ext/)
+    'pyreverse_cache',  # Local: uml diagrams cached on module content hashes, generated in parallel (_ext/)
+    'highlight_cache',  # Local: Pygments output cached across builds, hit rate logged (_ext/)
 ]
 
 # Optional legacy extension: sphinx_kml may be incompatible with newer Sphinx
-KML_AVAILABLE = False
-try:
-    import sphinx_kml  # noqa: F401
-    extensions.append('sphinx_kml')
-    KML_AVAILABLE = True
-except Exception:
-    KML_AVAILABLE = False
+# (viper_setup registers fallback kml directives when it is missing).
+# Only probed when some source uses a kml directive.
+from extension_usage import get_usage, select_extensions  # project root
+
+if get_usage(os.path.dirname(os.path.abspath(__file__))).uses_directive('kml', 'kml-*'):
+    try:
+        import sphinx_kml  # noqa: F401
+        extensions.append('sphinx_kml')
+    except Exception:
+        pass
+
+# Load only the extensions whose directives, roles or file types the sources
+# use (pre-scan cached in _build/.extension-usage.json; VIPER_LAZY_EXTENSIONS=0
+# loads them all)
+extensions = select_extensions(extensions, os.path.dirname(os.path.abspath(__file__)))
 
 templates_path = ['_templates']
 exclude_patterns = ['_build', 'Thumbs.db', '.DS_Store']
@@ -139,6 +154,11 @@ intersphinx_mapping = {
     'sphinx': ('https://www.sphinx-doc.org/en/master', None),
 }
 
+# Inventories are served from ~/.cache/viper-sphinx/intersphinx or _intersphinx/
+# (see _ext/intersphinx_cache.py); set VIPER_INTERSPHINX_MODE=offline for
+# air-gapped builds
+intersphinx_cache_mode = 'refresh'
+
 # Napoleon settings
 napoleon_google_docstring = True
 napoleon_numpy_docstring = True
@@ -161,177 +181,3 @@ myst_enable_extensions = [
     "substitution",
     "tasklist",
 ]
-
-# -- Custom setup function to add line numbers to all code blocks -----------
-def setup(app):
-    """Add line numbers and language captions to all code blocks by default."""
-    from sphinx.directives.code import CodeBlock
-    from sphinx.directives.code import LiteralInclude
-    from collections import defaultdict
-    from docutils import nodes
-    from docutils.parsers.rst import Directive
-    from docutils.parsers.rst import directives
-    from docutils.parsers.rst import roles
-    from importlib import metadata
-    def _any_option_spec():
-        return defaultdict(lambda: directives.unchanged)
-
-    class LiteralBlockDirective(Directive):
-        has_content = True
-        optional_arguments = 1
-        final_argument_whitespace = True
-        option_spec = _any_option_spec()
-
-        def run(self):
-            text = '\n'.join(self.content)
-            return [nodes.literal_block(text, text)]
-
-    class FileLiteralDirective(Directive):
-        required_arguments = 1
-        optional_arguments = 10
-        final_argument_whitespace = True
-        has_content = True
-        option_spec = _any_option_spec()
-
-        def run(self):
-            text = self.arguments[0]
-            return [nodes.literal_block(text, text)]
-
-    def generic_role(name, rawtext, text, lineno, inliner, options=None, content=None):
-        options = options or {}
-        node = nodes.literal(text, text)
-        return [node], []
-
-    if not KML_AVAILABLE:
-        app.add_directive('kml', LiteralBlockDirective)
-        app.add_directive('kml-file', FileLiteralDirective)
-        app.add_directive('kml-download', FileLiteralDirective)
-        app.add_directive('kml-export', LiteralBlockDirective)
-
-    # Fallback directives for optional extensions
-    app.add_directive('schematic', LiteralBlockDirective)
-    app.add_directive('chart', FileLiteralDirective)
-    app.add_directive('diagrams', LiteralBlockDirective)
-    app.add_directive('pyreverse', LiteralBlockDirective)
-    app.add_directive('refdoc', LiteralBlockDirective)
-    app.add_directive('refdoc-module', LiteralBlockDirective)
-    app.add_directive('refdoc-package', LiteralBlockDirective)
-    app.add_directive('refdoc-index', LiteralBlockDirective)
-    app.add_directive('git_changelog', LiteralBlockDirective)
-    app.add_directive('gitlog', LiteralBlockDirective)
-    app.add_directive('gitcompare', LiteralBlockDirective)
-    app.add_directive('gitcontributors', LiteralBlockDirective)
-    app.add_directive('gitblame', LiteralBlockDirective)
-    app.add_directive('gitstats', LiteralBlockDirective)
-    app.add_directive('gitcurrent', LiteralBlockDirective)
-    app.add_directive('gitbuildinfo', LiteralBlockDirective)
-    app.add_directive('gitreleasenotes', LiteralBlockDirective)
-    app.add_directive('gitchangelog', LiteralBlockDirective)
-    app.add_directive('gitsubmodule', LiteralBlockDirective)
-    app.add_directive('grid', LiteralBlockDirective)
-
-    # Fallback roles for optional extensions
-    roles.register_local_role('gitrepo', generic_role)
-    roles.register_local_role('gitcommit', generic_role)
-    roles.register_local_role('gitbranch', generic_role)
-    roles.register_local_role('gittag', generic_role)
-    roles.register_local_role('gitfile', generic_role)
-    roles.register_local_role('gitpr', generic_role)
-    roles.register_local_role('gitmr', generic_role)
-    roles.register_local_role('gitauthor', generic_role)
-    roles.register_local_role('issue', generic_role)
-    roles.register_local_role('pr', generic_role)
-    roles.register_local_role('user', generic_role)
-    roles.register_local_role('commit', generic_role)
-    roles.register_local_role('refdoc', generic_role)
-    
-    # Store original run methods
-    original_code_block_run = CodeBlock.run
-    original_literal_include_run = LiteralInclude.run
-    
-    def code_block_run_with_enhancements(self):
-        # Add linenos option if not explicitly set to False
-        if 'linenos' not in self.options and 'no-linenos' not in self.options:
-            self.options['linenos'] = True
-            self.options['lineno-start'] = 1
-        
-        # Add caption with language if not already present
-        if 'caption' not in self.options and 'name' not in self.options:
-            language = self.arguments[0] if self.arguments else 'text'       
-            self.options['caption'] = language
-        
-        return original_code_block_run(self)
-    
-    def literal_include_run_with_enhancements(self):
-        # Add linenos option if not explicitly set to False
-        if 'linenos' not in self.options and 'no-linenos' not in self.options:
-            self.options['linenos'] = True
-        
-        # Add caption with language if not already present
-        if 'caption' not in self.options and 'name' not in self.options:
-            language = self.options.get('language', '')
-            if language:
-                self.options['caption'] = language
-            else:
-                # Try to guess from file extension
-                filename = self.arguments[0] if self.arguments else ''
-                if filename.endswith('.py'):
-                    self.options['caption'] = 'Python'
-                elif filename.endswith('.rst'):
-                    self.options['caption'] = 'RST'
-                elif filename.endswith('.js'):
-                    self.options['caption'] = 'JavaScript'
-                elif filename.endswith(('.yml', '.yaml')):
-                    self.options['caption'] = 'YAML'
-                elif filename.endswith(('.c', '.h')):
-                    self.options['caption'] = 'C'
-                elif filename.endswith(('.C', '.cpp', '.cxx', '.h', '.hpp', '.hxx')):
-                    self.options['caption'] = 'C++'
-                elif filename.endswith('.json'):
-                    self.options['caption'] = 'JSON'
-                else:
-                    self.options['caption'] = 'Code'
-        
-        return original_literal_include_run(self)
-    
-    # Monkey patch the run methods
-    CodeBlock.run = code_block_run_with_enhancements
-    LiteralInclude.run = literal_include_run_with_enhancements
-
-    def replace_latest_versions(app, docname, source):
-        if 'sphinx-packages' not in docname:
-            return
-        lines = source[0].splitlines()
-        out = []
-        current = None
-        for line in lines:
-            stripped = line.strip()
-            if stripped.startswith('* - '):
-                name = stripped[4:].strip()
-                if name in {'Name', 'Version', 'PyPI', 'API', 'Manual', 'Tutorial', 'Description'}:
-                    current = None
-                else:
-                    current = name
-                out.append(line)
-                continue
-            if current and stripped == '- Latest':
-                ver = None
-                candidates = [
-                    current,
-                    current.replace('_', '-'),
-                    current.replace('.', '-'),
-                    current.replace('.', '_'),
-                ]
-                for key in candidates:
-                    try:
-                        ver = metadata.version(key)
-                        break
-                    except Exception:
-                        pass
-                out.append(line.replace('Latest', ver if ver else 'Not installed'))
-                current = None
-                continue
-            out.append(line)
-        source[0] = "\n".join(out)
-
-    app.connect('source-read', replace_latest_versions)
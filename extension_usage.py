@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Load only the Sphinx extensions a project actually uses.
+
+A fast pre-scan of the sources (regular expressions, no parsing) records
+every directive and role they mention, and whether they use emoji
+substitutions or Markdown. Results are cached per file in
+``_build/.extension-usage.json`` and only files whose mtime or size changed
+are read again. ``select_extensions`` then drops the configured extensions
+whose directives and roles nothing uses, so their (often large) imports are
+skipped. Extensions without a known trigger are always kept. The scan errs
+on the side of loading: a directive inside a code sample counts as used.
+
+In a ``conf.py`` (``/sphinx`` is on ``sys.path`` in the image)::
+
+    from extension_usage import select_extensions
+    extensions = select_extensions([...], os.path.dirname(__file__))
+
+Set ``VIPER_LAZY_EXTENSIONS=0`` to load every configured extension.
+Running this file prints the usage index and the selection for a source dir.
+"""
+import argparse
+import fnmatch
+import json
+import os
+import re
+from pathlib import Path
+
+SOURCE_SUFFIXES = ('.rst', '.md', '.txt', '.inc')
+
+# Directories never scanned (besides hidden ones)
+SKIP_DIRS = {'_build', 'pdoc', '__pycache__', 'node_modules'}
+
+CACHE_NAME = '.extension-usage.json'
+CACHE_VERSION = 2
+
+# What makes each extension needed: directive or role names (fnmatch
+# patterns), source suffixes, scan features, or another selected extension
+EXTENSION_TRIGGERS = {
+    'sphinx.ext.autodoc': {
+        'directives': ('automodule', 'autoclass', 'autofunction', 'automethod', 'autoattribute',
+                       'autodata', 'autoexception', 'autodecorator', 'autoproperty',
+                       'autotypealias', 'autonewtypedata'),
+    },
+    'sphinx.ext.autosummary': {'directives': ('autosummary',)},
+    'sphinx.ext.napoleon': {'needs': ('sphinx.ext.autodoc', 'sphinx.ext.autosummary',
+                                      'sphinx_automodapi.automodapi')},
+    'sphinx.ext.viewcode': {'needs': ('sphinx.ext.autodoc', 'sphinx.ext.autosummary',
+                                      'sphinx_automodapi.automodapi')},
+    'sphinx.ext.todo': {'directives': ('todo', 'todolist')},
+    'sphinx.ext.ifconfig': {'directives': ('ifconfig',)},
+    'sphinx.ext.graphviz': {'directives': ('graphviz', 'graph', 'digraph')},
+    'graphviz_cache': {'needs': ('sphinx.ext.graphviz',)},
+    # Docstrings pulled in by autodoc may hold math too
+    'sphinx.ext.mathjax': {'directives': ('math',), 'roles': ('math', 'eq'),
+                           'needs': ('sphinx.ext.autodoc', 'sphinx_automodapi.automodapi')},
+    'sphinx_automodapi.automodapi': {'directives': ('automodapi', 'automodsumm',
+                                                    'automod-diagram')},
+    'sphinxcontrib.httpdomain': {'directives': ('http:*',), 'roles': ('http:*',)},
+    'sphinx_prompt': {'directives': ('prompt',)},
+    'sphinx_pyreverse': {'directives': ('uml',)},
+    'pyreverse_cache': {'needs': ('sphinx_pyreverse',)},
+    'sphinx_kml': {'directives': ('kml', 'kml-*')},
+    'myst_parser': {'suffixes': ('.md',)},
+    'sphinxemoji.sphinxemoji': {'features': ('emoji',)},
+}
+
+_RST_DIRECTIVE = re.compile(r'^[ \t]*\.\.[ \t]+([A-Za-z0-9_][\w:.+-]*)::', re.MULTILINE)
+_RST_ROLE = re.compile(r'(?<![\w`]):([A-Za-z][\w:.+-]*):`')
+_MYST_DIRECTIVE = re.compile(r'^[ \t]*(?:`{3,}|~{3,}|:{3,})[ \t]*\{([\w:.+-]+)\}', re.MULTILINE)
+_MYST_ROLE = re.compile(r'\{([A-Za-z][\w:.+-]*)\}`')
+_FEATURES = {
+    'emoji': re.compile(r'\|:[\w+-]+:\|'),
+}
+
+
+class Usage:
+    """Directive and role names, suffixes and features found in a source tree."""
+
+    def __init__(self):
+        self.directives = set()
+        self.roles = set()
+        self.suffixes = set()
+        self.features = set()
+        self.files = 0
+        self.rescanned = 0
+
+    def uses_directive(self, *patterns):
+        return any(fnmatch.filter(self.directives, pattern) for pattern in patterns)
+
+    def uses_role(self, *patterns):
+        return any(fnmatch.filter(self.roles, pattern) for pattern in patterns)
+
+
+def scan_file(path):
+    """Return ``(directives, roles, features)`` mentioned in one source file."""
+    text = Path(path).read_text(encoding='utf-8', errors='replace')
+    directives = set(_RST_DIRECTIVE.findall(text)) | set(_MYST_DIRECTIVE.findall(text))
+    roles = set(_RST_ROLE.findall(text)) | set(_MYST_ROLE.findall(text))
+    features = {name for name, pattern in _FEATURES.items() if pattern.search(text)}
+    return sorted(directives), sorted(roles), sorted(features)
+
+
+def _source_files(srcdir):
+    for root, dirs, files in os.walk(srcdir):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith('.')]
+        for name in files:
+            if name.endswith(SOURCE_SUFFIXES):
+                yield os.path.join(root, name)
+
+
+_memo = {}
+
+
+def scan_usage(srcdir, cache_path=None):
+    """Build the ``Usage`` of ``srcdir``, reusing cached results of unchanged files."""
+    srcdir = Path(srcdir).resolve()
+    cache_path = Path(cache_path or srcdir / '_build' / CACHE_NAME)
+    try:
+        cache = json.loads(cache_path.read_text(encoding='utf-8'))
+        entries = cache['files'] if cache.get('version') == CACHE_VERSION else {}
+    except (OSError, ValueError, KeyError):
+        entries = {}
+
+    usage = Usage()
+    fresh = {}
+    for path in _source_files(srcdir):
+        rel = os.path.relpath(path, srcdir)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entry = entries.get(rel)
+        if not entry or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+            entry = [stat.st_mtime_ns, stat.st_size, *scan_file(path)]
+            usage.rescanned += 1
+        fresh[rel] = entry
+        usage.files += 1
+        usage.suffixes.add(os.path.splitext(rel)[1])
+        usage.directives.update(entry[2])
+        usage.roles.update(entry[3])
+        usage.features.update(entry[4])
+
+    if usage.rescanned or fresh.keys() != entries.keys():
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cache_path.with_name(f'.{cache_path.name}.tmp{os.getpid()}')
+            tmp.write_text(json.dumps({'version': CACHE_VERSION, 'files': fresh}), encoding='utf-8')
+            os.replace(tmp, cache_path)
+        except OSError:
+            pass
+    _memo[srcdir] = usage
+    return usage
+
+
+def get_usage(srcdir):
+    """``scan_usage`` once per process (conf.py and extensions share the result)."""
+    srcdir = Path(srcdir).resolve()
+    return _memo.get(srcdir) or scan_usage(srcdir)
+
+
+def _triggered(triggers, usage, selected):
+    return (usage.uses_directive(*triggers.get('directives', ()))
+            or usage.uses_role(*triggers.get('roles', ()))
+            or any(suffix in usage.suffixes for suffix in triggers.get('suffixes', ()))
+            or any(feature in usage.features for feature in triggers.get('features', ()))
+            or any(name in selected for name in triggers.get('needs', ())))
+
+
+def select_extensions(extensions, srcdir, keep=(), verbose=True):
+    """Return the subset of ``extensions`` that the sources in ``srcdir`` use.
+
+    Order is preserved. Extensions in ``keep`` or without an entry in
+    ``EXTENSION_TRIGGERS`` are always kept.
+    """
+    if os.environ.get('VIPER_LAZY_EXTENSIONS', '1') == '0':
+        return list(extensions)
+    usage = get_usage(srcdir)
+
+    def wanted(name, selected):
+        if name in keep or name not in EXTENSION_TRIGGERS:
+            return True
+        return _triggered(EXTENSION_TRIGGERS[name], usage, selected)
+
+    # Extensions that follow others ('needs') are decided once those are known
+    first = {name for name in extensions if wanted(name, ())}
+    selected = [name for name in extensions if name in first or wanted(name, first)]
+    skipped = [name for name in extensions if name not in selected]
+    if verbose and skipped:
+        print(f"extension_usage: loading {len(selected)}/{len(extensions)} extensions "
+              f"({usage.files} sources, {usage.rescanned} rescanned); "
+              f"skipped {', '.join(skipped)}")
+    return selected
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('srcdir', nargs='?', type=Path, default=Path(__file__).parent / 'docs',
+                        help='Sphinx source directory (default: docs next to this script)')
+    parser.add_argument('--cache', type=Path, help=f'Usage cache (default: <srcdir>/_build/{CACHE_NAME})')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main function."""
+    args = parse_args(argv)
+    usage = scan_usage(args.srcdir, args.cache)
+    print(f"Scanned {usage.files} sources ({usage.rescanned} rescanned)")
+    print(f"  directives ({len(usage.directives)}): {', '.join(sorted(usage.directives))}")
+    print(f"  roles ({len(usage.roles)}): {', '.join(sorted(usage.roles))}")
+    print(f"  suffixes: {', '.join(sorted(usage.suffixes))}; features: {', '.join(sorted(usage.features)) or '-'}")
+    extensions = list(EXTENSION_TRIGGERS)
+    selected = select_extensions(extensions, args.srcdir, verbose=False)
+    print(f"  would load: {', '.join(selected) or '-'}")
+    print(f"  would skip: {', '.join(name for name in extensions if name not in selected) or '-'}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+File helpers shared by the build tools.
+
+The generated index, manifest and sphinx-packages.rst are read by a server
+or a later stage while the tools rewrite them, so they are written through
+``atomic_write``: to a temporary file next to the target that is renamed
+over it once complete.
+"""
+import contextlib
+import os
+from pathlib import Path
+
+
+@contextlib.contextmanager
+def atomic_write(path):
+    """Open a temporary file next to ``path`` and rename it over ``path`` on success."""
+    path = Path(path)
+    tmp = path.with_name(f'.{path.name}.tmp{os.getpid()}')
+    try:
+        with open(tmp, 'w', encoding='utf-8') as f:
+            yield f
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
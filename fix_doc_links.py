@@ -2,66 +2,147 @@
 """
 Fix documentation links in sphinx-packages.rst based on what pdoc docs actually exist.
 Removes API links for packages without generated pdoc documentation.
+
+Which packages have docs comes from the pdoc manifest.json when there is one,
+so the output tree is only scanned for trees generated without it.
 """
+import json
+import os
 import re
 from pathlib import Path
 
+import rst_table
+from fileutil import atomic_write
+from pdoc_index import MANIFEST_NAME, load_manifest
 
-def get_generated_packages(pdoc_dir):
-    """Get set of package names that have generated pdoc documentation."""
-    if not pdoc_dir.exists():
-        return set()
+_API_LINK = re.compile(r'^`link <pdoc/([^/]+)/index\.html>`_')
 
+# Listing of the last scanned pdoc directory, reused while its mtime is unchanged
+DEFAULT_SNAPSHOT_PATH = Path(os.environ.get(
+    'PDOC_SNAPSHOT_PATH', Path.home() / '.cache' / 'viper-sphinx' / 'pdoc-snapshot.json'))
+
+
+def scan_generated_packages(pdoc_dir):
+    """Scan ``pdoc_dir`` for packages with a non-empty generated page."""
     generated = set()
-    for item in pdoc_dir.iterdir():
-        if item.name == '__pycache__':
-            continue
-            
-        if item.is_dir():
-            # Directory exists - check if it has index.html
-            index_file = item / 'index.html'
-            if index_file.exists() and index_file.stat().st_size > 0:
-                generated.add(item.name)
-        elif item.is_file() and item.suffix == '.html':
-            # Single HTML file (module-level doc) - but not index.html
-            if item.stem != 'index' and item.stat().st_size > 0:
-                generated.add(item.stem)
+    with os.scandir(pdoc_dir) as entries:
+        for entry in entries:
+            if entry.name == '__pycache__':
+                continue
+            try:
+                if entry.is_dir():
+                    # Package directory - needs a non-empty index.html
+                    if os.stat(os.path.join(entry.path, 'index.html')).st_size > 0:
+                        generated.add(entry.name)
+                elif entry.name.endswith('.html') and entry.name != 'index.html':
+                    # Single HTML file (module-level doc)
+                    if entry.is_file() and entry.stat().st_size > 0:
+                        generated.add(entry.name[:-len('.html')])
+            except OSError:
+                continue
+    return generated
 
+
+def _load_snapshot(snapshot_path, pdoc_dir, mtime_ns):
+    try:
+        with open(snapshot_path, encoding='utf-8') as f:
+            snapshot = json.load(f)
+        if snapshot['dir'] == str(pdoc_dir) and snapshot['mtime_ns'] == mtime_ns:
+            return set(snapshot['packages'])
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _save_snapshot(snapshot_path, pdoc_dir, mtime_ns, generated):
+    try:
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(snapshot_path) as f:
+            json.dump({'dir': str(pdoc_dir), 'mtime_ns': mtime_ns,
+                       'packages': sorted(generated)}, f)
+    except OSError as e:
+        print(f"⚠️  Could not save pdoc snapshot {snapshot_path}: {e}")
+
+
+def get_generated_packages(pdoc_dir, snapshot_path=DEFAULT_SNAPSHOT_PATH):
+    """Get set of package names that have generated pdoc documentation.
+
+    Uses the ``manifest.json`` written by generate_pdoc.py when there is one.
+    Otherwise the directory is scanned, and the result is kept in a snapshot
+    that is reused until the directory's mtime changes.
+    """
+    pdoc_dir = Path(pdoc_dir).resolve()
+    try:
+        mtime_ns = pdoc_dir.stat().st_mtime_ns
+    except OSError:
+        return set()
+
+    manifest = load_manifest(pdoc_dir)
+    if manifest is not None:
+        print(f"✓ Read pdoc packages from {MANIFEST_NAME}")
+        return {name for name, docs in manifest.items() if docs.modules}
+
+    generated = _load_snapshot(snapshot_path, pdoc_dir, mtime_ns)
+    if generated is not None:
+        print(f"♻️  Reusing pdoc directory snapshot from {snapshot_path}")
+        return generated
+
+    generated = scan_generated_packages(pdoc_dir)
+    _save_snapshot(snapshot_path, pdoc_dir, mtime_ns, generated)
     return generated
 
 
-def fix_api_links(rst_path, generated_packages):
-    """Remove API links for packages without pdoc documentation."""
-    with open(rst_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
+def _check_api_link(row, generated_packages):
+    """Clear the API cell of ``row`` if it points at missing pdoc docs.
 
-    # Process line by line, looking for API link lines
-    removed_count = 0
+    Returns ``(pdoc name, kept)``, or None for rows without an API link.
+    """
+    match = _API_LINK.match(row.get('api'))
+    if not match:
+        return None
+    pdoc_name = match.group(1)
+    if pdoc_name in generated_packages:
+        return pdoc_name, True
+    # Remove the API link (leave the cell empty)
+    row.set('api', '')
+    return pdoc_name, False
+
+
+def remove_missing_api_links(tables, generated_packages):
+    """Clear API cells of a ``PackageTables`` model that point at missing pdoc docs.
+
+    Returns ``(kept_count, removed_packages)``.
+    """
+    return _count_api_links(_check_api_link(row, generated_packages) for row in tables.rows)
+
+
+def _count_api_links(results):
     kept_count = 0
     removed_packages = []
-    
-    for i in range(len(lines)):
-        line = lines[i]
-        # Check if this is an API link line
-        match = re.search(r'^\s+- `link <pdoc/([^/]+)/index\.html>`_', line)
-        if match:
-            pdoc_name = match.group(1)
-            # Check if pdoc exists for this package
-            if pdoc_name in generated_packages:
-                # Keep the link
+    for result in results:
+        if result:
+            pdoc_name, kept = result
+            if kept:
                 kept_count += 1
             else:
-                # Remove the API link (replace with empty line)
-                lines[i] = '     - \n'
-                removed_count += 1
                 removed_packages.append(pdoc_name)
-    
-    # Write back
-    with open(rst_path, 'w', encoding='utf-8') as f:
-        f.writelines(lines)
+    return kept_count, removed_packages
+
+
+def fix_api_links(rst_path, generated_packages):
+    """Remove API links for packages without pdoc documentation.
+
+    The file is rewritten in one streamed pass and replaced atomically.
+    """
+    results = []
+    rst_table.rewrite(rst_path, lambda row: results.append(_check_api_link(row, generated_packages)))
+    report_api_links(*_count_api_links(results))
+
 
+def report_api_links(kept_count, removed_packages):
+    """Print the outcome of ``remove_missing_api_links``."""
     print(f"✓ Kept {kept_count} API links for packages with pdoc documentation")
-    print(f"✓ Removed {removed_count} API links for packages without pdoc documentation")
+    print(f"✓ Removed {len(removed_packages)} API links for packages without pdoc documentation")
     if removed_packages:
         print(f"  Removed links for: {', '.join(removed_packages[:20])}")
         if len(removed_packages) > 20:
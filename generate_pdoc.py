@@ -2,147 +2,309 @@
 """
 Generate pdoc3 documentation for all installed packages.
 """
+import argparse
 import subprocess
 import sys
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+import profiling
+from dist_index import get_index
+from pdoc_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_MB, PdocCache
+from pdoc_engine import DEFAULT_MAX_RSS_MB, DEFAULT_MAX_TASKS, PdocEngine
+from pdoc_index import PackageDocs, entry_page, load_manifest, publish
+from pdoc_watch import DEFAULT_DEBOUNCE_MS, DEFAULT_PACKAGES_DIR, watch
+
+# Per-package pdoc timeout in seconds
+DEFAULT_TIMEOUT = 30
+
+# Generate docs for all packages from requirements-docker.txt / requirements-windows.txt
+TARGET_PACKAGES = [
+    # Core
+    'sphinx', 'pdoc3',
+    # Extensions
+    'sphinx-charts', 'sphinx-confluence', 'sphinx-lint', 'sphinx-library',
+    'sphinx2doxygen', 'sphinx-issues', 'sphinx-tagtoctree', 'sphinx-vhdl',
+    'sphinx-c-autodoc', 'sphinx-theme', 'sphinx-refdoc', 'sphinx-gitref',
+    'sphinx-autoschematics', 'sphinx-pyreverse', 'sphinx-uml',
+    'sphinxcontrib-asyncio', 'sphinxcontrib-googlemaps', 'sphinx-kml',
+    'sphinxnotes-fasthtml', 'sphinx-wagtail-theme', 'sphinx-diagrams',
+    'btd.sphinx.graphviz', 'sphinx-tojupyter', 'sphinxcontrib-cadquery',
+    'epub2sphinx', 'sphinx-autodoc-defaultargs', 'sphinx-autodoc-annotation',
+    'sphinx-autodoc2-fern', 'sphinx-collapsible-autodoc', 'sphinx-autodoc-toml',
+    'sphinx-automodapi', 'pytest-doctestplus', 'sphinx-copybutton',
+    'sphinx-prompt', 'sphinxemoji', 'sphinx-favicon', 'myst-parser',
+    'sphinxcontrib-httpdomain', 'sphinx-autobuild', 'sphinx-autoapi',
+    'nbsphinx', 'nbsphinx-link', 'sphinx-jupyter-kernel', 'sphinx-notfound-page',
+    'sphinx-version-warning', 'sphinx-hoverxref', 'sphinx-last-updated-by-git',
+    'sphinx-git', 'sphinxext-opengraph', 'breathe', 'exhale', 'ansible-sphinx', 'invoke-sphinx',
+    'sphinx-analytics', 'sphinx-apischema', 'sphinx-autoindex', 'sphinx-autofixture',
+    'sphinx-autopackagesummary', 'sphinx-advanced', 'sphinx-changelog',
+    # New API & Code Documentation packages
+    'sphinx-jsonschema', 'sphinx-sql', 'pydeps', 'sphinx-needs',
+    # New API & Web Documentation packages
+    'sphinxcontrib-openapi', 'sphinxcontrib-redoc', 'sphinxcontrib-websupport',
+    'sphinxcontrib-restbuilder',
+    # New Code Examples & Interactive Content packages
+    'sphinx-gallery', 'sphinx-codeautolink', 'sphinx-thebe',
+    # New Database & Data Documentation packages
+    'eralchemy2', 'sqlalchemy',
+    # New Performance & Build Tools packages
+    'sphinx-asdf',
+    # New Testing & Quality packages
+    'doc8', 'rstcheck', 'sphinxcontrib-spelling',
+    # New Internationalization packages
+    'sphinx-intl', 'sphinx-polyversion',
+    # New Export & Format Support packages
+    'rst2pdf', 'rinohtype', 'sphinxcontrib-katex', 'sphinxcontrib-bibtex',
+    # New Version Control & Collaboration packages
+    'sphinx-multiversion', 'sphinx-versions', 'sphinx-comments', 'sphinxcontrib-contentui',
+    # New Cloud & Infrastructure packages
+    'sphinx-terraform',
+    # New Search & Navigation packages
+    'sphinx-sitemap', 'sphinx-tags',
+    # New Specialized Documentation packages
+    'sphinx-argparse', 'sphinx-click', 'sphinxcontrib-typer',
+    'sphinx-pydantic', 'sphinx-toolbox',
+    # Themes
+    'sphinx-rtd-theme', 'sphinx-book-theme', 'pydata-sphinx-theme', 'furo',
+    'piccolo-theme', 'sphinx-material', 'sphinx-press-theme', 'karma-sphinx-theme',
+    'sphinxawesome-theme', 'sphinx-immaterial',
+    # Diagram tools
+    'pyan3', 'graphviz', 'pydot', 'gprof2dot', 'graphviz2drawio',
+    'python-markdown-graphviz', 'fsmdot', 'quickdiagrams', 'dtreeplt',
+    'pyprojectviz', 'pylint', 'code2flow', 'snakeviz', 'pydeps',
+    'diagrams', 'railroad-diagrams', 'blockdiag', 'nwdiag', 'N2G',
+    'rptree', 'pinout',
+    # SVG
+    'svg.py',
+    # Markdown
+    'markdown', 'enumerate-markdown', 'flake8-markdown', 'markdown-it-py',
+    # Utilities
+    'requests', 'beautifulsoup4', 'lxml', 'jinja2', 'docutils'
+]
+
 def get_installed_packages():
-    """Get list of installed packages."""
-    result = subprocess.run(
-        [sys.executable, '-m', 'pip', 'list', '--format=json'],
-        capture_output=True,
-        text=True
-    )
-    if result.returncode != 0:
-        print(f"Error getting package list: {result.stderr}")
-        return []
-    
-    import json
-    packages = json.loads(result.stdout)
-    return [(pkg['name'], pkg['version']) for pkg in packages]
+    """Get the index of installed distributions."""
+    return get_index()
+
+def generate_pdoc_for_package(package_name, output_dir, timeout=DEFAULT_TIMEOUT):
+    """Generate pdoc3 documentation for a package.
 
-def generate_pdoc_for_package(package_name, output_dir):
-    """Generate pdoc3 documentation for a package."""
+    Returns a ``(success, messages)`` tuple. Messages are collected per job
+    instead of printed so that concurrent jobs don't interleave their output.
+    """
+    messages = []
     try:
         # Try to generate documentation
         result = subprocess.run(
             [sys.executable, '-m', 'pdoc', '--html', '--output-dir', output_dir, package_name],
             capture_output=True,
             text=True,
-            timeout=30
+            timeout=timeout
         )
         if result.returncode == 0:
-            return True
+            return True, messages
         else:
-            print(f"  ⚠️  Could not generate docs for {package_name}: {result.stderr[:100]}")
-            return False
+            messages.append(f"  ⚠️  Could not generate docs for {package_name}: {result.stderr[:100]}")
+            return False, messages
     except subprocess.TimeoutExpired:
-        print(f"  ⏱️  Timeout generating docs for {package_name}")
-        return False
+        messages.append(f"  ⏱️  Timeout generating docs for {package_name}")
+        return False, messages
     except Exception as e:
-        print(f"  ❌ Error with {package_name}: {str(e)[:100]}")
-        return False
+        messages.append(f"  ❌ Error with {package_name}: {str(e)[:100]}")
+        return False, messages
 
-def main():
-    """Main function to generate all documentation."""
-    # Use relative path from script location
-    script_dir = Path(__file__).parent
-    output_dir = script_dir / 'docs' / 'pdoc'
+def _measure_tree(path):
+    """Count the pages and bytes pdoc wrote for one package."""
+    pages = list(path.rglob('*.html')) if path.is_dir() else []
+    return len(pages), sum(page.stat().st_size for page in pages)
+
+def _timed_generate(package_name, output_dir, timeout):
+    """``generate_pdoc_for_package`` plus when it started and how long it ran, measured in the worker thread.
+
+    Timing starts when the job runs, not when it is queued, so waiting for a
+    free worker is not counted against the package.
+    """
+    start = time.perf_counter()
+    success, messages = generate_pdoc_for_package(package_name, output_dir, timeout)
+    return success, messages, start, time.perf_counter() - start
+
+def _run_subprocess_jobs(jobs, output_dir, workers, timeout):
+    """Run each job in its own pdoc subprocess; yield results as they finish."""
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        future_to_job = {executor.submit(_timed_generate, job[0], output_dir, timeout): job
+                         for job in jobs}
+
+        for future in as_completed(future_to_job):
+            job = future_to_job[future]
+            success, messages, start, seconds = future.result()
+            module_count, total_bytes = _measure_tree(Path(output_dir, job[0])) if success else (0, 0)
+            yield job, success, messages, module_count, total_bytes, start, seconds
+
+def generate_all(jobs, output_dir, workers=None, timeout=DEFAULT_TIMEOUT,
+                 engine='inprocess', max_tasks=DEFAULT_MAX_TASKS,
+                 max_rss_mb=DEFAULT_MAX_RSS_MB):
+    """Run pdoc jobs concurrently and report each one as it finishes.
+
+    ``jobs`` is a list of ``(module_name, pkg_name, version)`` tuples.
+    ``workers`` bounds how many run at once and defaults to the number of CPU
+    cores. The ``inprocess`` engine renders through long-lived workers that
+    import pdoc once (see ``pdoc_engine``); the ``subprocess`` engine starts
+    one ``python -m pdoc`` per package. Returns a list of
+    ``(job, module_count, total_bytes)`` tuples for the jobs that succeeded.
+    """
+    workers = workers or os.cpu_count() or 1
+    if engine == 'subprocess':
+        results = _run_subprocess_jobs(jobs, output_dir, workers, timeout)
+    else:
+        pool = PdocEngine(workers=workers, timeout=timeout,
+                          max_tasks=max_tasks, max_rss_mb=max_rss_mb)
+        results = pool.run(jobs, output_dir)
+
+    succeeded = []
+    completed = 0
+    for job, success, messages, module_count, total_bytes, start, seconds in results:
+        _, pkg_name, version = job
+        completed += 1
+        # Recorded where the job ran, not when its result was collected
+        profiling.record(pkg_name, 'pdoc', start, seconds,
+                         version=version, ok=success, modules=module_count)
+        # Print the whole job block at once so logs stay grouped per package
+        lines = [f"\n[{completed}/{len(jobs)}] Finished docs for {pkg_name} ({version}) in {seconds:.1f}s"]
+        lines.extend(messages)
+        if success:
+            succeeded.append((job, module_count, total_bytes))
+            lines.append("  ✅ Success")
+        print('\n'.join(lines))
+
+    if engine != 'subprocess':
+        print(f"\nRecycled {pool.recycled} pdoc workers")
+
+    return succeeded
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument(
+        '-j', '--workers', type=int,
+        default=int(os.environ.get('PDOC_WORKERS', 0)) or os.cpu_count(),
+        help='Number of concurrent pdoc jobs (default: number of CPU cores)'
+    )
+    parser.add_argument(
+        '--timeout', type=int, default=DEFAULT_TIMEOUT,
+        help=f'Per-package timeout in seconds (default: {DEFAULT_TIMEOUT})'
+    )
+    parser.add_argument(
+        '--engine', choices=('inprocess', 'subprocess'), default='inprocess',
+        help='Render in long-lived pdoc workers (default) or one subprocess per package'
+    )
+    parser.add_argument(
+        '--max-tasks', type=int, default=DEFAULT_MAX_TASKS,
+        help=f'Recycle a worker after this many packages (default: {DEFAULT_MAX_TASKS})'
+    )
+    parser.add_argument(
+        '--max-rss', type=int, default=DEFAULT_MAX_RSS_MB,
+        help=f'Recycle a worker once its RSS exceeds this many MB (default: {DEFAULT_MAX_RSS_MB})'
+    )
+    parser.add_argument(
+        '--cache-dir', type=Path, default=DEFAULT_CACHE_DIR,
+        help=f'pdoc output cache directory (default: {DEFAULT_CACHE_DIR})'
+    )
+    parser.add_argument(
+        '--cache-max-mb', type=int, default=DEFAULT_MAX_MB,
+        help=f'Evict least recently used cache entries above this size (default: {DEFAULT_MAX_MB})'
+    )
+    parser.add_argument(
+        '--no-cache', action='store_true',
+        help='Regenerate every package without reading or writing the cache'
+    )
+    parser.add_argument(
+        '-o', '--output-dir', type=Path, default=Path(__file__).parent / 'docs' / 'pdoc',
+        help='Where to write the docs (default: docs/pdoc next to this script)'
+    )
+    parser.add_argument(
+        '--watch', action='store_true',
+        help='Document the local packages in --packages-dir and regenerate them as they change'
+    )
+    parser.add_argument(
+        '--packages-dir', type=Path, default=DEFAULT_PACKAGES_DIR,
+        help='Local package sources for --watch (default: docs/tutorials/packages)'
+    )
+    parser.add_argument(
+        '--debounce', type=int, default=DEFAULT_DEBOUNCE_MS,
+        help=f'Quiet period in ms that ends a burst of saves in --watch mode (default: {DEFAULT_DEBOUNCE_MS})'
+    )
+    return parser.parse_args(argv)
+
+def generate(packages, output_dir, args):
+    """Generate docs for every installed package in ``TARGET_PACKAGES``.
+
+    ``packages`` is the ``DistributionIndex`` of installed distributions and
+    ``args`` the options from ``parse_args``. Writes the per-package trees and
+    ``index.html`` into ``output_dir`` and returns the number of packages
+    with documentation.
+    """
+    output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
-    
-    print("=" * 60)
-    print("Generating pdoc3 documentation for installed packages")
-    print("=" * 60)
-    
-    packages = get_installed_packages()
-    print(f"\nFound {len(packages)} installed packages")
-    
-    # Generate docs for all packages from requirements-docker.txt / requirements-windows.txt
-    target_packages = [
-        # Core
-        'sphinx', 'pdoc3',
-        # Extensions
-        'sphinx-charts', 'sphinx-confluence', 'sphinx-lint', 'sphinx-library',
-        'sphinx2doxygen', 'sphinx-issues', 'sphinx-tagtoctree', 'sphinx-vhdl',
-        'sphinx-c-autodoc', 'sphinx-theme', 'sphinx-refdoc', 'sphinx-gitref',
-        'sphinx-autoschematics', 'sphinx-pyreverse', 'sphinx-uml',
-        'sphinxcontrib-asyncio', 'sphinxcontrib-googlemaps', 'sphinx-kml',
-        'sphinxnotes-fasthtml', 'sphinx-wagtail-theme', 'sphinx-diagrams',
-        'btd.sphinx.graphviz', 'sphinx-tojupyter', 'sphinxcontrib-cadquery',
-        'epub2sphinx', 'sphinx-autodoc-defaultargs', 'sphinx-autodoc-annotation',
-        'sphinx-autodoc2-fern', 'sphinx-collapsible-autodoc', 'sphinx-autodoc-toml',
-        'sphinx-automodapi', 'pytest-doctestplus', 'sphinx-copybutton',
-        'sphinx-prompt', 'sphinxemoji', 'sphinx-favicon', 'myst-parser',
-        'sphinxcontrib-httpdomain', 'sphinx-autobuild', 'sphinx-autoapi',
-        'nbsphinx', 'nbsphinx-link', 'sphinx-jupyter-kernel', 'sphinx-notfound-page',
-        'sphinx-version-warning', 'sphinx-hoverxref', 'sphinx-last-updated-by-git',
-        'sphinx-git', 'sphinxext-opengraph', 'breathe', 'exhale', 'ansible-sphinx', 'invoke-sphinx',
-        'sphinx-analytics', 'sphinx-apischema', 'sphinx-autoindex', 'sphinx-autofixture',
-        'sphinx-autopackagesummary', 'sphinx-advanced', 'sphinx-changelog',
-        # New API & Code Documentation packages
-        'sphinx-jsonschema', 'sphinx-sql', 'pydeps', 'sphinx-needs',
-        # New API & Web Documentation packages
-        'sphinxcontrib-openapi', 'sphinxcontrib-redoc', 'sphinxcontrib-websupport',
-        'sphinxcontrib-restbuilder',
-        # New Code Examples & Interactive Content packages
-        'sphinx-gallery', 'sphinx-codeautolink', 'sphinx-thebe',
-        # New Database & Data Documentation packages
-        'eralchemy2', 'sqlalchemy',
-        # New Performance & Build Tools packages
-        'sphinx-asdf',
-        # New Testing & Quality packages
-        'doc8', 'rstcheck', 'sphinxcontrib-spelling',
-        # New Internationalization packages
-        'sphinx-intl', 'sphinx-polyversion',
-        # New Export & Format Support packages
-        'rst2pdf', 'rinohtype', 'sphinxcontrib-katex', 'sphinxcontrib-bibtex',
-        # New Version Control & Collaboration packages
-        'sphinx-multiversion', 'sphinx-versions', 'sphinx-comments', 'sphinxcontrib-contentui',
-        # New Cloud & Infrastructure packages
-        'sphinx-terraform',
-        # New Search & Navigation packages
-        'sphinx-sitemap', 'sphinx-tags',
-        # New Specialized Documentation packages
-        'sphinx-argparse', 'sphinx-click', 'sphinxcontrib-typer',
-        'sphinx-pydantic', 'sphinx-toolbox',
-        # Themes
-        'sphinx-rtd-theme', 'sphinx-book-theme', 'pydata-sphinx-theme', 'furo',
-        'piccolo-theme', 'sphinx-material', 'sphinx-press-theme', 'karma-sphinx-theme',
-        'sphinxawesome-theme', 'sphinx-immaterial',
-        # Diagram tools
-        'pyan3', 'graphviz', 'pydot', 'gprof2dot', 'graphviz2drawio',
-        'python-markdown-graphviz', 'fsmdot', 'quickdiagrams', 'dtreeplt',
-        'pyprojectviz', 'pylint', 'code2flow', 'snakeviz', 'pydeps',
-        'diagrams', 'railroad-diagrams', 'blockdiag', 'nwdiag', 'N2G',
-        'rptree', 'pinout',
-        # SVG
-        'svg.py',
-        # Markdown
-        'markdown', 'enumerate-markdown', 'flake8-markdown', 'markdown-it-py',
-        # Utilities
-        'requests', 'beautifulsoup4', 'lxml', 'jinja2', 'docutils'
-    ]
-    
-    success_count = 0
-    total = 0
-    
-    # Create a mapping of package names
-    installed_pkg_dict = {pkg.lower().replace('-', '_').replace('.', '_'): (pkg, ver) 
-                         for pkg, ver in packages}
-    
-    for target_pkg in target_packages:
-        normalized = target_pkg.lower().replace('-', '_').replace('.', '_')
-        
-        if normalized in installed_pkg_dict:
-            pkg_name, version = installed_pkg_dict[normalized]
-            total += 1
-            print(f"\n[{total}/{len(target_packages)}] Generating docs for {pkg_name} ({version})...")
-            if generate_pdoc_for_package(normalized, str(output_dir)):
-                success_count += 1
-                print(f"  ✅ Success")
-        else:
+
+    jobs = []
+    scheduled = set()
+    for target_pkg in TARGET_PACKAGES:
+        dist = packages.get(target_pkg)
+        if dist is None:
             print(f"\n⚠️  Package not installed: {target_pkg}")
+            continue
+
+        module_name = target_pkg.lower().replace('-', '_').replace('.', '_')
+        if len(dist.import_names) == 1 and module_name not in dist.import_names:
+            # Distribution and module names differ (beautifulsoup4 -> bs4)
+            module_name = next(iter(dist.import_names))
+        if module_name in scheduled:
+            # Listed twice; concurrent jobs must not write the same directory
+            continue
+        scheduled.add(module_name)
+        jobs.append((module_name, dist.name, dist.version))
+
+    total = len(jobs)
+    cache = None if args.no_cache else PdocCache(args.cache_dir, args.cache_max_mb)
+    documented = {}
+    if cache:
+        # Restore unchanged packages straight from the cache
+        misses = []
+        with profiling.span('restore from cache', 'pdoc', packages=len(jobs)):
+            for job in jobs:
+                meta = cache.restore(job[0], job[2], output_dir)
+                if meta is None:
+                    misses.append(job)
+                else:
+                    print(f"  ♻️  Restored {job[1]} ({job[2]}) from cache")
+                    documented[job[0]] = PackageDocs(job[0], job[1], job[2], meta.get('module_count', 0),
+                                                     meta.get('total_bytes', 0),
+                                                     entry_page(output_dir, job[0]))
+        jobs = misses
+
+    print(f"\nGenerating docs for {len(jobs)} packages with {args.workers} workers...")
+    succeeded = generate_all(
+        jobs, str(output_dir), workers=args.workers, timeout=args.timeout,
+        engine=args.engine, max_tasks=args.max_tasks, max_rss_mb=args.max_rss
+    )
+    success_count = len(succeeded)
+    for (module_name, pkg_name, version), module_count, total_bytes in succeeded:
+        documented[module_name] = PackageDocs(module_name, pkg_name, version, module_count, total_bytes,
+                                              entry_page(output_dir, module_name))
+
+    if cache:
+        success_count += cache.hits
+        with profiling.span('store in cache', 'pdoc', packages=len(succeeded)):
+            for (module_name, _, version), module_count, total_bytes in succeeded:
+                cache.store(module_name, version, output_dir,
+                            module_count=module_count, total_bytes=total_bytes)
+            cache.evict()
+        print()
+        cache.report()
     
     print("\n" + "=" * 60)
     print(f"Documentation generation complete!")
@@ -150,39 +312,39 @@ def main():
     print(f"Output directory: {output_dir}")
     print("=" * 60)
     
-    # Create an index.html
-    index_path = output_dir / 'index.html'
-    with open(index_path, 'w') as f:
-        f.write("""<!DOCTYPE html>
-<html>
-<head>
-    <title>Package Documentation Index</title>
-    <style>
-        body { font-family: Arial, sans-serif; margin: 40px; }
-        h1 { color: #333; }
-        ul { list-style-type: none; padding: 0; }
-        li { margin: 10px 0; }
-        a { color: #0066cc; text-decoration: none; }
-        a:hover { text-decoration: underline; }
-    </style>
-</head>
-<body>
-    <h1>Python Package Documentation</h1>
-    <p>Auto-generated API documentation using pdoc3</p>
-    <ul>
-""")
-        
-        # List all generated documentation directories
-        for item in sorted(output_dir.iterdir()):
-            if item.is_dir() and item.name != '__pycache__':
-                f.write(f'        <li><a href="{item.name}/index.html">{item.name}</a></li>\n')
-        
-        f.write("""    </ul>
-</body>
-</html>
-""")
+    publish(output_dir, documented)
+    return success_count
+
+def publish_local(output_dir, local):
+    """Merge watch-mode results (``{package: (modules, bytes)}``) into the index."""
+    packages = load_manifest(output_dir) or {}
+    for name, (module_count, total_bytes) in local.items():
+        packages[name] = PackageDocs(name, None, None, module_count, total_bytes,
+                                     entry_page(output_dir, name))
+    publish(output_dir, packages)
+
+def main(argv=None):
+    """Main function to generate all documentation."""
+    args = parse_args(argv)
+
+    output_dir = args.output_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    if args.watch:
+        try:
+            watch(args.packages_dir, output_dir, lambda local: publish_local(output_dir, local),
+                  args.debounce)
+        except KeyboardInterrupt:
+            print("\nStopped watching")
+        return 0
     
-    print(f"\nIndex created at: {index_path}")
+    print("=" * 60)
+    print("Generating pdoc3 documentation for installed packages")
+    print("=" * 60)
+    
+    packages = get_installed_packages()
+    print(f"\nFound {len(packages)} installed packages")
+    generate(packages, output_dir, args)
 
 if __name__ == '__main__':
-    main()
+    main()
\ No newline at end of file
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of link-check results.
+
+Stores one row per URL in SQLite: whether it was reachable, the HTTP status,
+the final redirect target, the ETag/Last-Modified validators and when it was
+checked. Fresh entries skip the network entirely; expired entries carry their
+validators so the checker can revalidate them with a conditional request.
+The database lives in a directory that can be shared across image builds
+through a BuildKit cache mount.
+"""
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_PATH = Path(os.environ.get(
+    'LINK_CACHE_PATH', Path.home() / '.cache' / 'viper-sphinx' / 'links.sqlite'))
+
+# How long a result is trusted without touching the network, in hours
+DEFAULT_TTL_HOURS = float(os.environ.get('LINK_CACHE_TTL_HOURS', 7 * 24))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS links (
+    url TEXT PRIMARY KEY,
+    ok INTEGER NOT NULL,
+    status INTEGER,
+    final_url TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    checked_at REAL NOT NULL
+)
+"""
+
+
+class CacheEntry:
+    """A cached link-check result."""
+
+    __slots__ = ('url', 'ok', 'status', 'final_url', 'etag', 'last_modified', 'checked_at')
+
+    def __init__(self, url, ok, status, final_url, etag, last_modified, checked_at):
+        self.url = url
+        self.ok = bool(ok)
+        self.status = status
+        self.final_url = final_url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.checked_at = checked_at
+
+
+class LinkCache:
+    """SQLite-backed link-check result cache with a TTL.
+
+    Not thread-safe: use it from a single thread (the asyncio event loop).
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl_hours=DEFAULT_TTL_HOURS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl_hours * 3600
+        # Concurrent builds may share the database; wait for their locks
+        self._db = sqlite3.connect(self.path, timeout=30)
+        self._db.execute(_SCHEMA)
+        self._db.commit()
+        self.fresh = 0
+        self.revalidated = 0
+        self.refreshed = 0
+        self.misses = 0
+        # Expired URLs looked up and not yet revalidated or stored again
+        self._expired = set()
+
+    def lookup(self, url):
+        """Return ``(entry, is_fresh)``; ``entry`` is None when the URL is unknown."""
+        row = self._db.execute(
+            'SELECT url, ok, status, final_url, etag, last_modified, checked_at '
+            'FROM links WHERE url = ?', (url,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None, False
+        entry = CacheEntry(*row)
+        is_fresh = time.time() - entry.checked_at < self.ttl
+        if is_fresh:
+            self.fresh += 1
+        else:
+            self._expired.add(url)
+        return entry, is_fresh
+
+    def store(self, url, result):
+        """Record a new network result (a ``LinkResult``).
+
+        Storing over an expired entry (its content changed or it had no
+        validators to revalidate with) counts as ``refreshed``.
+        """
+        if url in self._expired:
+            self._expired.discard(url)
+            self.refreshed += 1
+        if result.status is None:
+            # Connection errors may be transient; don't pin them for a whole TTL
+            self._db.execute('DELETE FROM links WHERE url = ?', (url,))
+        else:
+            self._db.execute(
+                'INSERT OR REPLACE INTO links VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (url, int(result.ok), result.status, result.final_url, result.etag,
+                 result.last_modified, time.time()))
+        self._db.commit()
+
+    def touch(self, url):
+        """Mark an entry revalidated (the server answered 304 Not Modified)."""
+        self._db.execute('UPDATE links SET checked_at = ? WHERE url = ?', (time.time(), url))
+        self._db.commit()
+        self._expired.discard(url)
+        self.revalidated += 1
+
+    def close(self):
+        """Close the database."""
+        self._db.close()
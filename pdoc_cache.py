@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for generated pdoc3 documentation.
+
+Entries are keyed on (module, package version, pdoc version, template hash,
+Python version) and stored under a directory that can be mounted as a Docker
+BuildKit cache, so image rebuilds only regenerate packages whose pins changed.
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+from importlib import metadata, util
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = Path(os.environ.get(
+    'PDOC_CACHE_DIR', Path.home() / '.cache' / 'viper-sphinx' / 'pdoc'))
+
+# Evict least recently used entries once the cache grows past this size
+DEFAULT_MAX_MB = int(os.environ.get('PDOC_CACHE_MAX_MB', 2048))
+
+
+def template_hash():
+    """Hash pdoc's bundled templates without importing pdoc."""
+    digest = hashlib.sha256()
+    spec = util.find_spec('pdoc')
+    if spec and spec.submodule_search_locations:
+        templates = Path(list(spec.submodule_search_locations)[0]) / 'templates'
+        if templates.is_dir():
+            for path in sorted(templates.rglob('*')):
+                if path.is_file():
+                    digest.update(path.relative_to(templates).as_posix().encode())
+                    digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def _dir_size(path):
+    return sum(p.stat().st_size for p in path.rglob('*') if p.is_file())
+
+
+def _output_paths(output_dir, module_name):
+    """Return the paths pdoc writes for a module: a package dir and/or a single page."""
+    candidates = [output_dir / module_name, output_dir / f'{module_name}.html']
+    return [p for p in candidates if p.exists()]
+
+
+def _remove_outputs(output_dir, module_name):
+    for existing in _output_paths(output_dir, module_name):
+        if existing.is_dir():
+            shutil.rmtree(existing)
+        else:
+            existing.unlink()
+
+
+class PdocCache:
+    """On-disk cache of ``docs/pdoc/<module>`` trees with LRU size eviction."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_mb=DEFAULT_MAX_MB):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_mb * 1024 * 1024
+        try:
+            pdoc_version = metadata.version('pdoc3')
+        except metadata.PackageNotFoundError:
+            pdoc_version = 'unknown'
+        self._salt = [pdoc_version, template_hash(), f'{sys.version_info[0]}.{sys.version_info[1]}']
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        self.evicted = 0
+
+    def key(self, module_name, version):
+        """Return the cache key for a module at a given package version."""
+        payload = json.dumps([module_name, version] + self._salt)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def restore(self, module_name, version, output_dir):
+        """Copy a cached tree into ``output_dir``; return its metadata or None."""
+        entry = self.cache_dir / self.key(module_name, version)
+        meta_path = entry / 'meta.json'
+        try:
+            meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        # List the entry before touching the output: a concurrent run may
+        # have evicted it since meta.json was read
+        try:
+            items = list((entry / 'files').iterdir())
+        except OSError:
+            self.misses += 1
+            return None
+
+        output_dir = Path(output_dir)
+        _remove_outputs(output_dir, module_name)
+        try:
+            for item in items:
+                if item.is_dir():
+                    shutil.copytree(item, output_dir / item.name)
+                else:
+                    shutil.copy2(item, output_dir / item.name)
+        except OSError:
+            # Evicted mid-copy; leave no partial tree for the regeneration
+            _remove_outputs(output_dir, module_name)
+            self.misses += 1
+            return None
+
+        # Entry mtime doubles as the last-used time for LRU eviction
+        os.utime(entry)
+        self.hits += 1
+        return meta
+
+    def store(self, module_name, version, output_dir, **extra):
+        """Save the generated tree for a module into the cache."""
+        output_dir = Path(output_dir)
+        sources = _output_paths(output_dir, module_name)
+        if not sources:
+            return
+
+        entry = self.cache_dir / self.key(module_name, version)
+        # Build the entry next to its final location and rename it into place,
+        # so concurrent builds sharing the cache never see a partial entry
+        staging = self.cache_dir / f'.tmp-{uuid.uuid4().hex}'
+        files = staging / 'files'
+        files.mkdir(parents=True)
+        for source in sources:
+            if source.is_dir():
+                shutil.copytree(source, files / source.name)
+            else:
+                shutil.copy2(source, files / source.name)
+        meta = {
+            'module': module_name,
+            'version': version,
+            'size': _dir_size(files),
+            'created': time.time(),
+        }
+        meta.update(extra)
+        (staging / 'meta.json').write_text(json.dumps(meta), encoding='utf-8')
+
+        if entry.exists():
+            shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.replace(staging, entry)
+            self.stored += 1
+        except OSError:
+            # Another build stored the same key first
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits ``max_bytes``."""
+        entries = []
+        total = 0
+        for entry in self.cache_dir.iterdir():
+            if not entry.is_dir():
+                continue
+            if entry.name.startswith('.tmp-'):
+                # Left behind by an interrupted build
+                if time.time() - entry.stat().st_mtime > 3600:
+                    shutil.rmtree(entry, ignore_errors=True)
+                continue
+            try:
+                size = json.loads((entry / 'meta.json').read_text(encoding='utf-8'))['size']
+            except (OSError, ValueError, KeyError):
+                shutil.rmtree(entry, ignore_errors=True)
+                continue
+            entries.append((entry.stat().st_mtime, size, entry))
+            total += size
+
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            self.evicted += 1
+        return total
+
+    def report(self):
+        """Print hit/miss statistics."""
+        lookups = self.hits + self.misses
+        rate = (100.0 * self.hits / lookups) if lookups else 0.0
+        print(f"pdoc cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate), "
+              f"{self.stored} stored, {self.evicted} evicted")
+        print(f"Cache directory: {self.cache_dir}")
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Long-lived pdoc3 worker engine.
+
+Each worker process imports pdoc once and renders packages through its Python
+API (``pdoc.Module`` / ``Module.html``) instead of paying interpreter startup
+and the pdoc/Sphinx/docutils import chain for every package. Workers are
+recycled after a fixed number of packages or when their resident memory
+grows past a threshold, so a leaky package can't grow memory without bound.
+"""
+import contextlib
+import io
+import multiprocessing as mp
+import os
+import time
+import warnings
+from collections import deque
+from multiprocessing import connection
+from pathlib import Path
+
+from profiling import current_rss_mb, peak_rss_mb
+
+# Recycle a worker after this many packages
+DEFAULT_MAX_TASKS = 20
+
+# Recycle a worker once its resident set size passes this many megabytes
+DEFAULT_MAX_RSS_MB = 1024
+
+
+def render_package(module_name, output_dir):
+    """Render HTML docs for ``module_name`` and all its submodules.
+
+    Writes the same ``<output_dir>/<module>/...`` layout as
+    ``python -m pdoc --html``. Returns ``(module_count, total_bytes)``.
+    """
+    import pdoc
+
+    # A fresh context per package keeps long-lived workers from accumulating
+    # the documentation objects of every package they have rendered
+    context = pdoc.Context()
+    root = pdoc.Module(module_name, context=context)
+    pdoc.link_inheritance(context)
+
+    module_count = 0
+    total_bytes = 0
+    pending = [root]
+    while pending:
+        module = pending.pop()
+        html = module.html().encode('utf-8')
+        path = Path(output_dir, *module.url().split('/'))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(html)
+        module_count += 1
+        total_bytes += len(html)
+        pending.extend(module.submodules())
+
+    return module_count, total_bytes
+
+
+def _worker_main(tasks, results, max_tasks, max_rss_mb):
+    """Worker loop: render packages until told to stop or due for recycling."""
+    import pdoc  # noqa: F401 - imported once for every package this worker renders
+
+    warnings.simplefilter('ignore')
+    done = 0
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        job_id, module_name, output_dir = task
+        # The engine starts the job's deadline from here, after spawn and
+        # imports; perf_counter is system-wide, so the parent can place the
+        # job on its own timeline
+        start = time.perf_counter()
+        results.send(('started', job_id, start))
+
+        captured = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(captured), contextlib.redirect_stderr(captured):
+                module_count, total_bytes = render_package(module_name, output_dir)
+            success = True
+            messages = []
+        except BaseException as e:
+            module_count = total_bytes = 0
+            success = False
+            messages = [f"  ⚠️  Could not generate docs for {module_name}: {str(e)[:100]}"]
+
+        done += 1
+        # Without a current figure, fall back to the peak, which is never lower
+        rss = current_rss_mb() or peak_rss_mb()[0] or 0.0
+        retire = done >= max_tasks or rss > max_rss_mb
+        results.send(('done', job_id, success, messages, module_count,
+                      total_bytes, time.perf_counter() - start, retire))
+        if retire:
+            return
+
+
+class PdocEngine:
+    """Pool of long-lived pdoc worker processes.
+
+    Each worker has its own task queue so the engine always knows which job a
+    worker is running, and its own results pipe, so killing a worker in the
+    middle of a send can only damage that worker's pipe, which is discarded
+    with it. A job's ``timeout`` runs from the worker reporting that it
+    started the job, so spawning a worker and importing pdoc don't count
+    against it; a job that outlives it gets its worker killed and replaced.
+    """
+
+    def __init__(self, workers=None, timeout=30, max_tasks=DEFAULT_MAX_TASKS,
+                 max_rss_mb=DEFAULT_MAX_RSS_MB):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.max_tasks = max_tasks
+        self.max_rss_mb = max_rss_mb
+        # spawn keeps workers clean of any threads or state in the parent
+        self._ctx = mp.get_context('spawn')
+        self._procs = {}
+        self.recycled = 0
+
+    def _spawn(self):
+        tasks = self._ctx.Queue()
+        reader, writer = self._ctx.Pipe(duplex=False)
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(tasks, writer, self.max_tasks, self.max_rss_mb),
+            daemon=True
+        )
+        proc.start()
+        # Only the worker holds the write end, so its exit shows up as EOF
+        writer.close()
+        self._procs[proc.pid] = (proc, tasks, reader)
+        return proc.pid
+
+    def _retire(self, pid, kill=False):
+        proc, tasks, reader = self._procs.pop(pid)
+        if kill:
+            proc.kill()
+        proc.join(timeout=5)
+        tasks.close()
+        reader.close()
+
+    def run(self, jobs, output_dir):
+        """Render ``jobs`` and yield one result per job as it finishes.
+
+        ``jobs`` is a list of ``(module_name, pkg_name, version)`` tuples. Each
+        result is ``(job, success, messages, module_count, total_bytes, start,
+        seconds)``, ``start`` being the ``time.perf_counter()`` value at which the
+        worker started the job.
+        """
+        pending = deque(enumerate(jobs))
+        # pid -> (job_id, deadline, start); deadline and start are None until
+        # the worker reports that it has started the job
+        running = {}
+        idle = []
+
+        try:
+            while pending or running:
+                # Hand out work, starting workers on demand
+                while pending and (idle or len(self._procs) < self.workers):
+                    pid = idle.pop() if idle else self._spawn()
+                    job_id, (module_name, _, _) = pending.popleft()
+                    self._procs[pid][1].put((job_id, module_name, output_dir))
+                    running[pid] = (job_id, None, None)
+
+                deadlines = [deadline for _, deadline, _ in running.values() if deadline is not None]
+                wait = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+                readers = {self._procs[pid][2]: pid for pid in running}
+                ready = connection.wait(list(readers), timeout=wait)
+                now = time.monotonic()
+
+                for reader in ready:
+                    pid = readers[reader]
+                    try:
+                        message = reader.recv()
+                    except (EOFError, OSError):
+                        # The worker died without reporting (crash, OOM kill)
+                        job_id, _, start = running.pop(pid)
+                        self._retire(pid, kill=True)
+                        self.recycled += 1
+                        if start is None:
+                            start = time.perf_counter()
+                        yield (jobs[job_id], False,
+                               [f"  ❌ pdoc worker died while generating docs for {jobs[job_id][0]}"],
+                               0, 0, start, time.perf_counter() - start)
+                        continue
+                    if message[0] == 'started':
+                        _, job_id, start = message
+                        running[pid] = (job_id, now + self.timeout, start)
+                        continue
+
+                    _, job_id, success, messages, module_count, total_bytes, seconds, retire = message
+                    start = running.pop(pid)[2]
+                    if retire:
+                        self._retire(pid)
+                        self.recycled += 1
+                    else:
+                        idle.append(pid)
+                    yield jobs[job_id], success, messages, module_count, total_bytes, start, seconds
+
+                # Kill every worker whose job has overrun its deadline
+                now = time.monotonic()
+                for pid, (job_id, deadline, start) in list(running.items()):
+                    if deadline is not None and deadline <= now:
+                        del running[pid]
+                        self._retire(pid, kill=True)
+                        self.recycled += 1
+                        module_name = jobs[job_id][0]
+                        yield (jobs[job_id], False,
+                               [f"  ⏱️  Timeout generating docs for {module_name}"],
+                               0, 0, start, time.perf_counter() - start)
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop all workers."""
+        for pid, (proc, tasks, _) in list(self._procs.items()):
+            if proc.is_alive():
+                tasks.put(None)
+        for pid in list(self._procs):
+            proc = self._procs[pid][0]
+            proc.join(timeout=5)
+            self._retire(pid, kill=proc.is_alive())
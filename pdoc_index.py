@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Index page and manifest for the generated pdoc tree.
+
+Both are built from the per-package records collected while generating
+(distribution, version, module count, size) rather than by re-scanning the
+output directory. Each is streamed to a temporary file that is renamed into
+place, so an HTTP server or a later build stage never reads a half-written
+file. ``manifest.json`` lets fix_doc_links learn which packages have docs
+without stat-ing every directory.
+"""
+import html
+import json
+import time
+from collections import namedtuple
+from pathlib import Path
+
+from fileutil import atomic_write
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+# ``path`` is the package's entry page relative to the output directory
+PackageDocs = namedtuple('PackageDocs', 'name distribution version modules bytes path',
+                         defaults=(None,))
+
+_HEADER = """<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <title>Package Documentation Index</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 40px; }
+        h1 { color: #333; }
+        table { border-collapse: collapse; }
+        th, td { padding: 6px 16px 6px 0; text-align: left; }
+        th { border-bottom: 2px solid #ddd; }
+        td.num { text-align: right; }
+        a { color: #0066cc; text-decoration: none; }
+        a:hover { text-decoration: underline; }
+    </style>
+</head>
+<body>
+    <h1>Python Package Documentation</h1>
+    <p>Auto-generated API documentation using pdoc3
+       (<a href="../_static/api-search.html">search all packages</a>)</p>
+    <table>
+        <tr><th>Package</th><th>Version</th><th>Modules</th><th>Size</th></tr>
+"""
+
+_ROW = """        <tr><td><a href="{href}">{name}</a></td><td>{version}</td><td class="num">{modules}</td><td class="num">{size}</td></tr>
+"""
+
+_FOOTER = """    </table>
+    <p>{count} packages, {modules} modules, {size}</p>
+</body>
+</html>
+"""
+
+
+def format_size(num_bytes):
+    """Human-readable size."""
+    if num_bytes < 1024:
+        return f'{num_bytes} B'
+    if num_bytes < 1024 * 1024:
+        return f'{num_bytes / 1024:.1f} KB'
+    return f'{num_bytes / (1024 * 1024):.1f} MB'
+
+
+def entry_page(output_dir, name):
+    """Return the page pdoc wrote for ``name``, relative to ``output_dir``.
+
+    A package gets ``<name>/index.html``, a single-file module ``<name>.html``.
+    """
+    if not (Path(output_dir) / name).is_dir() and (Path(output_dir) / f'{name}.html').is_file():
+        return f'{name}.html'
+    return f'{name}/index.html'
+
+
+def write_index(output_dir, packages):
+    """Stream ``index.html`` for ``packages`` (``{name: PackageDocs}``)."""
+    index_path = Path(output_dir) / 'index.html'
+    total_modules = total_bytes = 0
+    with atomic_write(index_path) as f:
+        f.write(_HEADER)
+        for name in sorted(packages, key=str.lower):
+            docs = packages[name]
+            total_modules += docs.modules
+            total_bytes += docs.bytes
+            f.write(_ROW.format(
+                href=html.escape(docs.path or entry_page(output_dir, name)),
+                name=html.escape(name),
+                version=html.escape(docs.version or '-'),
+                modules=docs.modules,
+                size=format_size(docs.bytes),
+            ))
+        f.write(_FOOTER.format(count=len(packages), modules=total_modules,
+                               size=format_size(total_bytes)))
+    return index_path
+
+
+def write_manifest(output_dir, packages):
+    """Write ``manifest.json`` describing ``packages``."""
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'generated': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'packages': {
+            name: {
+                'distribution': docs.distribution,
+                'version': docs.version,
+                'modules': docs.modules,
+                'bytes': docs.bytes,
+                'path': docs.path or entry_page(output_dir, name),
+            }
+            for name, docs in sorted(packages.items())
+        },
+    }
+    manifest_path = Path(output_dir) / MANIFEST_NAME
+    with atomic_write(manifest_path) as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
+    return manifest_path
+
+
+def load_manifest(output_dir):
+    """Return ``{name: PackageDocs}`` from ``manifest.json``, or None if unusable."""
+    try:
+        with open(Path(output_dir) / MANIFEST_NAME, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != MANIFEST_VERSION:
+            return None
+        return {
+            name: PackageDocs(name, entry.get('distribution'), entry.get('version'),
+                              entry.get('modules', 0), entry.get('bytes', 0), entry.get('path'))
+            for name, entry in manifest['packages'].items()
+        }
+    except (OSError, ValueError, KeyError, AttributeError):
+        return None
+
+
+def publish(output_dir, packages):
+    """Write the index page and the manifest for ``packages``."""
+    index_path = write_index(output_dir, packages)
+    write_manifest(output_dir, packages)
+    print(f"\nIndex created at: {index_path} ({len(packages)} packages)")
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Watch mode for generate_pdoc.py: keep the pdoc docs of local packages current.
+
+Watches the package sources under ``docs/tutorials/packages`` with inotify
+(through watchfiles, which sphinx-autobuild already depends on; without it
+the tree is polled) and collects a burst of saves into one update. Only the
+pages of the modules that changed, plus the package pages above them that
+list their summaries, are regenerated in this process. The changed package is
+dropped from ``sys.modules`` so its new source is imported, and pdoc itself
+stays loaded, so a save is reflected in well under a second.
+"""
+import importlib
+import os
+import sys
+import time
+import warnings
+from pathlib import Path
+
+try:
+    import watchfiles
+except ImportError:  # optional: fall back to polling
+    watchfiles = None
+
+DEFAULT_PACKAGES_DIR = Path(__file__).parent / 'docs' / 'tutorials' / 'packages'
+
+# Quiet period that ends a burst of saves, in milliseconds
+DEFAULT_DEBOUNCE_MS = 100
+
+# Polling interval when watchfiles is unavailable, in seconds
+POLL_INTERVAL = 0.25
+
+
+def local_packages(packages_dir):
+    """Return ``{package name: directory}`` for the packages in ``packages_dir``."""
+    return {
+        path.name: path for path in sorted(Path(packages_dir).iterdir())
+        if path.is_dir() and (path / '__init__.py').exists()
+    }
+
+
+def module_for_path(path, packages_dir):
+    """Map a changed source file to its dotted module name, or None."""
+    try:
+        rel = Path(path).resolve().relative_to(Path(packages_dir).resolve())
+    except ValueError:
+        return None
+    if rel.suffix != '.py' or len(rel.parts) < 2:
+        return None
+    parts = list(rel.with_suffix('').parts)
+    if parts[-1] == '__init__':
+        parts.pop()
+    return '.'.join(parts)
+
+
+def _purge_modules(package):
+    """Forget ``package`` and its submodules so the next import reads the source."""
+    for name in [name for name in sys.modules if name == package or name.startswith(package + '.')]:
+        del sys.modules[name]
+    importlib.invalidate_caches()
+
+
+def _write_if_changed(path, data):
+    """Atomically replace ``path`` with ``data`` unless it already holds it."""
+    try:
+        if path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.tmp')
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return True
+
+
+class LocalPackageRenderer:
+    """Render local packages in-process, rewriting only the pages that changed."""
+
+    def __init__(self, output_dir):
+        self.output_dir = Path(output_dir)
+        # package -> {module name: page path} from the previous render
+        self._pages = {}
+        # page path -> size in bytes, for the index
+        self._sizes = {}
+
+    def render(self, package, changed=None):
+        """Render ``package``; with ``changed`` module names, only their pages.
+
+        Package pages above a changed module are rendered too, since they
+        show its summary. A module that appeared or disappeared re-renders the
+        whole package and removes the stale pages. Returns the list of pages
+        whose content changed.
+        """
+        import pdoc
+
+        _purge_modules(package)
+        context = pdoc.Context()
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            root = pdoc.Module(package, context=context)
+            pdoc.link_inheritance(context)
+
+        modules = {}
+        pending = [root]
+        while pending:
+            module = pending.pop()
+            modules[module.name] = module
+            pending.extend(module.submodules())
+        pages = {name: Path(self.output_dir, *module.url().split('/')) for name, module in modules.items()}
+
+        previous = self._pages.get(package)
+        if changed is None or previous is None or previous.keys() != pages.keys():
+            targets = set(modules)
+            for name, page in (previous or {}).items():
+                if name not in pages:
+                    self._sizes.pop(page, None)
+                    if page.exists():
+                        page.unlink()
+        else:
+            targets = set()
+            for name in changed:
+                while name:
+                    targets.add(name)
+                    name = name.rpartition('.')[0]
+            targets &= modules.keys()
+        self._pages[package] = pages
+
+        written = []
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            for name in sorted(targets):
+                data = modules[name].html().encode('utf-8')
+                self._sizes[pages[name]] = len(data)
+                if _write_if_changed(pages[name], data):
+                    written.append(pages[name])
+        return written
+
+    def summary(self):
+        """Return ``{package: (module count, total bytes)}`` for everything rendered."""
+        return {
+            package: (len(pages), sum(self._sizes.get(page, 0) for page in pages.values()))
+            for package, pages in self._pages.items()
+        }
+
+
+def _watchfiles_changes(packages_dir, debounce_ms):
+    for changes in watchfiles.watch(packages_dir, watch_filter=watchfiles.PythonFilter(),
+                                    step=debounce_ms, debounce=max(1600, debounce_ms)):
+        yield {path for _, path in changes}
+
+
+def _snapshot(packages_dir):
+    snapshot = {}
+    for dirpath, dirnames, filenames in os.walk(packages_dir):
+        dirnames[:] = [d for d in dirnames if d != '__pycache__']
+        for name in filenames:
+            if name.endswith('.py'):
+                path = os.path.join(dirpath, name)
+                try:
+                    snapshot[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    pass
+    return snapshot
+
+
+def _polled_changes(packages_dir, debounce_ms):
+    before = _snapshot(packages_dir)
+    while True:
+        time.sleep(POLL_INTERVAL)
+        current = _snapshot(packages_dir)
+        if current == before:
+            continue
+        # Wait for the burst to settle before reporting it
+        while True:
+            time.sleep(debounce_ms / 1000)
+            latest = _snapshot(packages_dir)
+            if latest == current:
+                break
+            current = latest
+        yield {path for path in before.keys() | current.keys() if before.get(path) != current.get(path)}
+        before = current
+
+
+def watch_changes(packages_dir, debounce_ms=DEFAULT_DEBOUNCE_MS):
+    """Yield sets of changed paths, one set per debounced burst of edits."""
+    if watchfiles is not None:
+        return _watchfiles_changes(packages_dir, debounce_ms)
+    print("⚠️  watchfiles is not installed; polling for changes")
+    return _polled_changes(packages_dir, debounce_ms)
+
+
+def watch(packages_dir, output_dir, on_update, debounce_ms=DEFAULT_DEBOUNCE_MS):
+    """Render every local package, then re-render what changes until interrupted.
+
+    ``on_update`` is called with ``renderer.summary()`` after each pass that
+    wrote pages (generate_pdoc uses it to refresh the index and manifest).
+    """
+    packages_dir = Path(packages_dir).resolve()
+    if str(packages_dir) not in sys.path:
+        sys.path.insert(0, str(packages_dir))
+    renderer = LocalPackageRenderer(output_dir)
+
+    def run(package, changed=None):
+        start = time.perf_counter()
+        try:
+            written = renderer.render(package, changed)
+        except Exception as e:
+            # Mid-edit syntax errors are expected; keep the last good pages
+            print(f"  ✗ {package}: {type(e).__name__}: {e}")
+            return False
+        what = ', '.join(sorted(changed)) if changed else package
+        print(f"  ↻ {what}: {len(written)} page(s) updated in {time.perf_counter() - start:.2f}s")
+        return bool(written)
+
+    packages = local_packages(packages_dir)
+    print(f"Rendering {len(packages)} local packages from {packages_dir}")
+    for package in packages:
+        run(package)
+    on_update(renderer.summary())
+
+    print(f"👀 Watching {packages_dir} for changes (Ctrl+C to stop)")
+    for paths in watch_changes(packages_dir, debounce_ms):
+        by_package = {}
+        for path in paths:
+            module = module_for_path(path, packages_dir)
+            if module:
+                by_package.setdefault(module.partition('.')[0], set()).add(module)
+        updated = False
+        for package, modules in sorted(by_package.items()):
+            if (packages_dir / package / '__init__.py').exists():
+                updated |= run(package, modules)
+            else:
+                print(f"  - {package} is no longer a package; its pages are left in place")
+        if updated:
+            on_update(renderer.summary())
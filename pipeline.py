@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Run the documentation post-processing stages in a single process.
+
+Replaces the separate update_versions.py, validate_manual_links.py,
+generate_pdoc.py and fix_doc_links.py image build steps. Shared state (the
+installed package list and the parsed sphinx-packages.rst tables) is built
+once, each stage starts as soon as the stages it depends on have finished, so
+link validation overlaps pdoc generation, and the file is written once at
+the end. Per-stage timings are printed when the run completes; with
+``--profile`` a Chrome trace of every stage, pdoc job and URL check is
+written as well (see profiling.py).
+"""
+import argparse
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import fix_doc_links
+import generate_pdoc
+import profiling
+import update_versions
+import validate_manual_links
+from dist_index import get_index
+from link_cache import LinkCache
+from rst_table import PackageTables
+
+
+class Stage:
+    """A named pipeline step and the stages that must finish before it.
+
+    Stages that build shared state for later stages (``provides_state``)
+    can't be skipped: their dependents would run without it.
+    """
+
+    def __init__(self, name, func, deps=(), provides_state=False):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.provides_state = provides_state
+
+
+class PipelineContext:
+    """State shared between stages."""
+
+    def __init__(self, docs_dir):
+        self.docs_dir = Path(docs_dir)
+        self.rst_path = self.docs_dir / 'sphinx-packages.rst'
+        self.pdoc_dir = self.docs_dir / 'pdoc'
+        self.packages = None
+        self.tables = None
+
+
+def stage_installed(ctx):
+    """Index installed distributions once for every stage that needs them."""
+    ctx.packages = get_index()
+    print(f"✓ Found {len(ctx.packages)} installed packages")
+
+
+def stage_tables(ctx):
+    """Parse sphinx-packages.rst into the shared table model."""
+    if not ctx.rst_path.exists():
+        raise FileNotFoundError(f"RST file not found: {ctx.rst_path}")
+    ctx.tables = PackageTables.load(ctx.rst_path)
+    print(f"✓ Parsed {len(ctx.tables.rows)} package rows from {ctx.rst_path}")
+
+
+def stage_versions(ctx):
+    """Fill in installed versions."""
+    updated = update_versions.apply_versions(ctx.tables, ctx.packages)
+    print(f"✓ Updated {updated} versions")
+
+
+def stage_links(ctx):
+    """Validate Manual links and replace broken ones."""
+    cache = LinkCache()
+    try:
+        validate_manual_links.fix_manual_links(ctx.tables, cache=cache)
+    finally:
+        cache.close()
+
+
+def stage_pdoc(ctx):
+    """Generate pdoc3 documentation."""
+    generate_pdoc.generate(ctx.packages, ctx.pdoc_dir, generate_pdoc.parse_args([]))
+
+
+def stage_api_links(ctx):
+    """Drop API links for packages without generated pdoc docs."""
+    if not ctx.pdoc_dir.exists():
+        print(f"⚠ pdoc directory not found: {ctx.pdoc_dir}; no API links removed")
+        return
+    generated = fix_doc_links.get_generated_packages(ctx.pdoc_dir)
+    print(f"✓ Found {len(generated)} packages with pdoc documentation")
+    fix_doc_links.report_api_links(*fix_doc_links.remove_missing_api_links(ctx.tables, generated))
+
+
+def stage_save(ctx):
+    """Write sphinx-packages.rst once with every stage's edits."""
+    ctx.tables.save(ctx.rst_path)
+    print(f"✓ Wrote {ctx.rst_path}")
+
+
+STAGES = [
+    Stage('installed', stage_installed, provides_state=True),
+    Stage('tables', stage_tables, provides_state=True),
+    Stage('versions', stage_versions, ('installed', 'tables')),
+    Stage('links', stage_links, ('tables',)),
+    Stage('pdoc', stage_pdoc, ('installed',)),
+    Stage('api_links', stage_api_links, ('pdoc', 'tables')),
+    Stage('save', stage_save, ('versions', 'links', 'api_links')),
+]
+
+
+def _timed(stage, ctx):
+    start = time.perf_counter()
+    print(f"\n▶ {stage.name}")
+    with profiling.span(stage.name, 'stage'):
+        stage.func(ctx)
+    return time.perf_counter() - start
+
+
+def run_pipeline(stages, ctx, skip=()):
+    """Run ``stages`` respecting their dependencies.
+
+    Stages whose dependencies are done run concurrently. A failed stage
+    causes everything that depends on it to be skipped. Only stages that
+    don't provide shared state can be given in ``skip``. Returns a list of
+    ``(name, status, seconds)`` in completion order.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    required = [name for name in skip if name in by_name and by_name[name].provides_state]
+    if required:
+        raise ValueError(f"Stages other stages need can't be skipped: {', '.join(required)}")
+    pending = dict(by_name)
+    done = set()
+    failed = set()
+    report = []
+
+    for name in skip:
+        if pending.pop(name, None):
+            done.add(name)
+            report.append((name, 'skipped', 0.0))
+
+    with ThreadPoolExecutor(max_workers=len(stages)) as executor:
+        running = {}
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if any(dep in failed for dep in stage.deps):
+                    del pending[name]
+                    failed.add(name)
+                    report.append((name, 'skipped (dependency failed)', 0.0))
+                elif all(dep in done for dep in stage.deps):
+                    del pending[name]
+                    running[executor.submit(_timed, stage, ctx)] = (name, time.perf_counter())
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, start = running.pop(future)
+                try:
+                    report.append((name, 'ok', future.result()))
+                    done.add(name)
+                except Exception:
+                    print(f"✗ Stage {name} failed:\n{traceback.format_exc()}")
+                    report.append((name, 'failed', time.perf_counter() - start))
+                    failed.add(name)
+    return report
+
+
+def print_timings(report, wall):
+    """Print the per-stage timing table."""
+    print("\n" + "=" * 60)
+    print("Pipeline stage timings")
+    print("=" * 60)
+    for name, status, seconds in report:
+        mark = '✓' if status == 'ok' else '✗' if status == 'failed' else '-'
+        print(f"  {mark} {name:<12} {seconds:8.2f}s  {status}")
+    busy = sum(seconds for _, _, seconds in report)
+    print(f"  Wall time {wall:.2f}s (stage time {busy:.2f}s)")
+    print("=" * 60)
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--docs-dir', type=Path, default=Path(__file__).parent / 'docs',
+                        help='Sphinx source directory (default: docs next to this script)')
+    parser.add_argument('--skip', action='append', default=[],
+                        choices=[stage.name for stage in STAGES if not stage.provides_state],
+                        help='Skip a stage (repeatable), e.g. --skip links for offline builds')
+    parser.add_argument('--profile', action='store_true',
+                        help='Write a Chrome trace and print the slowest stages, packages and URLs')
+    parser.add_argument('--profile-dir', type=Path, default=profiling.DEFAULT_PROFILE_DIR,
+                        help=f'Where --profile writes pipeline.trace.json (default: {profiling.DEFAULT_PROFILE_DIR})')
+    parser.add_argument('--top', type=int, default=profiling.DEFAULT_TOP,
+                        help=f'Slowest spans listed by --profile (default: {profiling.DEFAULT_TOP})')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main function."""
+    args = parse_args(argv)
+    print("=" * 60)
+    print("Running documentation pipeline")
+    print("=" * 60)
+
+    profiler = profiling.enable('pipeline') if args.profile else None
+    start = time.perf_counter()
+    report = run_pipeline(STAGES, PipelineContext(args.docs_dir), skip=args.skip)
+    print_timings(report, time.perf_counter() - start)
+    if profiler:
+        profiler.report(args.top)
+        print(f"✓ Trace written to {profiler.write_trace(args.profile_dir / 'pipeline.trace.json')}")
+    return 1 if any(status != 'ok' and status != 'skipped' for _, status, _ in report) else 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Span timing and peak memory tracking for the documentation build tools.
+
+Stages, packages and URLs are recorded as spans while a ``Profiler`` is
+enabled; with none enabled, ``span`` and ``record`` cost next to nothing, so
+the build scripts call them unconditionally. At the end the spans are written
+as a Chrome trace-event file (open it in chrome://tracing or
+https://ui.perfetto.dev) and the slowest ones are printed::
+
+    profiler = profiling.enable()
+    with profiling.span('pdoc', 'stage'):
+        ...
+    profiler.write_trace(path)
+    profiler.report()
+"""
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS figures
+    resource = None
+
+# Where pipeline.py and build_docs.py put traces and profiles by default
+DEFAULT_PROFILE_DIR = Path(os.environ.get(
+    'VIPER_PROFILE_DIR', Path(__file__).parent / 'docs' / '_build' / 'profile'))
+
+# Spans listed in the slowest-spans report
+DEFAULT_TOP = 15
+
+Span = namedtuple('Span', 'name category start seconds tid args')
+
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+_profiler = None
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB, or None where unavailable."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def peak_rss_mb():
+    """Return ``(this process, largest finished child)`` peak RSS in MB."""
+    if resource is None:
+        return None, None
+    # ru_maxrss is in KB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale)
+
+
+class Profiler:
+    """Collects spans from any thread of one process."""
+
+    def __init__(self, name='build'):
+        self.name = name
+        self.spans = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        # RSS samples as (offset seconds, MB), taken as spans end
+        self._rss = []
+        # category -> end offsets of its lanes, for spans recorded after the fact
+        self._lanes = {}
+
+    def _add(self, span):
+        rss = current_rss_mb()
+        with self._lock:
+            self.spans.append(span)
+            if rss is not None:
+                self._rss.append((span.start + span.seconds, rss))
+
+    @contextlib.contextmanager
+    def span(self, name, category='stage', **args):
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            seconds = time.perf_counter() - start
+            self._add(Span(name, category, start - self._origin, seconds,
+                           threading.get_ident(), args))
+
+    def record(self, name, category, start, seconds, **args):
+        """Add a span timed elsewhere; ``start`` is a ``time.perf_counter()`` value.
+
+        Such spans (pdoc jobs, URL checks) overlap freely, so each is put on
+        the first lane of its category that is free at ``start``.
+        """
+        offset = start - self._origin
+        with self._lock:
+            lanes = self._lanes.setdefault(category, [])
+            for lane, end in enumerate(lanes):
+                if end <= offset:
+                    break
+            else:
+                lane = len(lanes)
+                lanes.append(0)
+            lanes[lane] = offset + seconds
+        self._add(Span(name, category, offset, seconds, f'{category}-{lane}', args))
+
+    def write_trace(self, path):
+        """Write the spans as a Chrome trace-event JSON file."""
+        pid = os.getpid()
+        threads = {}
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                   'args': {'name': self.name}}]
+        for span in sorted(self.spans, key=lambda s: s.start):
+            if span.tid not in threads:
+                threads[span.tid] = len(threads) + 1
+                label = span.tid if isinstance(span.tid, str) else f'thread {len(threads)}'
+                events.append({'name': 'thread_name', 'ph': 'M', 'pid': pid,
+                               'tid': threads[span.tid], 'args': {'name': label}})
+            events.append({
+                'name': span.name, 'cat': span.category, 'ph': 'X', 'pid': pid,
+                'tid': threads[span.tid], 'ts': round(span.start * 1e6),
+                'dur': round(span.seconds * 1e6), 'args': span.args,
+            })
+        for offset, rss in sorted(self._rss):
+            events.append({'name': 'RSS (MB)', 'ph': 'C', 'pid': pid, 'tid': 0,
+                           'ts': round(offset * 1e6), 'args': {'rss': round(rss, 1)}})
+
+        peak, child = peak_rss_mb()
+        trace = {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'tool': self.name, 'peak_rss_mb': peak, 'peak_child_rss_mb': child},
+        }
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(trace), encoding='utf-8')
+        return path
+
+    def report(self, top=DEFAULT_TOP):
+        """Print the slowest spans, per-category totals and peak RSS."""
+        spans = sorted(self.spans, key=lambda s: s.seconds, reverse=True)
+        print("\n" + "=" * 60)
+        print(f"Slowest spans (top {min(top, len(spans))} of {len(spans)})")
+        print("=" * 60)
+        for span in spans[:top]:
+            print(f"  {span.seconds:8.2f}s  {span.category:<8} {span.name}")
+
+        totals = {}
+        for span in spans:
+            count, seconds = totals.get(span.category, (0, 0.0))
+            totals[span.category] = (count + 1, seconds + span.seconds)
+        for category, (count, seconds) in sorted(totals.items(), key=lambda t: -t[1][1]):
+            print(f"  {category:<8} {count:5d} spans {seconds:9.2f}s total")
+
+        peak, child = peak_rss_mb()
+        if peak is not None:
+            print(f"  Peak RSS {peak:.0f} MB (largest child process {child:.0f} MB)")
+        print("=" * 60)
+
+
+def enable(name='build'):
+    """Start collecting spans in this process and return the ``Profiler``."""
+    global _profiler
+    _profiler = Profiler(name)
+    return _profiler
+
+
+def get_profiler():
+    """The enabled ``Profiler``, or None."""
+    return _profiler
+
+
+def span(name, category='stage', **args):
+    """Time a block as a span when profiling is enabled.
+
+    The context value is the span's ``args`` dict, so details found inside
+    the block (a status code, a module count) can be attached to it.
+    """
+    if _profiler is None:
+        return contextlib.nullcontext({})
+    return _profiler.span(name, category, **args)
+
+
+def record(name, category, start, seconds, **args):
+    """Record a span measured elsewhere when profiling is enabled."""
+    if _profiler is not None:
+        _profiler.record(name, category, start, seconds, **args)
+
+
+ImportTime = namedtuple('ImportTime', 'module self_us cumulative_us depth')
+
+
+def parse_importtime(lines):
+    """Parse ``python -X importtime`` stderr lines; other lines are skipped.
+
+    Each line is ``import time: self | cumulative | name``, with the name
+    indented two spaces per level of nesting, children listed before their parent.
+    """
+    entries = []
+    for line in lines:
+        if not line.startswith('import time:'):
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            self_us, cumulative_us = int(self_us), int(cumulative_us)
+        except ValueError:
+            continue  # the header line
+        name = name.rstrip('\n')
+        module = name.lstrip()
+        entries.append(ImportTime(module, self_us, cumulative_us,
+                                  (len(name) - len(module) - 1) // 2))
+    return entries
+
+
+def summarize_importtime(entries, modules=()):
+    """Cumulative import seconds per top-level package, slowest first.
+
+    Only outermost imports are counted, so nested imports are not counted
+    twice. Imports within one of ``modules`` (Sphinx extensions, say) are
+    counted under that module rather than its package. Modules loaded with
+    ``importlib.import_module``, as Sphinx loads extensions, get no line of
+    their own, only their imports do; their own body time is not seen.
+    """
+    modules = sorted(modules, key=len, reverse=True)
+    packages = {}
+    for entry in entries:
+        if entry.depth == 0:
+            package = next((name for name in modules if entry.module == name
+                            or entry.module.startswith(name + '.')), entry.module.split('.')[0])
+            packages[package] = packages.get(package, 0) + entry.cumulative_us / 1e6
+    return dict(sorted(packages.items(), key=lambda item: -item[1]))
+
+
+def report_importtime(entries, top=DEFAULT_TOP, highlight=()):
+    """Print the slowest top-level packages to import; ``highlight`` modules are marked."""
+    packages = summarize_importtime(entries, highlight)
+    total = sum(packages.values())
+    print("\n" + "=" * 60)
+    print(f"Import time: {total:.2f}s in {len(entries)} modules "
+          f"(top {min(top, len(packages))} of {len(packages)} packages)")
+    print("=" * 60)
+    for package, seconds in list(packages.items())[:top]:
+        mark = ' *' if package in highlight else ''
+        print(f"  {seconds:8.3f}s  {100 * seconds / total if total else 0:5.1f}%  {package}{mark}")
+    if highlight:
+        print("  * configured Sphinx extension")
+    print("=" * 60)
+    return packages
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+In-memory model of the package tables in sphinx-packages.rst.
+
+The file is parsed once into rows of named cells (name, version, pypi, api,
+manual, tutorial, description, taken from each table's header row). The
+post-processing stages edit cells in place and the file is serialized once.
+Everything outside the edited cells is written back byte for byte.
+``rewrite`` offers the same row interface as a single streamed pass for
+callers that edit the file on their own.
+"""
+import re
+
+from fileutil import atomic_write
+
+_LIST_TABLE = re.compile(r'^(\s*)\.\. list-table::')
+_HEADER_ROWS = re.compile(r'^\s+:header-rows:\s*(\d+)')
+_ROW_START = re.compile(r'^(\s*)\* -(?: (.*))?$')
+_CELL_START = re.compile(r'^(\s*)-(?: (.*))?$')
+_MARKER = re.compile(r'^\s*(?:\* )?-')
+
+
+class PackageRow:
+    """One data row of a list-table, with cells addressed by column name."""
+
+    def __init__(self, tables, columns, cell_lines):
+        self._tables = tables
+        self.columns = columns
+        # Line index of the first line of each cell, in column order
+        self._cell_lines = cell_lines
+
+    def _index(self, column):
+        try:
+            return self._cell_lines[self.columns.index(column)]
+        except (ValueError, IndexError):
+            return None
+
+    def get(self, column):
+        """Return the text of a cell ('' if the row has no such column)."""
+        index = self._index(column)
+        return '' if index is None else self._tables.cell_text(index)
+
+    def set(self, column, value):
+        """Replace the text of a cell, keeping its indentation and marker."""
+        index = self._index(column)
+        if index is None:
+            raise KeyError(column)
+        line = self._tables.lines[index]
+        self._tables.lines[index] = f'{_MARKER.match(line).group(0)} {value}\n'
+
+    @property
+    def name(self):
+        return self.get('name')
+
+    def __repr__(self):
+        return f'<PackageRow {self.name!r}>'
+
+
+class PackageTables:
+    """All list-table rows of an RST document, parsed in a single pass."""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.rows = []
+        self._parse()
+
+    @classmethod
+    def load(cls, path):
+        """Parse an RST file."""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(f.readlines())
+
+    def save(self, path):
+        """Serialize the document back to ``path`` (atomically)."""
+        with atomic_write(path) as f:
+            f.writelines(self.lines)
+
+    def to_string(self):
+        return ''.join(self.lines)
+
+    def _parse(self):
+        for columns, cell_lines, _ in _iter_rows(self.lines, self.cell_text):
+            self.rows.append(PackageRow(self, columns, cell_lines))
+
+    def cell_text(self, index):
+        """Return the text after the ``* -`` / ``-`` marker on line ``index``."""
+        return _cell_text(self.lines[index])
+
+
+def _cell_text(line):
+    line = line.rstrip('\r\n')
+    return line[_MARKER.match(line).end():].strip()
+
+
+def _iter_rows(lines, cell_text):
+    """Parse list-table rows from ``lines`` as they are read.
+
+    Yields ``(columns, cell_lines, next_index)`` for every data row once it
+    is complete. ``next_index`` is the index of the line that ended it (None
+    at the end of input), so every line before it has been consumed and no
+    later row will refer back to it.
+    """
+    table_indent = None
+    header_rows = 0
+    columns = None
+    seen_rows = 0
+    row_cells = None
+    cell_indent = None
+
+    def finish_row():
+        # Returns the finished data row, after recording header rows
+        nonlocal seen_rows, columns
+        if row_cells is None:
+            return None
+        seen_rows += 1
+        if seen_rows <= header_rows:
+            columns = [cell_text(i).lower() for i in row_cells]
+            return None
+        return (columns, row_cells) if columns else None
+
+    index = -1
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        match = _LIST_TABLE.match(line)
+        if match:
+            row = finish_row()
+            if row:
+                yield row + (index,)
+            table_indent = len(match.group(1))
+            header_rows, columns, seen_rows, row_cells = 0, None, 0, None
+            continue
+        if table_indent is None:
+            continue
+
+        indent = len(line) - len(line.lstrip())
+        if stripped and indent <= table_indent:
+            # Dedent ends the table
+            row = finish_row()
+            if row:
+                yield row + (index,)
+            table_indent, row_cells = None, None
+            continue
+
+        match = _HEADER_ROWS.match(line)
+        if match and row_cells is None:
+            header_rows = int(match.group(1))
+            continue
+        match = _ROW_START.match(line.rstrip('\r\n'))
+        if match:
+            row = finish_row()
+            if row:
+                yield row + (index,)
+            row_cells = [index]
+            # Cells of this row line their "-" up under the row's "-"
+            cell_indent = len(match.group(1)) + 2
+            continue
+        match = _CELL_START.match(line.rstrip('\r\n'))
+        if row_cells is not None and match and len(match.group(1)) == cell_indent:
+            row_cells.append(index)
+
+    row = finish_row()
+    if row:
+        yield row + (None,)
+
+
+class _StreamBuffer:
+    """Lines read from a file but not yet written out, addressed by line index."""
+
+    def __init__(self, source):
+        self._source = source
+        self._base = 0
+        self._pending = []
+
+    def __iter__(self):
+        for line in self._source:
+            self._pending.append(line)
+            yield line
+
+    def __getitem__(self, index):
+        return self._pending[index - self._base]
+
+    def __setitem__(self, index, value):
+        self._pending[index - self._base] = value
+
+    def cell_text(self, index):
+        return _cell_text(self[index])
+
+    @property
+    def lines(self):
+        # PackageRow reads and writes cells through ``tables.lines``
+        return self
+
+    def flush(self, out, upto=None):
+        """Write the pending lines before index ``upto`` (all of them if None)."""
+        count = len(self._pending) if upto is None else upto - self._base
+        out.writelines(self._pending[:count])
+        del self._pending[:count]
+        self._base += count
+
+
+def rewrite(path, edit):
+    """Stream ``path`` through ``edit(row)`` for every data row, in one pass.
+
+    Only the lines of the row being edited are held in memory. Output goes to
+    a temporary file that atomically replaces ``path`` once the whole file
+    has been written. Returns the number of rows seen.
+    """
+    count = 0
+    with open(path, 'r', encoding='utf-8') as src, atomic_write(path) as out:
+        buffer = _StreamBuffer(src)
+        for columns, cell_lines, next_index in _iter_rows(buffer, buffer.cell_text):
+            edit(PackageRow(buffer, columns, cell_lines))
+            buffer.flush(out, next_index)
+            count += 1
+        buffer.flush(out)
+    return count
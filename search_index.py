@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Build one search index over the Sphinx pages and every pdoc API tree.
+
+Sphinx's searchindex.js only covers the .rst pages. This stage also reads
+each pdoc package under ``<html>/pdoc`` and the Sphinx search data
+(page and section titles and documented objects), then writes a compact
+inverted index to ``<html>/_static/search/`` for ``_static/api-search.html``:
+
+* ``index.json`` is the small manifest (shard keys, kinds, chunk size).
+* ``t/<xx>.json`` maps every token starting with ``xx`` to the ids of the
+  entries it appears in, best matches first.
+* ``e/<n>.json`` holds entries ``n * chunk`` and up, as
+  ``[name, kind, url, summary, package]``.
+
+The page fetches the manifest, then only the shards for the typed prefixes
+and the entry chunks of the results it shows.
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from pathlib import Path
+
+# Entries per e/<n>.json chunk; ids are assigned module by module so the
+# results of one search tend to share chunks
+CHUNK_SIZE = 500
+
+# Characters of the token prefix that select a shard
+SHARD_PREFIX = 2
+
+# Longest summary kept per entry
+MAX_SUMMARY = 160
+
+# Result order among equally good name matches
+KIND_PRIORITY = {
+    'package': 0, 'module': 0, 'class': 1, 'function': 2, 'page': 2,
+    'method': 3, 'property': 4, 'variable': 5, 'section': 6,
+}
+
+_PDOC_KINDS = {'def': 'function', 'async': 'function', 'class': 'class', 'var': 'variable',
+               'prop': 'property'}
+_WORD = re.compile(r'[A-Za-z0-9_]+')
+_CAMEL = re.compile(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+')
+_UNDERLINE = re.compile(r'^\s*([~=\-^"#*+])\1{2,}\s*$', re.MULTILINE)
+_SPACE = re.compile(r'\s+')
+
+
+def summarize(text):
+    """Collapse whitespace and cut ``text`` at a word boundary."""
+    text = _SPACE.sub(' ', text).strip()
+    if len(text) <= MAX_SUMMARY:
+        return text
+    return text[:MAX_SUMMARY].rsplit(' ', 1)[0] + '…'
+
+
+def tokenize(text):
+    """Return the lowercase search tokens for an identifier or title.
+
+    ``requests.Session.merge_environment_settings`` yields each dotted part
+    (``merge_environment_settings``) as well as its underscore and camelCase
+    pieces (``merge``, ``environment``, ``settings``, ``session``).
+    """
+    tokens = set()
+    for word in _WORD.findall(text):
+        word = word.strip('_')
+        if not word:
+            continue
+        tokens.add(word.lower())
+        for part in word.split('_'):
+            tokens.update(piece.lower() for piece in _CAMEL.findall(part))
+    return {token for token in tokens if len(token) >= SHARD_PREFIX}
+
+
+class PdocPageParser(HTMLParser):
+    """Collect the module and documented objects of one pdoc3 HTML page."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.module = None
+        self.module_kind = 'module'
+        self.module_summary = ''
+        self.objects = []  # [id, kind, summary]
+        self._capture = None
+        self._text = []
+        self._in_intro = False
+        self._awaiting_desc = None
+        self._want_paragraph = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        if tag == 'h1' and 'title' in classes:
+            self._start('title')
+        elif tag == 'section' and attrs.get('id') == 'section-intro':
+            self._in_intro = True
+            self._want_paragraph = 'intro'
+        elif tag == 'dt' and attrs.get('id'):
+            self.objects.append([attrs['id'], None, ''])
+            self._start('dt')
+        elif tag == 'div' and 'desc' in classes and self._awaiting_desc is not None:
+            self._want_paragraph = 'desc'
+        elif tag == 'p' and self._want_paragraph and self._capture is None:
+            self._start('p')
+
+    def handle_endtag(self, tag):
+        if tag == 'h1' and self._capture == 'title':
+            words = self._finish().split()
+            if words:
+                self.module_kind = words[0].lower() if len(words) > 1 else 'module'
+                self.module = words[-1]
+        elif tag == 'dt' and self._capture == 'dt':
+            words = self._finish().split()
+            obj = self.objects[-1]
+            obj[1] = _PDOC_KINDS.get(words[0] if words else '', 'variable')
+            self._awaiting_desc = obj
+        elif tag == 'p' and self._capture == 'p':
+            text = self._finish()
+            if self._want_paragraph == 'intro':
+                # Skip reST-style headings such as "requests.api\n~~~~~~~~~~~~"
+                if text and not _UNDERLINE.search(text):
+                    self.module_summary = summarize(text)
+                    self._want_paragraph = None
+            else:
+                self._awaiting_desc[2] = summarize(text)
+                self._awaiting_desc = self._want_paragraph = None
+        elif tag == 'section' and self._in_intro:
+            self._in_intro = False
+            if self._want_paragraph == 'intro':
+                self._want_paragraph = None
+        elif tag == 'div' and self._want_paragraph == 'desc' and self._capture is None:
+            # Empty docstring
+            self._awaiting_desc = self._want_paragraph = None
+
+    def handle_data(self, data):
+        if self._capture:
+            self._text.append(data)
+
+    def _start(self, what):
+        self._capture = what
+        self._text = []
+
+    def _finish(self):
+        self._capture = None
+        return ''.join(self._text)
+
+
+def parse_pdoc_page(path, html_dir):
+    """Return the entries of one pdoc page as ``[name, kind, url, summary]`` lists."""
+    parser = PdocPageParser()
+    with open(path, encoding='utf-8', errors='replace') as f:
+        parser.feed(f.read())
+    if not parser.module:
+        return []
+    url = Path(path).relative_to(html_dir).as_posix()
+    entries = [[parser.module, parser.module_kind, url, parser.module_summary]]
+    classes = set()
+    for obj_id, kind, summary in parser.objects:
+        parent = obj_id.rpartition('.')[0]
+        if kind == 'class':
+            classes.add(obj_id)
+        elif kind == 'function' and parent in classes:
+            kind = 'method'
+        entries.append([obj_id, kind, f'{url}#{obj_id}', summary])
+    return entries
+
+
+def pdoc_pages(pdoc_dir):
+    """Yield ``(package, page path)`` for every page under ``pdoc_dir``.
+
+    Packages are directories; single-module packages are top-level
+    ``<name>.html`` pages next to the API index.
+    """
+    for package in sorted(pdoc_dir.iterdir()):
+        if package.is_dir():
+            for path in sorted(package.rglob('*.html')):
+                yield package.name, path
+        elif package.suffix == '.html' and package.name != 'index.html':
+            yield package.stem, package
+
+
+def sphinx_entries(html_dir):
+    """Return page, section and object entries from Sphinx's searchindex.js."""
+    path = html_dir / 'searchindex.js'
+    if not path.exists():
+        return []
+    text = path.read_text(encoding='utf-8')
+    index = json.loads(text[text.index('(') + 1:text.rindex(')')])
+    docnames, titles = index['docnames'], index['titles']
+
+    def url(doc, anchor=None):
+        return f'{docnames[doc]}.html' + (f'#{anchor}' if anchor else '')
+
+    entries = [[title, 'page', url(doc), ''] for doc, title in enumerate(titles)]
+    for title, places in index.get('alltitles', {}).items():
+        for doc, anchor in places:
+            if anchor:
+                entries.append([title, 'section', url(doc, anchor), titles[doc]])
+    objnames = index.get('objnames', {})
+    for prefix, objects in index.get('objects', {}).items():
+        for doc, objtype, _, anchor, name in objects:
+            fullname = f'{prefix}.{name}' if prefix else name
+            domain, role, label = objnames[str(objtype)]
+            if anchor == '':
+                anchor = fullname
+            elif anchor == '-':
+                anchor = f'{role}-{fullname}'
+            entries.append([fullname, label.lower(), url(doc, anchor), titles[doc]])
+    return entries
+
+
+def build_index(html_dir, pdoc_dir, workers=None):
+    """Collect every entry and return ``(entries, postings)``.
+
+    ``entries`` are ``[name, kind, url, summary, package]``; ``postings``
+    maps each token to the entry ids it occurs in, best match first.
+    """
+    entries = [entry + [''] for entry in sphinx_entries(html_dir)]
+    if pdoc_dir.is_dir():
+        pages = list(pdoc_pages(pdoc_dir))
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(parse_pdoc_page, [path for _, path in pages],
+                                   [html_dir] * len(pages),
+                                   chunksize=max(1, len(pages) // (workers * 8)))
+            for (package, _), page_entries in zip(pages, results):
+                entries.extend(entry + [package] for entry in page_entries)
+
+    ranked = {}
+    for entry_id, (name, kind, _, _, _) in enumerate(entries):
+        last = name.rpartition('.')[2].strip('_').lower()
+        priority = KIND_PRIORITY.get(kind, len(KIND_PRIORITY))
+        for token in tokenize(name):
+            # Hits on the object's own name beat hits on its module path
+            rank = (token != last, priority, len(name), entry_id)
+            ranked.setdefault(token, []).append(rank)
+    postings = {token: [rank[-1] for rank in sorted(ranks)] for token, ranks in ranked.items()}
+    return entries, postings
+
+
+def _write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def write_index(out_dir, entries, postings):
+    """Write the manifest, token shards and entry chunks, replacing ``out_dir``."""
+    out_dir = Path(out_dir)
+    staging = out_dir.with_name(out_dir.name + '.tmp')
+    shutil.rmtree(staging, ignore_errors=True)
+    (staging / 't').mkdir(parents=True)
+    (staging / 'e').mkdir()
+
+    shards = {}
+    for token in sorted(postings):
+        shards.setdefault(token[:SHARD_PREFIX], {})[token] = postings[token]
+    for key, tokens in shards.items():
+        _write_json(staging / 't' / f'{key}.json', tokens)
+    for start in range(0, len(entries), CHUNK_SIZE):
+        _write_json(staging / 'e' / f'{start // CHUNK_SIZE}.json', entries[start:start + CHUNK_SIZE])
+    _write_json(staging / 'index.json', {
+        'version': 1,
+        'count': len(entries),
+        'chunk': CHUNK_SIZE,
+        'prefix': SHARD_PREFIX,
+        'shards': sorted(shards),
+    })
+
+    # Move the old index aside and the finished one in, so a served page
+    # sees one index or the other (never half of one) and the gap without
+    # any index is two renames rather than a whole rmtree
+    retired = out_dir.with_name(out_dir.name + '.old')
+    shutil.rmtree(retired, ignore_errors=True)
+    if out_dir.exists():
+        os.replace(out_dir, retired)
+    os.replace(staging, out_dir)
+    shutil.rmtree(retired, ignore_errors=True)
+    return len(shards)
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('html_dir', nargs='?', type=Path,
+                        default=Path(__file__).parent / 'docs' / '_build' / 'html',
+                        help='Built HTML directory (default: docs/_build/html)')
+    parser.add_argument('--pdoc-dir', type=Path,
+                        help='pdoc output to index (default: <html_dir>/pdoc)')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='Parallel page parsers (default: CPU count)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main function."""
+    args = parse_args(argv)
+    html_dir = args.html_dir.resolve()
+    pdoc_dir = (args.pdoc_dir or html_dir / 'pdoc').resolve()
+    if not html_dir.is_dir():
+        print(f"✗ HTML directory not found: {html_dir}")
+        return 1
+
+    print("=" * 60)
+    print("Building combined search index")
+    print("=" * 60)
+    start = time.perf_counter()
+    entries, postings = build_index(html_dir, pdoc_dir, args.workers)
+    out_dir = html_dir / '_static' / 'search'
+    shard_count = write_index(out_dir, entries, postings)
+    packages = len({entry[4] for entry in entries if entry[4]})
+    print(f"✓ Indexed {len(entries)} entries ({packages} pdoc packages), "
+          f"{len(postings)} tokens in {shard_count} shards")
+    print(f"✓ Written to {out_dir} in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
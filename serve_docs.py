@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+Static file server for the built documentation.
+
+Replaces ``python3 -m http.server`` in the container. It runs on asyncio and
+sends file bodies with ``sendfile`` (zero-copy). When the client accepts them
+it serves precompressed ``.br``/``.gz`` siblings. Responses carry strong ETags
+and Cache-Control headers, with fingerprinted ``_static`` assets cached as
+immutable. Conditional (``If-None-Match``/``If-Modified-Since``) and single
+``Range`` requests are answered, and hot small files are kept in a bounded
+in-memory LRU cache.
+"""
+import argparse
+import asyncio
+import email.utils
+import mimetypes
+import os
+import re
+import sys
+from collections import OrderedDict
+from http import HTTPStatus
+from urllib.parse import quote, unquote, urlsplit
+
+DEFAULT_PORT = int(os.environ.get('DOCS_PORT', 8080))
+
+# In-memory cache budget, and the largest file kept in it
+DEFAULT_CACHE_MB = 64
+DEFAULT_CACHE_FILE_KB = 256
+
+# Idle keep-alive connections are closed after this many seconds
+KEEPALIVE_TIMEOUT = 15
+
+# Longest request head accepted
+MAX_HEADER_BYTES = 64 * 1024
+
+# Precompressed siblings, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Sphinx fingerprints _static assets as ?v=<hash>; other tools put it in the name
+_HASHED_NAME = re.compile(r'[.-][0-9a-f]{8,}\.[^/]+$')
+CACHE_IMMUTABLE = 'public, max-age=31536000, immutable'
+# HTML must be revalidated so rebuilt pages show up; the ETag makes that cheap
+CACHE_REVALIDATE = 'no-cache'
+CACHE_DEFAULT = 'public, max-age=300'
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class FileCache:
+    """Bounded LRU of small file bodies, checked against the file's stat."""
+
+    def __init__(self, max_bytes, max_file_bytes):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, path, stamp):
+        """Return the cached body of ``path`` if it is still current, else None."""
+        entry = self._entries.get(path)
+        if entry is None or entry[0] != stamp:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(path)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, path, stamp, body):
+        """Remember ``body``, evicting least recently used files over budget."""
+        if len(body) > self.max_file_bytes:
+            return
+        old = self._entries.pop(path, None)
+        if old is not None:
+            self.size -= len(old[1])
+        self._entries[path] = (stamp, body)
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+def _stamp(st):
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def make_etag(st, encoding=None):
+    """Strong validator for one representation of a file."""
+    tag = f'{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}'
+    return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+
+def cache_control(url_path, query, content_type):
+    """Pick the Cache-Control policy for a response."""
+    if '/_static/' in url_path or url_path.startswith('_static/'):
+        if query.startswith('v=') or _HASHED_NAME.search(url_path):
+            return CACHE_IMMUTABLE
+    if content_type.startswith('text/html'):
+        return CACHE_REVALIDATE
+    return CACHE_DEFAULT
+
+
+def accepted_encodings(header):
+    """Return the content codings a client accepts (q > 0)."""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def parse_range(header, size):
+    """Parse a single byte range.
+
+    Returns ``(start, end)`` (inclusive), ``None`` when the header should be
+    ignored (multiple or malformed ranges get the full body), or ``False``
+    when the range cannot be satisfied.
+    """
+    match = _RANGE.match(header.replace(' ', ''))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last or int(last) == 0:
+            return False
+        return max(0, size - int(last)), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+class StaticServer:
+    """Serve the files under ``root``."""
+
+    def __init__(self, root, cache_mb=DEFAULT_CACHE_MB, cache_file_kb=DEFAULT_CACHE_FILE_KB,
+                 access_log=True):
+        self.root = os.path.realpath(root)
+        self.cache = FileCache(cache_mb * 1024 * 1024, cache_file_kb * 1024)
+        self.access_log = access_log
+
+    async def handle(self, reader, writer):
+        """Serve requests on one connection until it closes or idles out."""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._send_error(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE)
+                    break
+                if not await self._respond(head, reader, writer):
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    def resolve(self, url_path):
+        """Map a decoded URL path to a filesystem path inside the root, or None."""
+        if '\0' in url_path:
+            # %00 in the URL; no file has a NUL in its name
+            return None
+        full = os.path.normpath(os.path.join(self.root, url_path.lstrip('/')))
+        if full != self.root and not full.startswith(self.root + os.sep):
+            return None
+        return full
+
+    async def _respond(self, head, reader, writer):
+        """Answer one request; return whether the connection stays open."""
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split()
+        except ValueError:
+            await self._send_error(writer, HTTPStatus.BAD_REQUEST)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(':')
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get('connection', '').lower()
+        if version == 'HTTP/1.1':
+            keep_alive = 'close' not in connection
+        else:
+            keep_alive = 'keep-alive' in connection
+        body_length = headers.get('content-length', '')
+        if body_length.isdigit() and int(body_length):
+            # GET and HEAD bodies are meaningless; drain them to keep the stream in sync
+            await reader.readexactly(int(body_length))
+
+        if method not in ('GET', 'HEAD'):
+            await self._send_error(writer, HTTPStatus.METHOD_NOT_ALLOWED, keep_alive,
+                                   [('Allow', 'GET, HEAD')])
+            self._log(writer, method, target, HTTPStatus.METHOD_NOT_ALLOWED, 0)
+            return keep_alive
+
+        url = urlsplit(target)
+        url_path = unquote(url.path) or '/'
+        path = self.resolve(url_path)
+        if path is not None and os.path.isdir(path):
+            if not url_path.endswith('/'):
+                location = quote(url_path) + '/' + (f'?{url.query}' if url.query else '')
+                await self._send_error(writer, HTTPStatus.MOVED_PERMANENTLY, keep_alive,
+                                       [('Location', location)])
+                self._log(writer, method, target, HTTPStatus.MOVED_PERMANENTLY, 0)
+                return keep_alive
+            path = os.path.join(path, 'index.html')
+        try:
+            st = os.stat(path) if path is not None else None
+        except (OSError, ValueError):
+            st = None
+        if st is None or not os.path.isfile(path):
+            await self._send_error(writer, HTTPStatus.NOT_FOUND, keep_alive)
+            self._log(writer, method, target, HTTPStatus.NOT_FOUND, 0)
+            return keep_alive
+
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+            content_type += '; charset=utf-8'
+
+        # Byte ranges are served from the identity representation only
+        range_header = headers.get('range') if method == 'GET' else None
+        encoding = None
+        served, served_st = path, st
+        if not range_header:
+            accepted = accepted_encodings(headers.get('accept-encoding', ''))
+            for coding, suffix in ENCODINGS:
+                if coding not in accepted:
+                    continue
+                try:
+                    sibling_st = os.stat(path + suffix)
+                except (OSError, ValueError):
+                    continue
+                if sibling_st.st_mtime_ns >= st.st_mtime_ns:
+                    encoding, served, served_st = coding, path + suffix, sibling_st
+                    break
+
+        etag = make_etag(served_st, encoding)
+        response_headers = [
+            ('Content-Type', content_type),
+            ('ETag', etag),
+            ('Last-Modified', email.utils.formatdate(st.st_mtime, usegmt=True)),
+            ('Cache-Control', cache_control(url.path, url.query, content_type)),
+            ('Accept-Ranges', 'bytes'),
+            ('Vary', 'Accept-Encoding'),
+        ]
+        if encoding:
+            response_headers.append(('Content-Encoding', encoding))
+
+        if self._not_modified(headers, etag, st):
+            await self._send_head(writer, HTTPStatus.NOT_MODIFIED, response_headers, None, keep_alive)
+            self._log(writer, method, target, HTTPStatus.NOT_MODIFIED, 0)
+            return keep_alive
+
+        size = served_st.st_size
+        start, end = 0, size - 1
+        status = HTTPStatus.OK
+        if range_header and headers.get('if-range', etag) == etag:
+            byte_range = parse_range(range_header, size)
+            if byte_range is False:
+                await self._send_error(writer, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, keep_alive,
+                                       [('Content-Range', f'bytes */{size}')])
+                self._log(writer, method, target, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, 0)
+                return keep_alive
+            if byte_range:
+                start, end = byte_range
+                status = HTTPStatus.PARTIAL_CONTENT
+                response_headers.append(('Content-Range', f'bytes {start}-{end}/{size}'))
+        length = end - start + 1
+
+        if method == 'HEAD':
+            await self._send_head(writer, status, response_headers, length, keep_alive)
+        elif size <= self.cache.max_file_bytes:
+            body = self.cache.get(served, _stamp(served_st))
+            if body is None:
+                # Off the event loop, so a slow disk doesn't stall other connections
+                body = await asyncio.get_running_loop().run_in_executor(None, _read_file, served)
+                self.cache.put(served, _stamp(served_st), body)
+            writer.write(self._head(status, response_headers, length, keep_alive) + body[start:end + 1])
+            await writer.drain()
+        else:
+            await self._send_head(writer, status, response_headers, length, keep_alive)
+            with open(served, 'rb') as f:
+                await asyncio.get_running_loop().sendfile(writer.transport, f, start, length)
+        self._log(writer, method, target, status, length)
+        return keep_alive
+
+    @staticmethod
+    def _not_modified(headers, etag, st):
+        if_none_match = headers.get('if-none-match')
+        if if_none_match is not None:
+            # Weak comparison, as RFC 9110 prescribes for If-None-Match
+            tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+            return '*' in tags or etag in tags
+        if_modified_since = headers.get('if-modified-since')
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(st.st_mtime) <= since
+        return False
+
+    @staticmethod
+    def _head(status, headers, length, keep_alive):
+        lines = [f'HTTP/1.1 {status.value} {status.phrase}',
+                 f'Date: {email.utils.formatdate(usegmt=True)}',
+                 'Server: viper-sphinx']
+        lines.extend(f'{name}: {value}' for name, value in headers)
+        if length is not None:
+            lines.append(f'Content-Length: {length}')
+        lines.append('Connection: keep-alive' if keep_alive else 'Connection: close')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def _send_head(self, writer, status, headers, length, keep_alive):
+        writer.write(self._head(status, headers, length, keep_alive))
+        await writer.drain()
+
+    async def _send_error(self, writer, status, keep_alive=False, headers=()):
+        body = f'{status.value} {status.phrase}\n'.encode()
+        head = self._head(status, [('Content-Type', 'text/plain; charset=utf-8'), *headers],
+                          len(body), keep_alive)
+        writer.write(head + body)
+        await writer.drain()
+
+    def _log(self, writer, method, target, status, length):
+        if self.access_log:
+            peer = writer.get_extra_info('peername')
+            host = peer[0] if peer else '-'
+            sys.stderr.write(f'{host} "{method} {target}" {status.value} {length}\n')
+
+
+async def serve(root, bind, port, **options):
+    """Serve ``root`` until cancelled."""
+    handler = StaticServer(root, **options)
+    server = await asyncio.start_server(handler.handle, bind, port, limit=MAX_HEADER_BYTES,
+                                        reuse_address=True, backlog=1024)
+    print(f"✓ Serving {handler.root} on http://{bind}:{port}/", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def parse_args(argv=None):
+    """Parse command line arguments (compatible with ``python -m http.server``)."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('port', nargs='?', type=int, default=DEFAULT_PORT,
+                        help='Port to listen on (default: $DOCS_PORT or 8080)')
+    parser.add_argument('-b', '--bind', default='0.0.0.0',
+                        help='Address to bind (default: 0.0.0.0)')
+    parser.add_argument('-d', '--directory', default=os.getcwd(),
+                        help='Directory to serve (default: current directory)')
+    parser.add_argument('--cache-mb', type=int, default=DEFAULT_CACHE_MB,
+                        help=f'In-memory file cache size in MB (default: {DEFAULT_CACHE_MB})')
+    parser.add_argument('--cache-file-kb', type=int, default=DEFAULT_CACHE_FILE_KB,
+                        help='Largest file kept in memory in KB; larger files use sendfile '
+                             f'(default: {DEFAULT_CACHE_FILE_KB})')
+    parser.add_argument('-q', '--quiet', action='store_true',
+                        help='Do not write an access log line per request')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Main function."""
+    args = parse_args(argv)
+    try:
+        asyncio.run(serve(args.directory, args.bind, args.port, cache_mb=args.cache_mb,
+                          cache_file_kb=args.cache_file_kb, access_log=not args.quiet))
+    except KeyboardInterrupt:
+        print("\nServer stopped")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -62,7 +62,7 @@ goto end
 :dev
 echo Starting development server with auto-rebuild...
 echo Access at: http://localhost:8000
-docker run -d --name viper-sphinx-dev -p 8000:8000 -v %cd%/docs:/sphinx/docs viper-sphinx:latest sh -c "cd /sphinx/docs && sphinx-autobuild . _build/html --host 0.0.0.0 --port 8000"
+docker run -d --name viper-sphinx-dev -p 8000:8000 -v %cd%/docs:/sphinx/docs viper-sphinx:latest sh -c "cd /sphinx/docs && (python3 /sphinx/generate_pdoc.py --watch -o _build/html/pdoc &) && sphinx-autobuild . _build/html --host 0.0.0.0 --port 8000"
 if %errorlevel% equ 0 (
     echo.
     echo Dev server started! Changes will auto-reload.
@@ -43,7 +43,7 @@ run_dev() {
     docker run -d --name viper-sphinx-dev -p 8000:8000 \
         -v "$(pwd)/docs:/sphinx/docs" \
         viper-sphinx:latest \
-        sh -c "cd /sphinx/docs && sphinx-autobuild . _build/html --host 0.0.0.0 --port 8000"
+        sh -c "cd /sphinx/docs && (python3 /sphinx/generate_pdoc.py --watch -o _build/html/pdoc &) && sphinx-autobuild . _build/html --host 0.0.0.0 --port 8000"
     echo ""
     echo "Dev server started! Changes will auto-reload."
 }
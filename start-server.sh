@@ -14,5 +14,5 @@ echo "Press Ctrl+C to stop the server"
 echo "================================================"
 echo ""
 
-# Start Python HTTP server
-exec python3 -m http.server ${DOCS_PORT:-8080} --bind 0.0.0.0
+# Start the static file server (sendfile, precompressed files, cache headers)
+exec python3 /sphinx/serve_docs.py ${DOCS_PORT:-8080} --bind 0.0.0.0
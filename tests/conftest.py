@@ -0,0 +1,15 @@
+"""
+Shared test setup.
+
+The toolchain scripts live at the repository root and the local Sphinx
+extensions in docs/_ext (both are on ``sys.path`` in the image), so both
+directories are importable from the tests.
+"""
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+for path in (ROOT, ROOT / 'docs' / '_ext'):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
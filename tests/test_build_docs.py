@@ -0,0 +1,42 @@
+"""Tests for build_docs: what invalidates the persisted Sphinx environment, and the build command."""
+import sys
+
+from build_docs import environment_fingerprint, parse_args, sphinx_command
+
+
+def make_source(tmp_path):
+    (tmp_path / '_ext').mkdir()
+    (tmp_path / 'conf.py').write_text("extensions = ['sphinx.ext.todo', 'local_ext']\n")
+    (tmp_path / '_ext' / 'local_ext.py').write_text('def setup(app):\n    pass\n')
+    return tmp_path
+
+
+def test_fingerprint_is_stable(tmp_path):
+    source = make_source(tmp_path)
+    assert environment_fingerprint(source) == environment_fingerprint(source)
+
+
+def test_fingerprint_follows_conf(tmp_path):
+    source = make_source(tmp_path)
+    before = environment_fingerprint(source)
+    (source / 'conf.py').write_text("extensions = ['sphinx.ext.todo']\n")
+    assert environment_fingerprint(source) != before
+
+
+def test_fingerprint_follows_local_extensions(tmp_path):
+    source = make_source(tmp_path)
+    before = environment_fingerprint(source)
+    (source / '_ext' / 'local_ext.py').write_text('def setup(app):\n    return {}\n')
+    changed = environment_fingerprint(source)
+    assert changed != before
+    (source / '_ext' / 'other.py').write_text('')
+    assert environment_fingerprint(source) != changed
+
+
+def test_sphinx_command_profiles_importtime(tmp_path):
+    args = parse_args(['--profile', '--importtime', '--profile-dir', str(tmp_path)])
+    command = sphinx_command(args, tmp_path / 'docs', tmp_path / 'doctrees',
+                             tmp_path / 'html', fresh_env=False)
+    assert command[:6] == [sys.executable, '-X', 'importtime', '-m', 'cProfile', '-o']
+    assert command[7:9] == ['-m', 'sphinx']
+    assert '-E' not in command
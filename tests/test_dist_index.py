@@ -0,0 +1,79 @@
+"""Tests for dist_index: name normalization, import names and the cached index."""
+import os
+import sys
+from pathlib import PurePosixPath
+
+import dist_index
+from dist_index import DistributionIndex, canonical_name, get_index
+
+
+class FakeDistribution:
+    def __init__(self, name, version, files=None, top_level=None):
+        self.metadata = {'Name': name}
+        self.version = version
+        self.files = [PurePosixPath(f) for f in files] if files is not None else None
+        self._top_level = top_level
+
+    def read_text(self, filename):
+        return self._top_level if filename == 'top_level.txt' else None
+
+
+def test_canonical_name():
+    for name in ('sphinx_rtd_theme', 'Sphinx-RTD-Theme', 'sphinx.rtd.theme', 'sphinx__rtd--theme'):
+        assert canonical_name(name) == 'sphinx-rtd-theme'
+
+
+def test_lookup_by_any_spelling_and_import_name():
+    index = DistributionIndex([
+        FakeDistribution('Sphinx-RTD-Theme', '2.0', ['sphinx_rtd_theme/__init__.py',
+                                                     'sphinx_rtd_theme-2.0.dist-info/RECORD']),
+        FakeDistribution('PyYAML', '6.0', ['yaml/__init__.py', '_yaml/__init__.py'], 'yaml\n_yaml\n'),
+        FakeDistribution('six', '1.16', ['six.py']),
+    ])
+    assert len(index) == 3
+    assert index.version('sphinx.rtd.theme') == '2.0'
+    assert index.version('sphinx_rtd_theme') == '2.0'
+    assert index.version('yaml') == '6.0'
+    assert index.version('six') == '1.16'
+    assert index.version('missing') is None
+
+
+def test_namespace_packages_are_not_owned():
+    index = DistributionIndex([
+        FakeDistribution('sphinxcontrib-mermaid', '1.0', ['sphinxcontrib/mermaid/__init__.py'],
+                         'sphinxcontrib\n'),
+    ])
+    assert index.get('sphinxcontrib-mermaid').import_names == frozenset()
+    assert index.get('sphinxcontrib') is None
+
+
+def test_top_level_without_record_is_trusted():
+    index = DistributionIndex([FakeDistribution('legacy', '0.1', None, 'legacy_mod\n')])
+    assert index.get('legacy_mod').name == 'legacy'
+
+
+def test_earlier_distribution_shadows_later():
+    index = DistributionIndex([
+        FakeDistribution('pkg', '2.0', ['pkg/__init__.py']),
+        FakeDistribution('Pkg', '1.0', ['pkg/__init__.py']),
+        FakeDistribution('', '0.0', []),
+    ])
+    assert len(index) == 1
+    assert index.version('pkg') == '2.0'
+
+
+def test_get_index_is_rebuilt_when_the_path_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(sys, 'path', [str(tmp_path)])
+    monkeypatch.setattr(dist_index, '_index', None)
+    built = []
+    monkeypatch.setattr(dist_index, 'DistributionIndex', lambda: built.append(1) or object())
+
+    first = get_index()
+    assert get_index() is first
+    assert len(built) == 1
+
+    # Installing a package changes the site-packages directory
+    stat = os.stat(tmp_path)
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert get_index() is not first
+    assert len(built) == 2
@@ -0,0 +1,107 @@
+"""Tests for extension_usage and the fallbacks viper_setup registers from it."""
+import pytest
+
+import extension_usage
+from extension_usage import get_usage, scan_file, scan_usage, select_extensions
+
+INDEX = """\
+Title
+=====
+
+.. automodule:: pkg
+
+.. gitlog::
+
+See :issue:`12` and |:smile:|.
+"""
+
+MARKDOWN = """\
+# Page
+
+```{todo}
+Later
+```
+
+{math}`x^2`
+"""
+
+
+@pytest.fixture
+def srcdir(tmp_path):
+    (tmp_path / 'index.rst').write_text(INDEX, encoding='utf-8')
+    (tmp_path / 'page.md').write_text(MARKDOWN, encoding='utf-8')
+    # Never scanned
+    (tmp_path / '_build').mkdir()
+    (tmp_path / '_build' / 'old.rst').write_text('.. kml::\n', encoding='utf-8')
+    yield tmp_path
+    extension_usage._memo.clear()
+
+
+def test_scan_file(srcdir):
+    assert scan_file(srcdir / 'index.rst') == (['automodule', 'gitlog'], ['issue'], ['emoji'])
+    assert scan_file(srcdir / 'page.md') == (['todo'], ['math'], [])
+
+
+def test_scan_usage_caches_unchanged_files(srcdir):
+    usage = scan_usage(srcdir)
+    assert (usage.files, usage.rescanned) == (2, 2)
+    assert usage.suffixes == {'.rst', '.md'}
+    assert usage.uses_directive('git*') and not usage.uses_directive('kml')
+    assert usage.uses_role('issue', 'pr')
+
+    assert scan_usage(srcdir).rescanned == 0
+    (srcdir / 'page.md').write_text('```{kml}\n```\n', encoding='utf-8')
+    usage = scan_usage(srcdir)
+    assert usage.rescanned == 1
+    assert usage.uses_directive('kml') and not usage.uses_directive('todo')
+
+
+def test_scan_usage_ignores_a_broken_cache(srcdir):
+    (srcdir / '_build' / extension_usage.CACHE_NAME).write_text('{', encoding='utf-8')
+    assert scan_usage(srcdir).rescanned == 2
+
+
+def test_get_usage_scans_once(srcdir):
+    assert get_usage(srcdir) is get_usage(srcdir)
+
+
+def test_select_extensions(srcdir, monkeypatch):
+    monkeypatch.delenv('VIPER_LAZY_EXTENSIONS', raising=False)
+    extensions = ['sphinx.ext.autodoc', 'sphinx.ext.napoleon', 'sphinx.ext.graphviz',
+                  'graphviz_cache', 'sphinx.ext.todo', 'sphinx.ext.mathjax', 'myst_parser',
+                  'sphinxemoji.sphinxemoji', 'sphinx_kml', 'unknown_ext']
+    assert select_extensions(extensions, srcdir, verbose=False) == [
+        'sphinx.ext.autodoc', 'sphinx.ext.napoleon', 'sphinx.ext.todo', 'sphinx.ext.mathjax',
+        'myst_parser', 'sphinxemoji.sphinxemoji', 'unknown_ext']
+    assert 'sphinx_kml' in select_extensions(extensions, srcdir, keep=('sphinx_kml',), verbose=False)
+
+    monkeypatch.setenv('VIPER_LAZY_EXTENSIONS', '0')
+    assert select_extensions(extensions, srcdir, verbose=False) == extensions
+
+
+def build(srcdir, tmp_path):
+    from docutils.parsers.rst import directives, roles
+    from sphinx.application import Sphinx
+
+    (srcdir / 'conf.py').write_text("extensions = ['viper_setup']\n", encoding='utf-8')
+    Sphinx(str(srcdir), str(srcdir), str(tmp_path / 'out'), str(tmp_path / 'doctrees'),
+           'html', status=None, warning=None, freshenv=True)
+    return set(directives._directives), set(roles._roles)
+
+
+def test_viper_setup_registers_only_used_fallbacks(srcdir, tmp_path, monkeypatch):
+    from sphinx.util.docutils import docutils_namespace
+
+    monkeypatch.delenv('VIPER_LAZY_EXTENSIONS', raising=False)
+    (srcdir / 'page.md').unlink()
+    with docutils_namespace():
+        registered, local_roles = build(srcdir, tmp_path)
+        assert 'gitlog' in registered and 'issue' in local_roles
+        assert not {'chart', 'grid', 'kml', 'kml-file'} & registered
+        assert not {'gitrepo', 'refdoc'} & local_roles
+
+    monkeypatch.setenv('VIPER_LAZY_EXTENSIONS', '0')
+    with docutils_namespace():
+        registered, local_roles = build(srcdir, tmp_path)
+        assert {'gitlog', 'chart', 'grid', 'kml', 'kml-file'} <= registered
+        assert {'gitrepo', 'refdoc', 'issue'} <= local_roles
@@ -0,0 +1,24 @@
+"""Tests for fileutil: atomic writes."""
+import pytest
+
+from fileutil import atomic_write
+
+
+def test_atomic_write_replaces_file(tmp_path):
+    path = tmp_path / 'out.txt'
+    path.write_text('old', encoding='utf-8')
+    with atomic_write(path) as f:
+        f.write('new')
+    assert path.read_text(encoding='utf-8') == 'new'
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_atomic_write_keeps_old_file_on_error(tmp_path):
+    path = tmp_path / 'out.txt'
+    path.write_text('old', encoding='utf-8')
+    with pytest.raises(RuntimeError):
+        with atomic_write(path) as f:
+            f.write('new')
+            raise RuntimeError
+    assert path.read_text(encoding='utf-8') == 'old'
+    assert list(tmp_path.iterdir()) == [path]
@@ -0,0 +1,101 @@
+"""Tests for the graphviz_cache extension's render cache, using a stand-in dot."""
+import os
+import stat
+import sys
+
+import pytest
+
+from graphviz_cache import RenderCache, _split_outputs, dot_version
+
+FAKE_DOT = f"""#!{sys.executable}
+import os, sys
+if sys.argv[1:] == ['-V']:
+    sys.stderr.write(os.environ.get('FAKE_DOT_VERSION', 'dot - graphviz version 2.0'))
+    sys.exit(0)
+code = sys.stdin.buffer.read()
+if b'error' in code:
+    sys.exit(1)
+with open(os.environ['FAKE_DOT_LOG'], 'a') as log:
+    log.write('run\\n')
+for arg in sys.argv[1:]:
+    if arg.startswith('-o'):
+        with open(arg[2:], 'wb') as f:
+            f.write(b'rendered:' + code)
+"""
+
+
+@pytest.fixture
+def dot(tmp_path, monkeypatch):
+    path = tmp_path / 'dot'
+    path.write_text(FAKE_DOT, encoding='utf-8')
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('FAKE_DOT_LOG', str(tmp_path / 'dot.log'))
+    return path
+
+
+def dot_runs(tmp_path):
+    """How many renders the stand-in dot has done."""
+    log = tmp_path / 'dot.log'
+    return len(log.read_text().splitlines()) if log.exists() else 0
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return RenderCache(tmp_path / 'cache')
+
+
+def test_split_outputs():
+    args = ['dot', '-Tpng', '-o/out/a.png', '-Tcmapx', '-o/out/a.png.map']
+    assert _split_outputs(args) == (['dot', '-Tpng', '-o{0}', '-Tcmapx', '-o{1}'],
+                                    ['/out/a.png', '/out/a.png.map'])
+
+
+def test_dot_version(dot, tmp_path):
+    assert dot_version(str(dot)) == 'dot - graphviz version 2.0'
+    assert dot_version(str(tmp_path / 'missing-dot')) is None
+
+
+def test_key_ignores_output_paths(dot, cache, tmp_path):
+    first = cache.key([str(dot), '-Tsvg', f'-o{tmp_path}/a.svg'], b'digraph {}', tmp_path)
+    second = cache.key([str(dot), '-Tsvg', f'-o{tmp_path}/b.svg'], b'digraph {}', tmp_path)
+    assert first[0] == second[0]
+    assert second[1] == [f'{tmp_path}/b.svg']
+    assert cache.key([str(dot), '-Tpng', f'-o{tmp_path}/a.png'], b'digraph {}', tmp_path)[0] != first[0]
+    assert cache.key([str(dot), '-Tsvg', f'-o{tmp_path}/a.svg'], b'graph {}', tmp_path)[0] != first[0]
+    assert cache.key([str(dot), '-Tsvg', f'-o{tmp_path}/a.svg'], b'digraph {}', '/other')[0] != first[0]
+
+
+def test_key_without_dot(cache, tmp_path):
+    assert cache.key([str(tmp_path / 'missing-dot'), '-Tsvg', '-oout.svg'], b'', tmp_path) is None
+
+
+def test_run_renders_once(dot, cache, tmp_path):
+    def render(name):
+        args = [str(dot), '-Tpng', f'-o{tmp_path}/{name}.png', '-Tcmapx', f'-o{tmp_path}/{name}.map']
+        return cache.run(args, input=b'digraph {}', cwd=tmp_path, capture_output=True)
+
+    assert render('first').returncode == 0
+    assert (cache.hits, cache.misses, dot_runs(tmp_path)) == (0, 1, 1)
+    assert render('second').returncode == 0
+    assert (cache.hits, cache.misses, dot_runs(tmp_path)) == (1, 1, 1)
+    for suffix in ('png', 'map'):
+        assert (tmp_path / f'second.{suffix}').read_bytes() == b'rendered:digraph {}'
+
+
+def test_failed_render_is_not_cached(dot, cache, tmp_path):
+    args = [str(dot), '-Tsvg', f'-o{tmp_path}/bad.svg']
+    assert cache.run(args, input=b'error', cwd=tmp_path).returncode == 1
+    digest, outputs = cache.key(args, b'error', tmp_path)
+    assert not cache.has(digest, len(outputs))
+    assert cache.misses == 0
+
+
+def test_restore_needs_every_output(cache, tmp_path):
+    outputs = [tmp_path / 'a.png', tmp_path / 'a.map']
+    for path in outputs:
+        path.write_bytes(b'x')
+    cache.store('ab' * 32, [str(path) for path in outputs])
+    assert cache.has('ab' * 32, 2)
+    os.remove(cache._paths('ab' * 32, 2)[1])
+    assert not cache.restore('ab' * 32, [str(tmp_path / 'b.png'), str(tmp_path / 'b.map')])
+    assert not (tmp_path / 'b.png').exists()
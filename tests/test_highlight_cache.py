@@ -0,0 +1,119 @@
+"""Tests for the highlight_cache extension: buffered writes, keys and expiry."""
+import os
+import sqlite3
+import time
+
+import pytest
+from sphinx.highlighting import PygmentsBridge
+
+import highlight_cache
+from highlight_cache import HighlightCache, _flushing_write_doc, block_key
+
+
+@pytest.fixture
+def path(tmp_path):
+    return tmp_path / 'highlight.sqlite'
+
+
+def rows(path, query):
+    with sqlite3.connect(path) as db:
+        return db.execute(query).fetchall()
+
+
+def test_writes_wait_for_flush(path):
+    cache = HighlightCache(path, build='b1')
+    assert cache.lookup('k1') is None
+    cache.store('k1', '<pre>one</pre>')
+    cache.store('k2', None)
+    # Found in this process's buffer before it is written
+    assert cache.lookup('k1') == '<pre>one</pre>'
+    assert rows(path, 'SELECT key FROM highlights') == []
+    assert rows(path, 'SELECT * FROM stats') == []
+
+    cache.flush()
+    assert rows(path, 'SELECT key, html FROM highlights') == [('k1', '<pre>one</pre>')]
+    assert rows(path, 'SELECT hits, misses FROM stats') == [(1, 2)]
+    assert cache.totals() == (1, 2)
+
+
+def test_hits_update_use_time_on_flush(path):
+    cache = HighlightCache(path, build='b1')
+    cache.store('k1', 'html')
+    cache.flush()
+    cache.db.execute('UPDATE highlights SET used = 0')
+    cache.db.commit()
+
+    other = HighlightCache(path, build='b2')
+    assert other.lookup('k1') == 'html'
+    assert rows(path, 'SELECT used FROM highlights') == [(0,)]
+    other.flush()
+    assert rows(path, 'SELECT used FROM highlights')[0][0] > time.time() - 60
+
+
+def test_flush_without_changes_writes_nothing(path, monkeypatch):
+    cache = HighlightCache(path)
+    cache.flush()
+    assert not path.exists()
+    cache.store('k1', 'html')
+    cache.flush()
+    monkeypatch.setattr(cache, '_db', None)
+    # Would fail on the missing connection if it wrote again
+    cache.flush()
+
+
+def test_forked_writer_has_its_own_counters(path):
+    cache = HighlightCache(path, build='b1')
+    cache.store('parent', 'html')
+    pid = os.fork()
+    if pid == 0:
+        try:
+            # The parent's buffer is not written twice from here
+            cache.store('child', 'html')
+            cache.lookup('child')
+            cache.flush()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    cache.flush()
+    assert sorted(rows(path, 'SELECT key FROM highlights')) == [('child',), ('parent',)]
+    assert cache.totals() == (1, 2)
+
+
+def test_each_written_document_is_flushed(path, monkeypatch):
+    cache = HighlightCache(path, build='b1')
+    monkeypatch.setattr(highlight_cache, '_cache', cache)
+
+    def write_doc(docname, doctree):
+        cache.store(docname, 'html')
+        if docname == 'broken':
+            raise RuntimeError(docname)
+
+    write = _flushing_write_doc(write_doc)
+    write('index', None)
+    assert rows(path, 'SELECT key FROM highlights') == [('index',)]
+    with pytest.raises(RuntimeError):
+        write('broken', None)
+    assert len(rows(path, 'SELECT key FROM highlights')) == 2
+
+
+def test_finish_drops_stale_entries_and_counters(path):
+    cache = HighlightCache(path, build='b1')
+    cache.store('old', 'html')
+    cache.store('new', 'html')
+    cache.flush()
+    cache.db.execute('UPDATE highlights SET used = ? WHERE key = ?', (time.time() - 10 * 86400, 'old'))
+    assert cache.finish(max_age_days=5) == 1
+    assert rows(path, 'SELECT key FROM highlights') == [('new',)]
+    assert rows(path, 'SELECT * FROM stats') == []
+
+
+def test_block_key():
+    html = PygmentsBridge('html', 'sphinx')
+    latex = PygmentsBridge('latex', 'sphinx')
+    key = block_key(html, 'print(1)', 'python', {}, False, {})
+    assert key == block_key(html, 'print(1)', 'python', {}, False, {})
+    assert key != block_key(html, 'print(2)', 'python', {}, False, {})
+    assert key != block_key(html, 'print(1)', 'python3', {}, False, {})
+    assert key != block_key(html, 'print(1)', 'python', {'hl_lines': [1]}, False, {})
+    assert key != block_key(html, 'print(1)', 'python', {}, False, {'linenos': True})
+    assert key != block_key(latex, 'print(1)', 'python', {}, False, {})
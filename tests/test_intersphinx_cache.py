@@ -0,0 +1,119 @@
+"""Tests for the intersphinx_cache extension's inventory store."""
+import json
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from intersphinx_cache import InventoryStore, configured_mapping, inventory_url
+
+INVENTORY = (b'# Sphinx inventory version 2\n'
+             b'# Project: demo\n'
+             b'# Version: 1.0\n'
+             b'# The remainder of this file is compressed using zlib.\n'
+             + zlib.compress(b'demo.func py:function 1 api.html#$ -\n'))
+
+
+class InventoryHandler(BaseHTTPRequestHandler):
+    """Serves INVENTORY at /objects.inv with an ETag and counts full downloads."""
+
+    downloads = 0
+
+    def do_GET(self):
+        if self.path != '/objects.inv':
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif self.headers.get('If-None-Match') == '"inv1"':
+            self.send_response(304)
+            self.end_headers()
+        else:
+            type(self).downloads += 1
+            self.send_response(200)
+            self.send_header('ETag', '"inv1"')
+            self.send_header('Content-Length', str(len(INVENTORY)))
+            self.end_headers()
+            self.wfile.write(INVENTORY)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    InventoryHandler.downloads = 0
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), InventoryHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_inventory_url():
+    assert inventory_url('https://docs.python.org/3', (None,)) == 'https://docs.python.org/3/objects.inv'
+    assert inventory_url('https://x.org', ('https://y.org/inv',)) == 'https://y.org/inv'
+    # Local inventory files are not fetched
+    assert inventory_url('https://x.org', ('local.inv',)) is None
+    assert inventory_url('api', (None,)) is None
+
+
+def test_locate_prefers_cache_over_bundle(tmp_path):
+    cache, bundle = tmp_path / 'cache', tmp_path / 'bundle'
+    bundle.mkdir()
+    (bundle / 'demo.inv').write_bytes(INVENTORY)
+    store = InventoryStore(cache, bundle)
+    path, record = store.locate('demo')
+    assert path == bundle / 'demo.inv'
+    # Bundled without a record: its mtime stands in for the fetch time
+    assert 'fetched' in record
+
+    cache.mkdir()
+    (cache / 'demo.inv').write_bytes(INVENTORY)
+    (cache / 'demo.json').write_text(json.dumps({'fetched': 1}), encoding='utf-8')
+    assert store.locate('demo') == (cache / 'demo.inv', {'fetched': 1})
+    assert store.locate('missing') is None
+
+
+def test_fetch_revalidates_with_etag(tmp_path, server):
+    store = InventoryStore(tmp_path)
+    url = f'{server}/objects.inv'
+    assert store.fetch('demo', url) is True
+    record = json.loads((tmp_path / 'demo.json').read_text(encoding='utf-8'))
+    assert record['url'] == url and record['etag'] == '"inv1"'
+    assert (tmp_path / 'demo.inv').read_bytes() == INVENTORY
+
+    assert store.fetch('demo', url) is False
+    assert InventoryHandler.downloads == 1
+
+
+def test_load_pickles_parsed_inventory(tmp_path, server):
+    store = InventoryStore(tmp_path)
+    store.fetch('demo', f'{server}/objects.inv')
+
+    data, _ = store.load('demo', 'https://demo.org/')
+    assert data['py:function']['demo.func'].uri == 'https://demo.org/api.html#demo.func'
+    assert (store.parsed, store.unpickled) == (1, 0)
+
+    again, _ = store.load('demo', 'https://demo.org/')
+    assert again == data
+    assert (store.parsed, store.unpickled) == (1, 1)
+
+    # Parsed entries embed the target URI, so another URI parses afresh
+    other, _ = store.load('demo', 'https://mirror.org/')
+    assert other['py:function']['demo.func'].uri.startswith('https://mirror.org/')
+    assert store.parsed == 2
+
+
+def test_load_unknown_project(tmp_path):
+    assert InventoryStore(tmp_path).load('missing', 'https://x.org/') is None
+
+
+def test_configured_mapping(tmp_path):
+    conf = tmp_path / 'conf.py'
+    conf.write_text("import os\nintersphinx_mapping = {'python': ('https://docs.python.org/3', None)}\n",
+                    encoding='utf-8')
+    assert configured_mapping(conf) == {'python': ('https://docs.python.org/3', None)}
@@ -0,0 +1,86 @@
+"""Tests for link_cache: lookups, TTL expiry, transient errors and revalidation."""
+import pytest
+
+from link_cache import LinkCache
+from validate_manual_links import LinkResult
+
+URL = 'https://example.org/manual'
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = LinkCache(tmp_path / 'links.sqlite', ttl_hours=1)
+    yield cache
+    cache.close()
+
+
+def test_unknown_url_is_a_miss(cache):
+    assert cache.lookup(URL) == (None, False)
+    assert cache.misses == 1
+
+
+def test_stored_result_is_fresh(cache):
+    cache.store(URL, LinkResult(True, 200, f'{URL}/', '"v1"', 'Mon, 01 Jan 2024 00:00:00 GMT'))
+    entry, is_fresh = cache.lookup(URL)
+    assert is_fresh
+    assert entry.ok is True and entry.status == 200
+    assert entry.final_url == f'{URL}/'
+    assert (entry.etag, entry.last_modified) == ('"v1"', 'Mon, 01 Jan 2024 00:00:00 GMT')
+    assert cache.fresh == 1
+
+
+def test_broken_result_is_cached(cache):
+    cache.store(URL, LinkResult(False, 404, URL, None, None))
+    entry, is_fresh = cache.lookup(URL)
+    assert is_fresh and entry.ok is False
+
+
+def test_expired_entry_keeps_validators(cache):
+    cache.store(URL, LinkResult(True, 200, URL, '"v1"', None))
+    cache.ttl = 0
+    entry, is_fresh = cache.lookup(URL)
+    assert not is_fresh
+    assert entry.etag == '"v1"'
+    assert cache.fresh == 0
+
+
+def test_connection_error_drops_entry(cache):
+    cache.store(URL, LinkResult(True, 200, URL, None, None))
+    cache.store(URL, LinkResult(False, None, URL, None, None))
+    assert cache.lookup(URL) == (None, False)
+
+
+def test_touch_renews_entry(cache):
+    cache.store(URL, LinkResult(True, 200, URL, '"v1"', None))
+    cache._db.execute('UPDATE links SET checked_at = 0')
+    assert not cache.lookup(URL)[1]
+    cache.touch(URL)
+    assert cache.lookup(URL)[1]
+    assert cache.revalidated == 1
+
+
+def test_storing_over_expired_entry_counts_as_refreshed(cache):
+    cache.store(URL, LinkResult(True, 200, URL, '"v1"', None))
+    assert cache.refreshed == 0
+    cache.ttl = 0
+    cache.lookup(URL)
+    cache.store(URL, LinkResult(True, 200, URL, '"v2"', None))
+    assert cache.refreshed == 1
+    # A revalidated entry is not also counted as refreshed
+    cache.lookup(URL)
+    cache.touch(URL)
+    cache.store(URL, LinkResult(True, 200, URL, '"v3"', None))
+    assert (cache.revalidated, cache.refreshed) == (1, 1)
+
+
+def test_results_persist_across_instances(tmp_path):
+    path = tmp_path / 'nested' / 'links.sqlite'
+    first = LinkCache(path)
+    first.store(URL, LinkResult(True, 200, URL, None, None))
+    first.close()
+    second = LinkCache(path)
+    try:
+        entry, is_fresh = second.lookup(URL)
+        assert entry.ok and is_fresh
+    finally:
+        second.close()
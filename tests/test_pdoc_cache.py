@@ -0,0 +1,126 @@
+"""Tests for pdoc_cache: keys, store/restore round trips and LRU eviction."""
+import json
+import os
+import shutil
+import time
+
+import pytest
+
+from pdoc_cache import PdocCache
+
+
+def write_package(output_dir, module, pages):
+    for name, text in pages.items():
+        path = output_dir / module / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding='utf-8')
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return PdocCache(tmp_path / 'cache', max_mb=1)
+
+
+def test_key_depends_on_module_and_version(cache):
+    assert cache.key('alpha', '1.0') == cache.key('alpha', '1.0')
+    assert cache.key('alpha', '1.0') != cache.key('alpha', '1.1')
+    assert cache.key('alpha', '1.0') != cache.key('beta', '1.0')
+
+
+def test_key_depends_on_salt(cache):
+    key = cache.key('alpha', '1.0')
+    cache._salt = cache._salt[:-1] + ['0.0']
+    assert cache.key('alpha', '1.0') != key
+
+
+def test_restore_miss(cache, tmp_path):
+    assert cache.restore('alpha', '1.0', tmp_path / 'out') is None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_store_and_restore_package(cache, tmp_path):
+    out = tmp_path / 'out'
+    write_package(out, 'alpha', {'index.html': 'root', 'sub/index.html': 'sub'})
+    cache.store('alpha', '1.0', out, module_count=2)
+    assert cache.stored == 1
+
+    # Stale output is replaced by the cached tree
+    write_package(out, 'alpha', {'index.html': 'stale', 'gone.html': 'old'})
+    meta = cache.restore('alpha', '1.0', out)
+    assert meta['module'] == 'alpha' and meta['module_count'] == 2
+    assert (out / 'alpha' / 'index.html').read_text() == 'root'
+    assert (out / 'alpha' / 'sub' / 'index.html').read_text() == 'sub'
+    assert not (out / 'alpha' / 'gone.html').exists()
+    assert cache.hits == 1
+
+
+def test_restore_of_evicted_files_keeps_output(cache, tmp_path):
+    out = tmp_path / 'out'
+    write_package(out, 'alpha', {'index.html': 'root'})
+    cache.store('alpha', '1.0', out)
+    # A concurrent run evicts the files after this one read meta.json
+    shutil.rmtree(cache.cache_dir / cache.key('alpha', '1.0') / 'files')
+    assert cache.restore('alpha', '1.0', out) is None
+    assert (out / 'alpha' / 'index.html').read_text() == 'root'
+    assert (cache.hits, cache.misses) == (0, 1)
+
+
+def test_store_and_restore_single_page_module(cache, tmp_path):
+    out = tmp_path / 'out'
+    out.mkdir()
+    (out / 'beta.html').write_text('page', encoding='utf-8')
+    cache.store('beta', '2.0', out)
+
+    restored = tmp_path / 'restored'
+    restored.mkdir()
+    assert cache.restore('beta', '2.0', restored) is not None
+    assert (restored / 'beta.html').read_text() == 'page'
+
+
+def test_store_without_output_is_ignored(cache, tmp_path):
+    cache.store('missing', '1.0', tmp_path)
+    assert cache.stored == 0
+    assert not any(cache.cache_dir.iterdir())
+
+
+def test_evict_removes_least_recently_used(cache, tmp_path):
+    out = tmp_path / 'out'
+    for i, module in enumerate(('old', 'used', 'new')):
+        write_package(out, module, {'index.html': 'x' * 400 * 1024})
+        cache.store(module, '1.0', out)
+        entry = cache.cache_dir / cache.key(module, '1.0')
+        os.utime(entry, (time.time() - 100 + i, time.time() - 100 + i))
+    # Restoring marks the oldest entry as recently used
+    cache.restore('old', '1.0', tmp_path / 'restored')
+
+    total = cache.evict()
+    assert total <= cache.max_bytes
+    assert cache.evicted == 1
+    assert (cache.cache_dir / cache.key('old', '1.0')).exists()
+    assert not (cache.cache_dir / cache.key('used', '1.0')).exists()
+    assert (cache.cache_dir / cache.key('new', '1.0')).exists()
+
+
+def test_evict_cleans_broken_and_stale_staging_entries(cache):
+    broken = cache.cache_dir / 'broken'
+    broken.mkdir()
+    (broken / 'meta.json').write_text('{not json', encoding='utf-8')
+    stale = cache.cache_dir / '.tmp-stale'
+    stale.mkdir()
+    os.utime(stale, (time.time() - 7200, time.time() - 7200))
+    fresh = cache.cache_dir / '.tmp-fresh'
+    fresh.mkdir()
+
+    cache.evict()
+    assert not broken.exists()
+    assert not stale.exists()
+    # Possibly still being written by a concurrent build
+    assert fresh.exists()
+
+
+def test_meta_records_size(cache, tmp_path):
+    out = tmp_path / 'out'
+    write_package(out, 'alpha', {'index.html': 'abcd'})
+    cache.store('alpha', '1.0', out)
+    meta = json.loads((cache.cache_dir / cache.key('alpha', '1.0') / 'meta.json').read_text())
+    assert meta['size'] == 4
@@ -0,0 +1,72 @@
+"""Tests for pdoc_index: index links and the manifest round trip."""
+import json
+
+import pytest
+
+from pdoc_index import (MANIFEST_NAME, PackageDocs, entry_page, format_size,
+                        load_manifest, publish, write_index)
+
+
+@pytest.fixture
+def output(tmp_path):
+    (tmp_path / 'pkg').mkdir()
+    (tmp_path / 'pkg' / 'index.html').write_text('package', encoding='utf-8')
+    (tmp_path / 'single.html').write_text('module', encoding='utf-8')
+    return tmp_path
+
+
+def test_entry_page(output):
+    assert entry_page(output, 'pkg') == 'pkg/index.html'
+    assert entry_page(output, 'single') == 'single.html'
+
+
+def test_index_links_to_entry_pages(output):
+    packages = {
+        'pkg': PackageDocs('pkg', 'pkg', '1.0', 3, 2048, 'pkg/index.html'),
+        'single': PackageDocs('single', 'single', '0.1', 1, 10, 'single.html'),
+        # Recorded before paths were kept: found on disk
+        'Old': PackageDocs('Old', None, None, 1, 10),
+    }
+    (output / 'Old.html').write_text('module', encoding='utf-8')
+    text = write_index(output, packages).read_text(encoding='utf-8')
+    assert '<a href="pkg/index.html">pkg</a>' in text
+    assert '<a href="single.html">single</a>' in text
+    assert '<a href="Old.html">Old</a>' in text
+    # Sorted case-insensitively
+    assert text.index('>Old<') < text.index('>pkg<') < text.index('>single<')
+    assert '3 packages, 5 modules, 2.0 KB' in text
+
+
+def test_index_escapes_names(output):
+    packages = {'a<b': PackageDocs('a<b', None, None, 1, 1, 'a<b.html')}
+    text = write_index(output, packages).read_text(encoding='utf-8')
+    assert '<a href="a&lt;b.html">a&lt;b</a>' in text
+
+
+def test_manifest_round_trip(output):
+    packages = {
+        'pkg': PackageDocs('pkg', 'Pkg', '1.0', 3, 2048, 'pkg/index.html'),
+        'single': PackageDocs('single', 'single', '0.1', 1, 10),
+    }
+    publish(output, packages)
+    loaded = load_manifest(output)
+    assert loaded['pkg'] == packages['pkg']
+    assert loaded['single'].path == 'single.html'
+
+
+@pytest.mark.parametrize('content', ['{broken', '{"version": 0, "packages": {}}', '[]'])
+def test_unusable_manifest(output, content):
+    (output / MANIFEST_NAME).write_text(content, encoding='utf-8')
+    assert load_manifest(output) is None
+
+
+def test_manifest_without_paths(output):
+    (output / MANIFEST_NAME).write_text(json.dumps(
+        {'version': 1, 'packages': {'pkg': {'modules': 2, 'bytes': 5}}}), encoding='utf-8')
+    assert load_manifest(output)['pkg'] == PackageDocs('pkg', None, None, 2, 5, None)
+
+
+def test_format_size():
+    assert format_size(512) == '512 B'
+    assert format_size(1536) == '1.5 KB'
+    assert format_size(3 * 1024 * 1024) == '3.0 MB'
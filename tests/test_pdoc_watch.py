@@ -0,0 +1,91 @@
+"""Tests for pdoc_watch: mapping saves to modules and partial re-renders."""
+import pytest
+
+from pdoc_watch import LocalPackageRenderer, local_packages, module_for_path
+
+
+def write_package(packages_dir, name):
+    files = {
+        '__init__.py': '"""Watched package."""\n',
+        'core.py': '"""Core helpers."""\n\n\ndef parse():\n    """Parse."""\n',
+        'other.py': '"""Other helpers."""\n',
+        'sub/__init__.py': '"""Sub package."""\n',
+        'sub/leaf.py': '"""Leaf module."""\n',
+    }
+    for rel, text in files.items():
+        path = packages_dir / name / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding='utf-8')
+    return packages_dir / name
+
+
+def test_local_packages(tmp_path):
+    write_package(tmp_path, 'alpha')
+    (tmp_path / 'notes').mkdir()
+    assert local_packages(tmp_path) == {'alpha': tmp_path / 'alpha'}
+
+
+def test_module_for_path(tmp_path):
+    package = write_package(tmp_path, 'alpha')
+    assert module_for_path(package / 'core.py', tmp_path) == 'alpha.core'
+    assert module_for_path(package / 'sub' / 'leaf.py', tmp_path) == 'alpha.sub.leaf'
+    assert module_for_path(package / '__init__.py', tmp_path) == 'alpha'
+    assert module_for_path(package / 'sub' / '__init__.py', tmp_path) == 'alpha.sub'
+    assert module_for_path(package / 'README.txt', tmp_path) is None
+    assert module_for_path(tmp_path / 'setup.py', tmp_path) is None
+    assert module_for_path(tmp_path.parent / 'elsewhere.py', tmp_path) is None
+
+
+@pytest.fixture
+def rendered(tmp_path, monkeypatch):
+    """A fully rendered package; each test gets its own name so imports don't mix."""
+    pytest.importorskip('pdoc')
+    name = f'watched_{tmp_path.name.lower()}'
+    packages_dir = tmp_path / 'packages'
+    package = write_package(packages_dir, name)
+    monkeypatch.syspath_prepend(str(packages_dir))
+    renderer = LocalPackageRenderer(tmp_path / 'out')
+    written = renderer.render(name)
+    out = tmp_path / 'out' / name
+    return renderer, name, package, out, written
+
+
+def test_first_render_writes_every_page(rendered):
+    renderer, name, _, out, written = rendered
+    assert sorted(written) == sorted([out / 'index.html', out / 'core.html', out / 'other.html',
+                                      out / 'sub' / 'index.html', out / 'sub' / 'leaf.html'])
+    assert renderer.summary()[name][0] == 5
+    # Nothing changed: nothing is rewritten
+    assert renderer.render(name) == []
+
+
+def test_change_renders_module_and_ancestors_only(rendered):
+    renderer, name, package, out, _ = rendered
+    (package / 'sub' / 'leaf.py').write_text('"""Leaf module, edited."""\n', encoding='utf-8')
+    # Missing pages show which ones were rendered
+    for page in (out / 'index.html', out / 'sub' / 'index.html', out / 'other.html'):
+        page.unlink()
+    written = renderer.render(name, {f'{name}.sub.leaf'})
+    assert sorted(written) == sorted([out / 'index.html', out / 'sub' / 'index.html',
+                                      out / 'sub' / 'leaf.html'])
+    assert 'edited' in (out / 'sub' / 'leaf.html').read_text(encoding='utf-8')
+    assert not (out / 'other.html').exists()
+
+
+def test_added_module_renders_whole_package(rendered):
+    renderer, name, package, out, _ = rendered
+    (out / 'other.html').unlink()
+    (package / 'extra.py').write_text('"""Extra module."""\n', encoding='utf-8')
+    written = renderer.render(name, {f'{name}.extra'})
+    assert out / 'extra.html' in written
+    assert (out / 'other.html').exists()
+    assert renderer.summary()[name][0] == 6
+
+
+def test_removed_module_deletes_its_page(rendered):
+    renderer, name, package, out, _ = rendered
+    (package / 'other.py').unlink()
+    renderer.render(name, {f'{name}.other'})
+    assert not (out / 'other.html').exists()
+    assert f'{name}.other' not in (out / 'index.html').read_text(encoding='utf-8')
+    assert renderer.summary()[name][0] == 4
@@ -0,0 +1,69 @@
+"""Tests for pipeline: stage ordering, failures and skipping."""
+import pytest
+
+from pipeline import STAGES, Stage, parse_args, run_pipeline
+
+
+class Context:
+    def __init__(self):
+        self.ran = []
+        self.state = None
+
+
+def make_stages(fail=()):
+    def step(name):
+        def func(ctx):
+            if name == 'state':
+                ctx.state = 'ready'
+            elif ctx.state is None:
+                raise RuntimeError(f'{name} ran without state')
+            if name in fail:
+                raise RuntimeError(name)
+            ctx.ran.append(name)
+        return func
+
+    return [
+        Stage('state', step('state'), provides_state=True),
+        Stage('edit', step('edit'), ('state',)),
+        Stage('check', step('check'), ('state',)),
+        Stage('save', step('save'), ('edit', 'check')),
+    ]
+
+
+def statuses(report):
+    return {name: status for name, status, _ in report}
+
+
+def test_runs_every_stage_after_its_dependencies():
+    ctx = Context()
+    report = run_pipeline(make_stages(), ctx)
+    assert set(statuses(report).values()) == {'ok'}
+    assert ctx.ran[-1] == 'save'
+
+
+def test_failure_skips_dependents(capsys):
+    ctx = Context()
+    report = statuses(run_pipeline(make_stages(fail=('check',)), ctx))
+    assert report['check'] == 'failed'
+    assert report['save'] == 'skipped (dependency failed)'
+    assert report['edit'] == 'ok'
+
+
+def test_skipping_a_stage_runs_its_dependents():
+    ctx = Context()
+    report = statuses(run_pipeline(make_stages(), ctx, skip=['check']))
+    assert report['check'] == 'skipped'
+    assert report['save'] == 'ok'
+    assert 'check' not in ctx.ran
+
+
+def test_stages_providing_state_cannot_be_skipped():
+    with pytest.raises(ValueError):
+        run_pipeline(make_stages(), Context(), skip=['state'])
+
+
+def test_skip_choices():
+    assert parse_args(['--skip', 'links', '--skip', 'pdoc']).skip == ['links', 'pdoc']
+    for name in (stage.name for stage in STAGES if stage.provides_state):
+        with pytest.raises(SystemExit):
+            parse_args(['--skip', name])
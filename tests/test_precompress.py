@@ -0,0 +1,77 @@
+"""Tests for precompress: which siblings are written, kept and removed."""
+import gzip
+import os
+
+from precompress import compress_file, find_compressible, precompress
+
+PAGE = b'<p>Sphinx packages</p>\n' * 200
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+def set_mtime(path, seconds):
+    os.utime(path, ns=(seconds * 10**9, seconds * 10**9))
+
+
+def test_writes_missing_sibling(tmp_path):
+    page = write(tmp_path / 'index.html', PAGE)
+    size, sizes = compress_file(page, ['gzip'])
+    assert size == len(PAGE)
+    assert 0 < sizes['gzip'] < len(PAGE)
+    assert gzip.decompress((tmp_path / 'index.html.gz').read_bytes()) == PAGE
+
+
+def test_skips_up_to_date_sibling(tmp_path):
+    page = write(tmp_path / 'index.html', PAGE)
+    sibling = write(tmp_path / 'index.html.gz', b'kept')
+    set_mtime(page, 1000)
+    set_mtime(sibling, 2000)
+    assert compress_file(page, ['gzip']) == (len(PAGE), {'gzip': None})
+    assert (tmp_path / 'index.html.gz').read_bytes() == b'kept'
+
+
+def test_rewrites_stale_sibling(tmp_path):
+    page = write(tmp_path / 'index.html', PAGE)
+    sibling = write(tmp_path / 'index.html.gz', b'stale')
+    set_mtime(sibling, 1000)
+    set_mtime(page, 2000)
+    _, sizes = compress_file(page, ['gzip'])
+    assert sizes['gzip'] > 0
+    assert gzip.decompress((tmp_path / 'index.html.gz').read_bytes()) == PAGE
+
+
+def test_removes_sibling_that_is_not_smaller(tmp_path):
+    # Random bytes do not compress, so the new sibling would be larger
+    page = write(tmp_path / 'data.json', os.urandom(4096))
+    sibling = write(tmp_path / 'data.json.gz', b'stale')
+    set_mtime(sibling, 1000)
+    set_mtime(page, 2000)
+    assert compress_file(page, ['gzip']) == (4096, {'gzip': 0})
+    assert not (tmp_path / 'data.json.gz').exists()
+
+
+def test_find_compressible_honours_min_bytes_and_suffixes(tmp_path):
+    write(tmp_path / 'small.html', b'x' * 10)
+    write(tmp_path / 'exact.css', b'x' * 100)
+    write(tmp_path / 'sub' / 'page.HTML', b'x' * 500)
+    write(tmp_path / 'logo.png', b'x' * 500)
+    found = sorted(os.path.relpath(path, tmp_path) for path in find_compressible(tmp_path, 100))
+    assert found == ['exact.css', os.path.join('sub', 'page.HTML')]
+
+
+def test_precompress_totals(tmp_path):
+    write(tmp_path / 'a.html', PAGE)
+    write(tmp_path / 'b.js', PAGE)
+    write(tmp_path / 'tiny.css', b'p{}')
+    stats = precompress([tmp_path], ['gzip'], workers=1, min_bytes=1024)
+    assert stats['files'] == 2 and stats['up_to_date'] == 0
+    assert stats['gzip']['written'] == 2
+    assert stats['gzip']['original'] == 2 * len(PAGE)
+    assert not (tmp_path / 'tiny.css.gz').exists()
+
+    again = precompress([tmp_path], ['gzip'], workers=1, min_bytes=1024)
+    assert again['up_to_date'] == 2 and again['gzip']['written'] == 0
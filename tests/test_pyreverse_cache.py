@@ -0,0 +1,118 @@
+"""Tests for the pyreverse_cache extension's diagram cache and its fallbacks."""
+import logging
+from types import SimpleNamespace
+
+import pytest
+
+import pyreverse_cache
+from pyreverse_cache import DiagramCache, cached_subproc, module_path
+
+pytest.importorskip('sphinx_pyreverse')
+from sphinx_pyreverse import UMLGenerateDirective, uml_generate_directive  # noqa: E402
+
+
+@pytest.fixture
+def src(tmp_path):
+    package = tmp_path / 'src' / 'alpha'
+    package.mkdir(parents=True)
+    (package / '__init__.py').write_text('', encoding='utf-8')
+    (package / 'core.py').write_text('class Core:\n    pass\n', encoding='utf-8')
+    (tmp_path / 'src' / 'single.py').write_text('x = 1\n', encoding='utf-8')
+    return tmp_path / 'src'
+
+
+def command(module):
+    return ['pyreverse', '--output', 'dot', '--project', module, module]
+
+
+@pytest.fixture
+def restore_module_state(monkeypatch):
+    for name in ('_cache', '_original_subproc', '_build_command', '_dir_name'):
+        monkeypatch.setattr(pyreverse_cache, name, getattr(pyreverse_cache, name))
+    monkeypatch.setattr(uml_generate_directive, 'subproc_wrapper', uml_generate_directive.subproc_wrapper)
+
+
+def test_module_path(src):
+    assert module_path('alpha', src) == src / 'alpha'
+    assert module_path('single', '/nowhere', [str(src)]) == src / 'single.py'
+    assert module_path('alpha.core', '/nowhere', [str(src)]) == src / 'alpha' / 'core.py'
+    assert module_path('missing', src, []) is None
+
+
+def test_key_follows_module_contents(src, tmp_path):
+    cache = DiagramCache(tmp_path / 'cache')
+    key = cache.key(command('alpha'), src)
+    assert key == cache.key(command('alpha'), src)
+    assert cache.key(['pyreverse', '--output', 'svg', '--project', 'alpha', 'alpha'], src) != key
+
+    (src / 'alpha' / 'core.py').write_text('class Core2:\n    pass\n', encoding='utf-8')
+    changed = cache.key(command('alpha'), src)
+    assert changed != key
+    (src / 'alpha' / 'extra.py').write_text('', encoding='utf-8')
+    assert cache.key(command('alpha'), src) != changed
+    assert cache.key(command('missing'), src) is None
+
+
+def test_store_keeps_only_project_outputs(tmp_path):
+    cache = DiagramCache(tmp_path / 'cache')
+    out = tmp_path / 'out'
+    out.mkdir()
+    (out / 'classes_alpha.dot').write_text('classes', encoding='utf-8')
+    (out / 'packages_alpha.dot').write_text('packages', encoding='utf-8')
+    (out / 'classes_beta.dot').write_text('other', encoding='utf-8')
+    (out / 'classes_beta_alpha.dot').write_text('suffix', encoding='utf-8')
+    cache.store('k' * 64, command('alpha'), out)
+    assert cache.has('k' * 64)
+
+    dest = tmp_path / 'dest'
+    dest.mkdir()
+    assert cache.restore('k' * 64, dest)
+    assert sorted(path.name for path in dest.iterdir()) == ['classes_alpha.dot', 'packages_alpha.dot']
+    assert not cache.restore('x' * 64, dest)
+
+
+def test_cached_subproc(src, tmp_path, monkeypatch):
+    calls = []
+
+    def run_pyreverse(cmd, cwd=None, **kwargs):
+        calls.append(cmd)
+        (src / f'classes_{cmd[-1]}.dot').write_text('digraph {}', encoding='utf-8')
+
+    monkeypatch.setattr(pyreverse_cache, '_cache', DiagramCache(tmp_path / 'cache'))
+    monkeypatch.setattr(pyreverse_cache, '_original_subproc', run_pyreverse)
+    cached_subproc(command('alpha'), cwd=src)
+    (src / 'classes_alpha.dot').unlink()
+    cached_subproc(command('alpha'), cwd=src)
+    assert len(calls) == 1
+    assert (src / 'classes_alpha.dot').read_text() == 'digraph {}'
+    assert (pyreverse_cache._cache.hits, pyreverse_cache._cache.misses) == (1, 1)
+
+
+def make_app(tmp_path):
+    return SimpleNamespace(extensions={'sphinx_pyreverse': None}, srcdir=str(tmp_path),
+                           config=SimpleNamespace(pyreverse_cache_dir=str(tmp_path / 'cache')))
+
+
+def test_builder_inited_uses_the_directive_internals(tmp_path, restore_module_state):
+    pyreverse_cache.builder_inited(make_app(tmp_path))
+    assert uml_generate_directive.subproc_wrapper is pyreverse_cache.cached_subproc
+    assert pyreverse_cache._dir_name == UMLGenerateDirective.DIR_NAME
+
+
+def test_missing_internals_disable_pregeneration(tmp_path, restore_module_state, monkeypatch, caplog):
+    monkeypatch.delattr(UMLGenerateDirective, '_build_command')
+    app = make_app(tmp_path)
+    with caplog.at_level(logging.WARNING):
+        pyreverse_cache.builder_inited(app)
+    assert 'not generated ahead' in caplog.text
+    # Still cached through the subprocess hook
+    assert uml_generate_directive.subproc_wrapper is pyreverse_cache.cached_subproc
+    assert pyreverse_cache.pregenerate(app, None, {'index'}, set(), set()) == []
+
+
+def test_missing_hook_disables_the_cache(tmp_path, restore_module_state, monkeypatch, caplog):
+    monkeypatch.delattr(uml_generate_directive, 'subproc_wrapper')
+    with caplog.at_level(logging.WARNING):
+        pyreverse_cache.builder_inited(make_app(tmp_path))
+    assert 'not cached' in caplog.text
+    assert pyreverse_cache._cache is None
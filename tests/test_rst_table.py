@@ -0,0 +1,91 @@
+"""Tests for rst_table: parsing list-tables, editing cells and writing them back."""
+import pytest
+
+from rst_table import PackageTables, rewrite
+
+DOC = """\
+Packages
+========
+
+.. list-table:: Core
+   :header-rows: 1
+
+   * - Name
+     - Version
+     - Manual
+   * - Sphinx
+     - Latest
+     - `link <https://www.sphinx-doc.org/>`_
+   * - pdoc3
+     - 0.11
+     - N/A
+
+Text after the table, with a - dash.
+
+.. list-table:: More
+   :header-rows: 1
+   :widths: 20 10
+
+   * - Name
+     - Version
+   * - furo
+     - 2024.1
+"""
+
+
+@pytest.fixture
+def rst(tmp_path):
+    path = tmp_path / 'packages.rst'
+    path.write_text(DOC, encoding='utf-8')
+    return path
+
+
+def test_rows_are_addressed_by_header(rst):
+    tables = PackageTables.load(rst)
+    assert [row.name for row in tables.rows] == ['Sphinx', 'pdoc3', 'furo']
+    sphinx = tables.rows[0]
+    assert sphinx.columns == ['name', 'version', 'manual']
+    assert sphinx.get('manual') == '`link <https://www.sphinx-doc.org/>`_'
+    # A column the table does not have
+    assert tables.rows[2].get('manual') == ''
+
+
+def test_unedited_document_round_trips(rst):
+    tables = PackageTables.load(rst)
+    assert tables.to_string() == DOC
+    tables.save(rst)
+    assert rst.read_text(encoding='utf-8') == DOC
+
+
+def test_set_keeps_marker_and_indentation(rst):
+    tables = PackageTables.load(rst)
+    tables.rows[0].set('manual', 'N/A')
+    tables.rows[1].set('name', 'pdoc')
+    tables.save(rst)
+    expected = (DOC.replace('     - `link <https://www.sphinx-doc.org/>`_\n', '     - N/A\n')
+                .replace('   * - pdoc3\n', '   * - pdoc\n'))
+    assert rst.read_text(encoding='utf-8') == expected
+
+
+def test_set_unknown_column(rst):
+    tables = PackageTables.load(rst)
+    with pytest.raises(KeyError):
+        tables.rows[2].set('manual', 'N/A')
+
+
+def test_rewrite_streams_the_same_rows(rst):
+    seen = []
+
+    def edit(row):
+        seen.append((row.name, row.get('version')))
+        if row.name == 'furo':
+            row.set('version', '2025.1')
+
+    assert rewrite(rst, edit) == 3
+    assert seen == [('Sphinx', 'Latest'), ('pdoc3', '0.11'), ('furo', '2024.1')]
+    assert rst.read_text(encoding='utf-8') == DOC.replace('2024.1', '2025.1')
+
+
+def test_rewrite_without_edits_is_byte_identical(rst):
+    rewrite(rst, lambda row: None)
+    assert rst.read_text(encoding='utf-8') == DOC
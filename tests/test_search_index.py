@@ -0,0 +1,189 @@
+"""Tests for search_index: reading pdoc and Sphinx pages and writing the index."""
+import json
+
+from search_index import (CHUNK_SIZE, PdocPageParser, build_index, parse_pdoc_page, pdoc_pages,
+                          sphinx_entries, tokenize, write_index)
+
+# Trimmed pdoc3 pages: the header, intro and object markup the parser reads
+CORE_PAGE = '''<html><body><main><article id="content">
+<header>
+<h1 class="title">Module <code>pkg.core</code></h1>
+</header>
+<section id="section-intro">
+<p>pkg.core
+~~~~~~~~</p>
+<p>Core   helpers
+for parsing.</p>
+</section>
+<section>
+<h2 class="section-title" id="header-variables">Global variables</h2>
+<dl>
+<dt id="pkg.core.LIMIT"><code class="name">var <span class="ident">LIMIT</span></code></dt>
+<dd>
+<div class="desc"><p>How many.</p></div>
+</dd>
+</dl>
+</section>
+<section>
+<h2 class="section-title" id="header-functions">Functions</h2>
+<dl>
+<dt id="pkg.core.parse_value"><code class="name flex">
+<span>def <span class="ident">parse_value</span></span>(<span>text)</span>
+</code></dt>
+<dd>
+<details class="source"><summary><span>Expand source code</span></summary>
+<pre><code class="python">def parse_value(text):
+    &#34;&#34;&#34;Parse a value.&#34;&#34;&#34;</code></pre>
+</details>
+<div class="desc"><p>Parse a value.</p></div>
+</dd>
+</dl>
+</section>
+<section>
+<h2 class="section-title" id="header-classes">Classes</h2>
+<dl>
+<dt id="pkg.core.HttpSession"><code class="flex name class">
+<span>class <span class="ident">HttpSession</span></span>
+</code></dt>
+<dd>
+<div class="desc"><p>A session.</p></div>
+<h3>Methods</h3>
+<dl>
+<dt id="pkg.core.HttpSession.bare"><code class="name flex">
+<span>def <span class="ident">bare</span></span>(<span>self)</span>
+</code></dt>
+<dd>
+<div class="desc"></div>
+</dd>
+<dt id="pkg.core.HttpSession.merge_settings"><code class="name flex">
+<span>def <span class="ident">merge_settings</span></span>(<span>self)</span>
+</code></dt>
+<dd>
+<div class="desc"><p>Merge the settings.</p></div>
+</dd>
+</dl>
+</dd>
+</dl>
+</section>
+</article></main></body></html>
+'''
+
+# What Sphinx writes to searchindex.js for one page with a section and a function
+SEARCHINDEX = 'Search.setIndex(' + json.dumps({
+    'docnames': ['index', 'api'],
+    'titles': ['Welcome', 'API reference'],
+    'alltitles': {'Welcome': [[0, None]], 'Helpers': [[1, 'helpers']]},
+    'objects': {'viper': [[1, 0, 1, '', 'load_table']], '': [[1, 1, 1, '-', 'build']]},
+    'objnames': {'0': ['py', 'function', 'Python function'], '1': ['std', 'cmdoption', 'option']},
+    'objtypes': {'0': 'py:function', '1': 'std:cmdoption'},
+}) + ')'
+
+SINGLE_PAGE = '''<html><body><main><article id="content">
+<header>
+<h1 class="title">Module <code>single</code></h1>
+</header>
+<section id="section-intro">
+<p>A single-module package.</p>
+</section>
+</article></main></body></html>
+'''
+
+
+def make_pdoc(tmp_path):
+    pdoc_dir = tmp_path / 'html' / 'pdoc'
+    (pdoc_dir / 'pkg').mkdir(parents=True)
+    (pdoc_dir / 'index.html').write_text('<html></html>')
+    (pdoc_dir / 'pkg' / 'core.html').write_text(CORE_PAGE)
+    (pdoc_dir / 'single.html').write_text(SINGLE_PAGE)
+    return pdoc_dir
+
+
+def test_pdoc_pages_include_single_modules(tmp_path):
+    pdoc_dir = make_pdoc(tmp_path)
+    assert list(pdoc_pages(pdoc_dir)) == [
+        ('pkg', pdoc_dir / 'pkg' / 'core.html'),
+        ('single', pdoc_dir / 'single.html'),
+    ]
+
+
+def test_tokenize_splits_dotted_snake_and_camel_names():
+    assert tokenize('requests.HttpSession.merge_env_settings') == {
+        'requests', 'httpsession', 'http', 'session', 'merge_env_settings',
+        'merge', 'env', 'settings'}
+    # Single characters and bare underscores are not worth a shard lookup
+    assert tokenize('a.__init__ x') == {'init'}
+
+
+def test_parser_reads_pdoc_markup():
+    parser = PdocPageParser()
+    parser.feed(CORE_PAGE)
+    assert parser.module == 'pkg.core'
+    assert parser.module_kind == 'module'
+    # The reST heading paragraph is skipped and whitespace collapsed
+    assert parser.module_summary == 'Core helpers for parsing.'
+    assert parser.objects == [
+        ['pkg.core.LIMIT', 'variable', 'How many.'],
+        ['pkg.core.parse_value', 'function', 'Parse a value.'],
+        ['pkg.core.HttpSession', 'class', 'A session.'],
+        ['pkg.core.HttpSession.bare', 'function', ''],
+        ['pkg.core.HttpSession.merge_settings', 'function', 'Merge the settings.'],
+    ]
+
+
+def test_parse_pdoc_page_marks_methods(tmp_path):
+    pdoc_dir = make_pdoc(tmp_path)
+    entries = parse_pdoc_page(pdoc_dir / 'pkg' / 'core.html', tmp_path / 'html')
+    assert entries[0] == ['pkg.core', 'module', 'pdoc/pkg/core.html', 'Core helpers for parsing.']
+    kinds = {name: kind for name, kind, _, _ in entries}
+    assert kinds['pkg.core.parse_value'] == 'function'
+    assert kinds['pkg.core.HttpSession.merge_settings'] == 'method'
+    assert entries[-1][2] == 'pdoc/pkg/core.html#pkg.core.HttpSession.merge_settings'
+
+
+def test_parse_pdoc_page_skips_non_module_pages(tmp_path):
+    page = tmp_path / 'index.html'
+    page.write_text('<html><h1>API documentation</h1></html>')
+    assert parse_pdoc_page(page, tmp_path) == []
+
+
+def test_sphinx_entries(tmp_path):
+    assert sphinx_entries(tmp_path) == []
+    (tmp_path / 'searchindex.js').write_text(SEARCHINDEX)
+    assert sphinx_entries(tmp_path) == [
+        ['Welcome', 'page', 'index.html', ''],
+        ['API reference', 'page', 'api.html', ''],
+        ['Helpers', 'section', 'api.html#helpers', 'API reference'],
+        ['viper.load_table', 'python function', 'api.html#viper.load_table', 'API reference'],
+        ['build', 'option', 'api.html#cmdoption-build', 'API reference'],
+    ]
+
+
+def test_build_index_ranks_own_name_first(tmp_path):
+    pdoc_dir = make_pdoc(tmp_path)
+    (tmp_path / 'html' / 'searchindex.js').write_text(SEARCHINDEX)
+    entries, postings = build_index(tmp_path / 'html', pdoc_dir, workers=1)
+    names = [entry[0] for entry in entries]
+    packages = {entry[0]: entry[4] for entry in entries}
+    assert packages['single'] == 'single'
+    assert packages['viper.load_table'] == ''
+    # "session" is HttpSession's own name but only part of its methods' paths
+    assert names[postings['session'][0]] == 'pkg.core.HttpSession'
+    assert names[postings['core'][0]] == 'pkg.core'
+
+
+def test_write_index_shards_and_replaces(tmp_path):
+    out_dir = tmp_path / 'search'
+    out_dir.mkdir()
+    (out_dir / 'stale.json').write_text('{}')
+    entries = [[f'name{i}', 'function', f'page.html#name{i}', '', ''] for i in range(CHUNK_SIZE + 1)]
+    postings = {'name0': [0], 'name1': [1], 'page': [0, 1]}
+    assert write_index(out_dir, entries, postings) == 2
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['search']
+    assert not (out_dir / 'stale.json').exists()
+    manifest = json.loads((out_dir / 'index.json').read_text(encoding='utf-8'))
+    assert manifest['count'] == CHUNK_SIZE + 1
+    assert manifest['shards'] == ['na', 'pa']
+    assert json.loads((out_dir / 't' / 'na.json').read_text()) == {'name0': [0], 'name1': [1]}
+    assert len(json.loads((out_dir / 'e' / '0.json').read_text())) == CHUNK_SIZE
+    assert json.loads((out_dir / 'e' / '1.json').read_text()) == [entries[-1]]
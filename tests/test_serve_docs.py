@@ -0,0 +1,68 @@
+"""Tests for serve_docs, talking HTTP to a StaticServer on a local port."""
+import asyncio
+
+import pytest
+
+from serve_docs import StaticServer
+
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / 'index.html').write_text('<p>home</p>', encoding='utf-8')
+    (tmp_path / 'big.txt').write_bytes(b'x' * 4096)
+    (tmp_path / 'guide').mkdir()
+    (tmp_path / 'guide' / 'index.html').write_text('<p>guide</p>', encoding='utf-8')
+    return tmp_path
+
+
+def request(root, target, headers=(), cache_file_kb=1):
+    """Send one GET for ``target`` and return ``(status, headers, body)``."""
+    async def run():
+        handler = StaticServer(root, cache_file_kb=cache_file_kb, access_log=False)
+        server = await asyncio.start_server(handler.handle, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            lines = [f'GET {target} HTTP/1.1', 'Host: test', 'Connection: close', *headers]
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            response = await reader.read()
+            writer.close()
+        return response
+    head, _, body = asyncio.run(run()).partition(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    fields = dict(line.split(': ', 1) for line in header_lines)
+    return int(status_line.split()[1]), fields, body
+
+
+def test_serves_cached_and_sendfile_bodies(root):
+    status, headers, body = request(root, '/')
+    assert status == 200 and body == b'<p>home</p>'
+    assert headers['Content-Type'] == 'text/html; charset=utf-8'
+    status, _, body = request(root, '/big.txt')
+    assert status == 200 and body == b'x' * 4096
+
+
+def test_directory_redirect(root):
+    status, headers, _ = request(root, '/guide')
+    assert status == 301 and headers['Location'] == '/guide/'
+
+
+def test_nul_in_path_is_not_found(root):
+    for target in ('/index.html%00', '/%00', '/guide%00/', '/index.html%00.txt'):
+        status, _, _ = request(root, target, ['Accept-Encoding: gzip, br'])
+        assert status == 404, target
+
+
+def test_path_outside_root_is_not_found(root):
+    (root.parent / 'secret.txt').write_text('secret', encoding='utf-8')
+    status, _, _ = request(root, '/%2e%2e/secret.txt')
+    assert status == 404
+
+
+def test_conditional_and_range_requests(root):
+    _, headers, _ = request(root, '/index.html')
+    status, _, body = request(root, '/index.html', [f'If-None-Match: {headers["ETag"]}'])
+    assert status == 304 and body == b''
+    status, headers, body = request(root, '/big.txt', ['Range: bytes=10-19'])
+    assert status == 206 and body == b'x' * 10
+    assert headers['Content-Range'] == 'bytes 10-19/4096'
@@ -0,0 +1,146 @@
+"""Tests for validate_manual_links, run against a local stand-in HTTP server."""
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+import pytest
+
+from link_cache import LinkCache
+from rst_table import PackageTables
+from validate_manual_links import check_urls, extract_manual_links, fix_manual_links, probe_url
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Routes that mimic the link behaviours the checker has to handle."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def _respond(self, status, headers=None, body=b''):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _route(self):
+        path = urlparse(self.path).path
+        if path.startswith('/ok'):
+            self._respond(200, body=b'ok')
+        elif path == '/redirect':
+            self._respond(301, {'Location': '/ok/redirected'})
+        elif path == '/no-head':
+            # Some servers reject HEAD; the checker must fall back to GET
+            self._respond(405 if self.command == 'HEAD' else 200, body=b'ok')
+        elif path == '/etag':
+            if self.headers.get('If-None-Match') == '"v1"':
+                self._respond(304, {'ETag': '"v1"'})
+            else:
+                self._respond(200, {'ETag': '"v1"'}, body=b'ok')
+        elif path == '/slow':
+            time.sleep(2)
+            self._respond(200, body=b'ok')
+        else:
+            self._respond(404, body=b'missing')
+
+    do_HEAD = _route
+    do_GET = _route
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def server():
+    """Base URL of a stand-in server running for the tests of this module."""
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_probe_follows_redirects(server):
+    result = probe_url(f'{server}/redirect')
+    assert result.ok
+    assert result.final_url == f'{server}/ok/redirected'
+
+
+def test_probe_falls_back_to_get(server):
+    assert probe_url(f'{server}/no-head').ok
+
+
+def test_probe_reports_missing(server):
+    result = probe_url(f'{server}/missing')
+    assert not result.ok
+    assert result.status == 404
+
+
+def test_check_urls(server):
+    expected = {
+        f'{server}/ok': True,
+        f'{server}/redirect': True,
+        f'{server}/no-head': True,
+        f'{server}/missing': False,
+        # Still running at the deadline: unchecked, not broken
+        f'{server}/slow': None,
+    }
+    expected.update({f'{server}/ok/{i}': True for i in range(20)})
+    seen = []
+    results = asyncio.run(check_urls(expected, per_host=2, deadline=1, timeout=5,
+                                     on_result=lambda url, ok: seen.append(url)))
+    assert results == expected
+    assert sorted(seen) == sorted(url for url, ok in expected.items() if ok is not None)
+
+
+def test_check_urls_with_cache(server, tmp_path):
+    urls = [f'{server}/etag', f'{server}/missing']
+    cache = LinkCache(tmp_path / 'links.sqlite', ttl_hours=1)
+    try:
+        asyncio.run(check_urls(urls, cache=cache))
+        assert cache.misses == 2
+
+        # Fresh entries are answered without a request
+        asyncio.run(check_urls(urls, cache=cache))
+        assert cache.fresh == 2
+
+        # Expired entries with validators are revalidated conditionally, the
+        # others checked again in full
+        cache.ttl = 0
+        results = asyncio.run(check_urls(urls, cache=cache))
+        assert cache.revalidated == 1
+        assert cache.refreshed == 1
+        assert cache.fresh + cache.revalidated + cache.refreshed + cache.misses == 3 * len(urls)
+        assert results == {urls[0]: True, urls[1]: False}
+    finally:
+        cache.close()
+
+
+def test_fix_manual_links(server, tmp_path):
+    rst = tmp_path / 'packages.rst'
+    rst.write_text(f"""\
+.. list-table:: Packages
+   :header-rows: 1
+
+   * - Name
+     - Manual
+   * - good
+     - `link <{server}/ok/good>`_
+   * - broken
+     - `link <{server}/missing>`_
+   * - none
+     - N/A
+""", encoding='utf-8')
+    assert extract_manual_links(rst) == [f'{server}/ok/good', f'{server}/missing']
+
+    tables = PackageTables.load(rst)
+    assert fix_manual_links(tables, deadline=10) == (1, 2)
+    assert [row.get('manual') for row in tables.rows] == [
+        f'`link <{server}/ok/good>`_', 'N/A', 'N/A']
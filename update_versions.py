@@ -3,63 +3,45 @@
 Update package versions in sphinx-packages.rst with actual installed versions.
 """
 import re
-import subprocess
 from pathlib import Path
 
+from dist_index import get_index
+from rst_table import PackageTables
+
+# Version cells that get replaced: "Latest" or a previously filled-in version
+_VERSION_CELL = re.compile(r'^(?:Latest|[\d.]+)$')
+
 
 def get_installed_versions():
-    """Get all installed package versions from pip."""
-    result = subprocess.run(
-        ['pip', 'list', '--format=freeze'],
-        capture_output=True,
-        text=True,
-        check=True
-    )
-    
-    versions = {}
-    for line in result.stdout.strip().split('\n'):
-        if '==' in line:
-            pkg, ver = line.split('==', 1)
-            versions[pkg.lower()] = ver
-            # Also store with underscores replaced by hyphens
-            versions[pkg.lower().replace('_', '-')] = ver
-    
-    return versions
+    """Get all installed package versions from importlib.metadata."""
+    return get_index()
+
+
+def apply_versions(tables, versions):
+    """Fill the Version column of a ``PackageTables`` model from ``versions``.
+
+    ``versions`` is a ``DistributionIndex``; package names are matched in
+    PEP 503 canonical form, so hyphens, underscores and dots are
+    interchangeable. Cells holding ``Latest`` or a version number are
+    replaced with the installed version; rows for packages that aren't
+    installed are left alone. Returns the number of rows updated.
+    """
+    updated = 0
+    for row in tables.rows:
+        if not _VERSION_CELL.match(row.get('version')):
+            continue
+        version = versions.version(row.name)
+        if version:
+            row.set('version', version)
+            updated += 1
+    return updated
 
 
 def update_rst_file(rst_path, versions):
     """Update the RST file with actual package versions."""
-    with open(rst_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Pattern to match version lines in the table
-    # Matches lines like "     - Latest" or "     - 1.2.3"
-    pattern = r'(\*\s*-\s+([a-zA-Z0-9_-]+)\s*\n\s+)-\s+(?:Latest|[\d.]+(?:\.\d+)?)'
-    
-    def replace_version(match):
-        full_match = match.group(0)
-        prefix = match.group(1)
-        pkg_name = match.group(2).lower()
-        
-        # Try to find the version
-        version = versions.get(pkg_name)
-        if not version:
-            # Try with underscores instead of hyphens
-            version = versions.get(pkg_name.replace('-', '_'))
-        if not version:
-            # Try with hyphens instead of underscores
-            version = versions.get(pkg_name.replace('_', '-'))
-        
-        if version:
-            return f"{prefix}- {version}"
-        else:
-            # Keep the original if version not found
-            return full_match
-    
-    updated_content = re.sub(pattern, replace_version, content)
-    
-    with open(rst_path, 'w', encoding='utf-8') as f:
-        f.write(updated_content)
+    tables = PackageTables.load(rst_path)
+    apply_versions(tables, versions)
+    tables.save(rst_path)
     
     print(f"✓ Updated versions in {rst_path}")
 
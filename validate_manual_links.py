@@ -2,95 +2,247 @@
 """
 Validate Manual links in sphinx-packages.rst and remove broken ones.
 """
+import argparse
+import asyncio
 import re
+import time
 import requests
+from collections import defaultdict, namedtuple
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
 
+import profiling
+from link_cache import DEFAULT_CACHE_PATH, DEFAULT_TTL_HOURS, LinkCache
+from rst_table import PackageTables
 
-def check_url(url, timeout=5):
-    """Check if a URL is accessible (returns non-404 status)."""
-    try:
-        response = requests.head(url, timeout=timeout, allow_redirects=True)
+# Requests in flight across all hosts
+DEFAULT_CONCURRENCY = 32
+
+# Requests in flight to any single host (keeps us from hammering github.com)
+DEFAULT_PER_HOST = 4
+
+# Wall-clock budget in seconds for the whole validation run
+DEFAULT_DEADLINE = 300
+
+# Target of a link in a Manual cell: `link <URL>`_ (any link text)
+_MANUAL_LINK = re.compile(r'`[^`<]*<([^>]+)>`__?')
+
+
+def make_session(per_host=DEFAULT_PER_HOST):
+    """Create a session that keeps up to ``per_host`` connections alive per host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=64, pool_maxsize=per_host)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+# Outcome of one link check; ``status`` is None when no response was received
+LinkResult = namedtuple('LinkResult', 'ok status final_url etag last_modified')
+
+
+def _link_result(response):
+    return LinkResult(
         # Accept 200-399 status codes
-        return response.status_code < 400
+        response.status_code < 400,
+        response.status_code,
+        response.url,
+        response.headers.get('ETag'),
+        response.headers.get('Last-Modified'),
+    )
+
+
+def probe_url(url, timeout=5, session=None, etag=None, last_modified=None):
+    """Check a URL and return a ``LinkResult``.
+
+    When ``etag`` or ``last_modified`` is given the HEAD request is made
+    conditional; a ``304`` status means the cached result is still valid.
+    """
+    client = session or requests
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+    try:
+        response = client.head(url, timeout=timeout, allow_redirects=True, headers=headers)
+        if response.status_code < 400:
+            return _link_result(response)
     except requests.RequestException:
-        try:
-            # Try GET if HEAD fails (some servers don't support HEAD)
-            response = requests.get(url, timeout=timeout, allow_redirects=True, stream=True)
-            return response.status_code < 400
-        except requests.RequestException:
-            return False
+        pass
+    try:
+        # Try GET if HEAD fails (some servers don't support HEAD)
+        with client.get(url, timeout=timeout, allow_redirects=True, stream=True) as response:
+            return _link_result(response)
+    except requests.RequestException:
+        return LinkResult(False, None, url, None, None)
+
+
+def check_url(url, timeout=5, session=None):
+    """Check if a URL is accessible (returns non-404 status)."""
+    return probe_url(url, timeout=timeout, session=session).ok
+
+
+async def check_urls(urls, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST,
+                     deadline=DEFAULT_DEADLINE, timeout=5, on_result=None, cache=None):
+    """Check ``urls`` concurrently and return ``{url: True | False | None}``.
+
+    Requests share one pooled keep-alive session. At most ``per_host``
+    requests run against any single host and at most ``concurrency`` in
+    total. URLs still unchecked when ``deadline`` seconds have passed map to
+    ``None`` so callers can keep them rather than treat them as broken.
+    ``on_result(url, ok)`` is called as each check finishes.
+
+    With a ``LinkCache``, fresh results are answered without any request and
+    expired ones are revalidated with a conditional request to their final
+    redirect target.
+    """
+    loop = asyncio.get_running_loop()
+    session = make_session(per_host)
+    # The blocking requests calls run on a dedicated pool sized to the budget
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    global_limit = asyncio.Semaphore(concurrency)
+    host_limits = defaultdict(lambda: asyncio.Semaphore(per_host))
+    results = dict.fromkeys(urls)
+
+    async def check_one(url):
+        entry, is_fresh = cache.lookup(url) if cache else (None, False)
+        if is_fresh:
+            results[url] = entry.ok
+            if on_result:
+                on_result(url, entry.ok)
+            return
+
+        target, validators = url, {}
+        if entry and (entry.etag or entry.last_modified):
+            target = entry.final_url or url
+            validators = {'etag': entry.etag, 'last_modified': entry.last_modified}
+
+        # Take the host slot first so one busy host can't hold global slots idle
+        async with host_limits[urlparse(target).netloc.lower()]:
+            async with global_limit:
+                start = time.perf_counter()
+                result = await loop.run_in_executor(
+                    executor, lambda: probe_url(target, timeout, session, **validators))
+                profiling.record(url, 'url', start, time.perf_counter() - start,
+                                 status=result.status, revalidated=bool(validators))
+
+        if validators and result.status == 304:
+            ok = entry.ok
+            cache.touch(url)
+        else:
+            ok = result.ok
+            if cache:
+                cache.store(url, result)
+        results[url] = ok
+        if on_result:
+            on_result(url, ok)
+
+    tasks = [asyncio.create_task(check_one(url)) for url in results]
+    try:
+        if tasks:
+            await asyncio.wait(tasks, timeout=deadline)
+    finally:
+        for task in tasks:
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+        session.close()
+    return results
+
+
+def manual_url(row):
+    """Return the URL linked from a row's Manual cell, or None."""
+    match = _MANUAL_LINK.search(row.get('manual'))
+    return match.group(1) if match else None
 
 
 def extract_manual_links(rst_path):
     """Extract all Manual links from the RST file."""
-    with open(rst_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Pattern to match Manual links: `Manual <URL>`_
-    pattern = r'`Manual <([^>]+)>`_'
-    matches = re.findall(pattern, content)
-    
-    return matches
+    tables = PackageTables.load(rst_path)
+    return [url for url in map(manual_url, tables.rows) if url]
 
 
-def validate_and_fix_links(rst_path, max_workers=10):
-    """Validate Manual links and remove broken ones."""
-    with open(rst_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-    
+def fix_manual_links(tables, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST,
+                     deadline=DEFAULT_DEADLINE, cache=None):
+    """Validate the Manual column of a ``PackageTables`` model.
+
+    Broken links are replaced with ``N/A``. Returns ``(fixed_count, link_count)``.
+    """
     # Extract all manual links first
     manual_links = {}
-    for i, line in enumerate(lines):
-        match = re.search(r'`Manual <([^>]+)>`_', line)
-        if match:
-            url = match.group(1)
-            manual_links[i] = url
+    for row in tables.rows:
+        url = manual_url(row)
+        if url:
+            manual_links[row] = url
     
     print(f"Found {len(manual_links)} Manual links to validate")
     
-    # Validate URLs in parallel
-    broken_urls = set()
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_url = {executor.submit(check_url, url): url for url in set(manual_links.values())}
-        
-        completed = 0
-        for future in as_completed(future_to_url):
-            url = future_to_url[future]
-            completed += 1
-            try:
-                is_valid = future.result()
-                if not is_valid:
-                    broken_urls.add(url)
-                    print(f"  [{completed}/{len(manual_links)}] ✗ Broken: {url}")
-                else:
-                    print(f"  [{completed}/{len(manual_links)}] ✓ Valid: {url}")
-            except Exception as e:
-                broken_urls.add(url)
-                print(f"  [{completed}/{len(manual_links)}] ✗ Error checking {url}: {e}")
+    # Validate URLs concurrently
+    unique_urls = set(manual_links.values())
+    completed = 0
+
+    def report(url, is_valid):
+        nonlocal completed
+        completed += 1
+        status = "✓ Valid" if is_valid else "✗ Broken"
+        print(f"  [{completed}/{len(unique_urls)}] {status}: {url}")
+
+    results = asyncio.run(check_urls(unique_urls, concurrency=concurrency, per_host=per_host,
+                                     deadline=deadline, on_result=report, cache=cache))
+    broken_urls = {url for url, ok in results.items() if ok is False}
+    unchecked = [url for url, ok in results.items() if ok is None]
+    if unchecked:
+        print(f"  ⏱️  Deadline reached; keeping {len(unchecked)} unchecked links")
     
     # Replace broken links with N/A
     fixed_count = 0
-    for line_num, url in manual_links.items():
+    for row, url in manual_links.items():
         if url in broken_urls:
-            # Replace the Manual link with N/A
-            indent_match = re.match(r'^(\s+)', lines[line_num])
-            indent = indent_match.group(1) if indent_match else '     '
-            lines[line_num] = f'{indent}- N/A\n'
+            row.set('manual', 'N/A')
             fixed_count += 1
     
-    # Write back
-    with open(rst_path, 'w', encoding='utf-8') as f:
-        f.writelines(lines)
-    
     print(f"\n✓ Removed {fixed_count} broken Manual links")
     print(f"✓ Kept {len(manual_links) - fixed_count} valid Manual links")
+    if cache:
+        print(f"✓ Served {cache.fresh} URLs from cache, revalidated {cache.revalidated} "
+              f"with conditional requests, refreshed {cache.refreshed} expired, "
+              f"{cache.misses} not cached")
+    return fixed_count, len(manual_links)
+
 
+def validate_and_fix_links(rst_path, concurrency=DEFAULT_CONCURRENCY, per_host=DEFAULT_PER_HOST,
+                           deadline=DEFAULT_DEADLINE, cache=None):
+    """Validate Manual links and remove broken ones."""
+    tables = PackageTables.load(rst_path)
+    fix_manual_links(tables, concurrency=concurrency, per_host=per_host,
+                     deadline=deadline, cache=cache)
+    tables.save(rst_path)
 
-def main():
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f'Requests in flight across all hosts (default: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST,
+                        help=f'Requests in flight per host (default: {DEFAULT_PER_HOST})')
+    parser.add_argument('--deadline', type=float, default=DEFAULT_DEADLINE,
+                        help=f'Total time budget in seconds (default: {DEFAULT_DEADLINE})')
+    parser.add_argument('--cache', type=Path, default=DEFAULT_CACHE_PATH,
+                        help=f'Link-check result cache (default: {DEFAULT_CACHE_PATH})')
+    parser.add_argument('--ttl', type=float, default=DEFAULT_TTL_HOURS,
+                        help=f'Hours a cached result is trusted (default: {DEFAULT_TTL_HOURS:g})')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Check every URL over the network without using the cache')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Main function."""
+    args = parse_args(argv)
+
     print("=" * 60)
     print("Validating Manual links in documentation")
     print("=" * 60)
@@ -101,7 +253,13 @@ def main():
         print(f"✗ RST file not found: {rst_path}")
         return 1
     
-    validate_and_fix_links(rst_path)
+    cache = None if args.no_cache else LinkCache(args.cache, args.ttl)
+    try:
+        validate_and_fix_links(rst_path, concurrency=args.concurrency, per_host=args.per_host,
+                               deadline=args.deadline, cache=cache)
+    finally:
+        if cache:
+            cache.close()
     
     print("\n" + "=" * 60)
     print("Manual link validation complete")